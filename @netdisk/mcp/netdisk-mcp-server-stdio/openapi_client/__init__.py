@@ -14,6 +14,7 @@ __version__ = "1.0.0"
 
 # import ApiClient
 from openapi_client.api_client import ApiClient
+from openapi_client.api_client import AsyncApiClient
 
 # import Configuration
 from openapi_client.configuration import Configuration
@@ -71,7 +71,7 @@ class ApiClient(object):
         self.configuration = configuration
         self.pool_threads = pool_threads
 
-        self.rest_client = rest.RESTClientObject(configuration)
+        self.rest_client = self._new_rest_client()
         self.default_headers = {}
         if header_name is not None:
             self.default_headers[header_name] = header_value
@@ -79,6 +79,9 @@ class ApiClient(object):
         # Set default User-Agent.
         self.user_agent = 'OpenAPI-Generator/1.0.0/python'
 
+    def _new_rest_client(self):
+        return rest.RESTClientObject(self.configuration)
+
     def __enter__(self):
         return self
 
@@ -136,6 +139,34 @@ class ApiClient(object):
         _content_type: typing.Optional[str] = None
     ):
 
+        url, query_params, header_params, post_params, body = self._prepare_request(
+            resource_path, method, path_params, query_params, header_params,
+            body, post_params, files, auth_settings, collection_formats, _host)
+
+        try:
+            # perform request and return response
+            response_data = self.request(
+                method, url, query_params=query_params, headers=header_params,
+                post_params=post_params, body=body,
+                _preload_content=_preload_content,
+                _request_timeout=_request_timeout)
+        except ApiException as e:
+            e.body = e.body.decode('utf-8')
+            raise e
+
+        return self._handle_response(response_data, response_type,
+                                     _return_http_data_only, _preload_content,
+                                     _check_type)
+
+    def _prepare_request(self, resource_path, method, path_params,
+                         query_params, header_params, body, post_params,
+                         files, auth_settings, collection_formats, _host):
+        """Serializes parameters and resolves the url.
+
+        Shared by the blocking and the asyncio call paths.
+
+        :return: (url, query_params, header_params, post_params, body)
+        """
         config = self.configuration
 
         # header parameters
@@ -192,17 +223,15 @@ class ApiClient(object):
             # use server/host defined in path or operation instead
             url = _host + resource_path
 
-        try:
-            # perform request and return response
-            response_data = self.request(
-                method, url, query_params=query_params, headers=header_params,
-                post_params=post_params, body=body,
-                _preload_content=_preload_content,
-                _request_timeout=_request_timeout)
-        except ApiException as e:
-            e.body = e.body.decode('utf-8')
-            raise e
+        return url, query_params, header_params, post_params, body
 
+    def _handle_response(self, response_data, response_type,
+                         _return_http_data_only, _preload_content,
+                         _check_type):
+        """Deserializes a response returned by the rest client.
+
+        Shared by the blocking and the asyncio call paths.
+        """
         self.last_response = response_data
 
         return_data = response_data
@@ -627,6 +656,93 @@ class ApiClient(object):
                     )
 
 
+class AsyncApiClient(ApiClient):
+    """asyncio-native API client.
+
+    Drop-in replacement for ApiClient whose ``call_api`` is a coroutine, so
+    every generated API method returns an awaitable instead of running on
+    the ``pool_threads`` ThreadPool:
+
+    >>> client = AsyncApiClient()
+    >>> api = MultimediafileApi(client)
+    >>> results = await asyncio.gather(*(api.xpanmultimediafilemetas(token, f) for f in batches))
+    >>> await client.aclose()
+
+    Requests share one httpx.AsyncClient (imported on first request);
+    ``async_req`` is ignored because the call already is asynchronous.
+
+    :param pools_size: number of hosts to keep connections for
+        (defaults to configuration.connection_pools_size).
+    :param http_client: existing httpx.AsyncClient to send requests with;
+        it is not closed by aclose().
+    """
+
+    def __init__(self, configuration=None, header_name=None, header_value=None,
+                 cookie=None, pools_size=None, http_client=None):
+        self._pools_size = pools_size
+        self._http_client = http_client
+        super().__init__(configuration, header_name, header_value, cookie)
+
+    def _new_rest_client(self):
+        # no sync PoolManager: every request goes through the async client
+        from openapi_client.rest_async import AsyncRESTClientObject
+        return AsyncRESTClientObject(self.configuration, pools_size=self._pools_size,
+                                     http_client=self._http_client)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.rest_client.close()
+        # async_req callers may still have started the ThreadPool
+        super().close()
+
+    async def call_api(
+        self,
+        resource_path: str,
+        method: str,
+        path_params: typing.Optional[typing.Dict[str, typing.Any]] = None,
+        query_params: typing.Optional[typing.List[typing.Tuple[str, typing.Any]]] = None,
+        header_params: typing.Optional[typing.Dict[str, typing.Any]] = None,
+        body: typing.Optional[typing.Any] = None,
+        post_params: typing.Optional[typing.List[typing.Tuple[str, typing.Any]]] = None,
+        files: typing.Optional[typing.Dict[str, typing.List[io.IOBase]]] = None,
+        response_type: typing.Optional[typing.Tuple[typing.Any]] = None,
+        auth_settings: typing.Optional[typing.List[str]] = None,
+        async_req: typing.Optional[bool] = None,
+        _return_http_data_only: typing.Optional[bool] = None,
+        collection_formats: typing.Optional[typing.Dict[str, str]] = None,
+        _preload_content: bool = True,
+        _request_timeout: typing.Optional[typing.Union[int, float, typing.Tuple]] = None,
+        _host: typing.Optional[str] = None,
+        _check_type: typing.Optional[bool] = None
+    ):
+        """Makes the HTTP request on the running event loop and returns
+        deserialized data. Parameters are the same as ApiClient.call_api.
+        """
+        url, query_params, header_params, post_params, body = self._prepare_request(
+            resource_path, method, path_params, query_params, header_params,
+            body, post_params, files, auth_settings, collection_formats, _host)
+
+        try:
+            response_data = await self.rest_client.request(
+                method, url, query_params=query_params, headers=header_params,
+                post_params=post_params, body=body,
+                _preload_content=_preload_content,
+                _request_timeout=_request_timeout)
+        except ApiException as e:
+            if isinstance(e.body, bytes):
+                e.body = e.body.decode('utf-8')
+            raise e
+
+        return self._handle_response(response_data, response_type,
+                                     _return_http_data_only, _preload_content,
+                                     _check_type)
+
+
 class Endpoint(object):
     def __init__(self, settings=None, params_map=None, root_map=None,
                  headers_map=None, api_client=None, callable=None):
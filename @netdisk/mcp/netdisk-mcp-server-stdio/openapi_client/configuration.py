@@ -196,6 +196,53 @@ class Configuration(object):
 
         # Options to pass down to the underlying urllib3 socket
         self.socket_options = None
+        self.tcp_keepalive_idle = None
+        """Seconds of idleness before TCP keep-alive probes start.
+           None leaves keep-alive off. When set (and socket_options is None)
+           the socket options become urllib3's defaults (TCP_NODELAY) plus
+           SO_KEEPALIVE with this idle time.
+        """
+
+        self.connection_pools_size = 4
+        """Number of per-host connection pools kept by urllib3's PoolManager.
+        """
+        self.connection_pool_maxsize_per_host = {}
+        """Per-host override of connection_pool_maxsize, keyed by host name,
+           e.g. {'d.pcs.baidu.com': 32} so uploads do not compete with API
+           calls to pan.baidu.com for sockets.
+        """
+        self.connection_pool_block = False
+        """If True, a request waits for a free pooled connection once
+           maxsize connections to the host are in use, instead of opening an
+           extra connection that is discarded afterwards.
+        """
+        self.connection_pool_timeout = None
+        """Seconds to wait for a free connection when connection_pool_block
+           is True; None waits indefinitely. urllib3 raises EmptyPoolError
+           when the wait times out.
+        """
+
+    def get_socket_options(self):
+        """Socket options for urllib3 connections (None keeps its defaults).
+
+        :return: list of (level, option, value) tuples or None.
+        """
+        if self.socket_options is not None:
+            return self.socket_options
+        if self.tcp_keepalive_idle is None:
+            return None
+        import socket
+        from urllib3.connection import HTTPConnection
+        idle = max(int(self.tcp_keepalive_idle), 1)
+        options = list(HTTPConnection.default_socket_options)
+        options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+        if hasattr(socket, 'TCP_KEEPIDLE'):
+            options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, idle))
+        if hasattr(socket, 'TCP_KEEPINTVL'):
+            options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, max(idle // 4, 1)))
+        if hasattr(socket, 'TCP_KEEPCNT'):
+            options.append((socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 4))
+        return options
 
     def __deepcopy__(self, memo):
         cls = self.__class__
@@ -11,6 +11,7 @@
 
 from datetime import date, datetime  # noqa: F401
 from copy import deepcopy
+from functools import lru_cache
 import inspect
 import io
 import os
@@ -70,6 +71,7 @@ class cached_property(object):
 PRIMITIVE_TYPES = (list, float, int, bool, datetime, date, str, file_type)
 
 
+@lru_cache(maxsize=None)
 def allows_single_value_input(cls):
     """
     This function returns True if the input composed schema model or any
@@ -81,7 +83,7 @@ def allows_single_value_input(cls):
       - StringEnum
       - ArrayModel
       - null
-    TODO: lru_cache this
+    The result only depends on the class, so it is cached per class.
     """
     if (
         issubclass(cls, ModelSimple) or
@@ -143,7 +145,7 @@ class OpenApiModel(object):
         elif self.additional_properties_type is not None:
             required_types_mixed = self.additional_properties_type
 
-        if get_simple_class(name) != str:
+        if type(name) is not str and get_simple_class(name) != str:
             error_msg = type_error_message(
                 var_name=name,
                 var_value=name,
@@ -158,9 +160,12 @@ class OpenApiModel(object):
             )
 
         if self._check_type:
-            value = validate_and_convert_types(
-                value, required_types_mixed, path_to_item, self._spec_property_naming,
-                self._check_type, configuration=self._configuration)
+            fast_class = get_attribute_fast_class(type(self), name, required_types_mixed)
+            # type() is exact: bool is not int here, and subclasses take the slow path
+            if fast_class is None or type(value) is not fast_class:
+                value = validate_and_convert_types(
+                    value, required_types_mixed, path_to_item, self._spec_property_naming,
+                    self._check_type, configuration=self._configuration)
         if (name,) in self.allowed_values:
             check_allowed_values(
                 self.allowed_values,
@@ -1040,6 +1045,9 @@ def check_validations(
         raise ApiValueError(err_msg)
 
 
+_ORDERED_RESPONSE_TYPES = {}
+
+
 def order_response_types(required_types):
     """Returns the required types sorted in coercion order
 
@@ -1051,6 +1059,19 @@ def order_response_types(required_types):
         (list): coercion order sorted collection of classes or instance
             of list or dict with class information inside it.
     """
+    try:
+        key = tuple(required_types)
+        cached = _ORDERED_RESPONSE_TYPES.get(key)
+    except TypeError:
+        # list/dict type descriptions are unhashable, sort them every time
+        return _order_response_types(required_types)
+    if cached is None:
+        cached = tuple(_order_response_types(required_types))
+        _ORDERED_RESPONSE_TYPES[key] = cached
+    return list(cached)
+
+
+def _order_response_types(required_types):
 
     def index_getter(class_or_instance):
         if isinstance(class_or_instance, list):
@@ -1154,10 +1175,19 @@ def get_possible_classes(cls, from_server_context):
     return possible_classes
 
 
+_REQUIRED_TYPE_CLASSES = {}
+
+
 def get_required_type_classes(required_types_mixed, spec_property_naming):
     """Converts the tuple required_types into a tuple and a dict described
     below
 
+    Results are memoized. Model attribute types come from the cached
+    openapi_types dict, so the same tuple object is seen for every instance
+    of a (model class, attribute); tuples that contain list/dict type
+    descriptions are unhashable and are keyed by identity instead, with the
+    tuple kept alive in the cache entry so its id cannot be reused.
+
     Args:
         required_types_mixed (tuple/list): will contain either classes or
             instance of list or dict
@@ -1175,6 +1205,22 @@ def get_required_type_classes(required_types_mixed, spec_property_naming):
                 child_types_mixed (list/dict/tuple): describes the valid child
                     types
     """
+    try:
+        key = (required_types_mixed, spec_property_naming)
+        entry = _REQUIRED_TYPE_CLASSES.get(key)
+    except TypeError:
+        key = (id(required_types_mixed), spec_property_naming)
+        entry = _REQUIRED_TYPE_CLASSES.get(key)
+        if entry is not None and entry[0] is not required_types_mixed:
+            entry = None
+    if entry is None:
+        entry = (required_types_mixed,
+                 _get_required_type_classes(required_types_mixed, spec_property_naming))
+        _REQUIRED_TYPE_CLASSES[key] = entry
+    return entry[1]
+
+
+def _get_required_type_classes(required_types_mixed, spec_property_naming):
     valid_classes = []
     child_req_types_by_current_type = {}
     for required_type in required_types_mixed:
@@ -1192,6 +1238,32 @@ def get_required_type_classes(required_types_mixed, spec_property_naming):
     return tuple(valid_classes), child_req_types_by_current_type
 
 
+# scalar types whose validation is a no-op when the value already has that type
+_FAST_PATH_CLASSES = (bool, int, float, str, none_type)
+_ATTRIBUTE_FAST_CLASS = {}
+
+
+def get_attribute_fast_class(model_class, name, required_types_mixed):
+    """Returns the single scalar class of a model attribute, or None
+
+    Compiled once per (model class, attribute). When the attribute accepts
+    exactly one scalar class and the value already is of that class,
+    validate_and_convert_types would return it unchanged, so set_attribute
+    skips the call.
+    """
+    key = (model_class, name)
+    try:
+        return _ATTRIBUTE_FAST_CLASS[key]
+    except KeyError:
+        pass
+    fast_class = None
+    if (isinstance(required_types_mixed, tuple) and len(required_types_mixed) == 1
+            and required_types_mixed[0] in _FAST_PATH_CLASSES):
+        fast_class = required_types_mixed[0]
+    _ATTRIBUTE_FAST_CLASS[key] = fast_class
+    return fast_class
+
+
 def change_keys_js_to_python(input_dict, model_class):
     """
     Converts from javascript_key keys in the input_dict to python_keys in
@@ -1469,6 +1541,7 @@ def attempt_convert_item(input_value, valid_classes, path_to_item,
     return input_value
 
 
+@lru_cache(maxsize=None)
 def is_type_nullable(input_type):
     """
     Returns true if None is an allowed value for the specified input_type.
@@ -14,6 +14,8 @@ import json
 import logging
 import re
 import ssl
+import threading
+import time
 from urllib.parse import urlencode
 from urllib.parse import urlparse
 from urllib.request import proxy_bypass_environment
@@ -50,12 +52,100 @@ class RESTResponse(io.IOBase):
         return self.urllib3_response.getheader(name, default)
 
 
+class _PoolMetricsMixin(object):
+    """Counts connection checkouts on an urllib3 connection pool.
+
+    urllib3 pre-fills the pool queue with maxsize placeholders, so an empty
+    queue at checkout means every allowed connection to the host is in use:
+    the request either waits (block=True) or opens an overflow connection
+    that is discarded when returned.
+    """
+
+    pool_timeout = None
+
+    def __init__(self, *args, **kwargs):
+        super(_PoolMetricsMixin, self).__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self.metrics = {
+            'checkouts': 0,
+            'saturated': 0,
+            'waits': 0,
+            'wait_seconds': 0.0,
+            'wait_timeouts': 0,
+            'overflow': 0,
+        }
+
+    def _get_conn(self, timeout=None):
+        if timeout is None:
+            timeout = self.pool_timeout
+        saturated = self.pool is not None and self.pool.qsize() == 0
+        started = time.monotonic()
+        try:
+            conn = super(_PoolMetricsMixin, self)._get_conn(timeout=timeout)
+        except urllib3.exceptions.EmptyPoolError:
+            with self._metrics_lock:
+                self.metrics['saturated'] += 1
+                self.metrics['waits'] += 1
+                self.metrics['wait_timeouts'] += 1
+                self.metrics['wait_seconds'] += time.monotonic() - started
+            raise
+        with self._metrics_lock:
+            self.metrics['checkouts'] += 1
+            if saturated:
+                self.metrics['saturated'] += 1
+                if self.block:
+                    self.metrics['waits'] += 1
+                    self.metrics['wait_seconds'] += time.monotonic() - started
+                else:
+                    self.metrics['overflow'] += 1
+        return conn
+
+
+class _MeteredHTTPConnectionPool(_PoolMetricsMixin, urllib3.HTTPConnectionPool):
+    pass
+
+
+class _MeteredHTTPSConnectionPool(_PoolMetricsMixin, urllib3.HTTPSConnectionPool):
+    pass
+
+
+class _PoolManagerMixin(object):
+    """Per-host maxsize overrides and metered pools for (Proxy)PoolManager."""
+
+    def _setup_pools(self, per_host_maxsize, pool_timeout):
+        self.per_host_maxsize = dict(per_host_maxsize or {})
+        self.pool_timeout = pool_timeout
+        self.pool_classes_by_scheme = {
+            'http': _MeteredHTTPConnectionPool,
+            'https': _MeteredHTTPSConnectionPool,
+        }
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        if request_context is None:
+            request_context = self.connection_pool_kw.copy()
+        maxsize = self.per_host_maxsize.get(host)
+        if maxsize:
+            request_context = dict(request_context, maxsize=maxsize)
+        pool = super(_PoolManagerMixin, self)._new_pool(
+            scheme, host, port, request_context=request_context)
+        pool.pool_timeout = self.pool_timeout
+        return pool
+
+
+class _PoolManager(_PoolManagerMixin, urllib3.PoolManager):
+    pass
+
+
+class _ProxyManager(_PoolManagerMixin, urllib3.ProxyManager):
+    pass
+
+
 class RESTClientObject(object):
     """
     class RESTClientObject
     """
 
-    def __init__(self, configuration, pools_size=4, maxsize=None):
+    def __init__(self, configuration, pools_size=None, maxsize=None):
         # urllib3.PoolManager will pass all kw parameters to connectionpool
         # https://github.com/shazow/urllib3/blob/f9409436f83aeb79fbaf090181cd81b784f1b8ce/urllib3/poolmanager.py#L75  # noqa: E501
         # https://github.com/shazow/urllib3/blob/f9409436f83aeb79fbaf090181cd81b784f1b8ce/urllib3/connectionpool.py#L680  # noqa: E501
@@ -75,8 +165,15 @@ class RESTClientObject(object):
         if configuration.retries is not None:
             addition_pool_args['retries'] = configuration.retries
 
-        if configuration.socket_options is not None:
-            addition_pool_args['socket_options'] = configuration.socket_options
+        socket_options = configuration.get_socket_options()
+        if socket_options is not None:
+            addition_pool_args['socket_options'] = socket_options
+
+        if configuration.connection_pool_block:
+            addition_pool_args['block'] = True
+
+        if pools_size is None:
+            pools_size = configuration.connection_pools_size
 
         if maxsize is None:
             if configuration.connection_pool_maxsize is not None:
@@ -86,7 +183,7 @@ class RESTClientObject(object):
 
         # https pool manager
         if configuration.proxy and not should_bypass_proxies(configuration.host, no_proxy=configuration.no_proxy or ''):
-            self.pool_manager = urllib3.ProxyManager(
+            self.pool_manager = _ProxyManager(
                 num_pools=pools_size,
                 maxsize=maxsize,
                 cert_reqs=cert_reqs,
@@ -98,7 +195,7 @@ class RESTClientObject(object):
                 **addition_pool_args
             )
         else:
-            self.pool_manager = urllib3.PoolManager(
+            self.pool_manager = _PoolManager(
                 num_pools=pools_size,
                 maxsize=maxsize,
                 cert_reqs=cert_reqs,
@@ -107,6 +204,41 @@ class RESTClientObject(object):
                 key_file=configuration.key_file,
                 **addition_pool_args
             )
+        self.pool_manager._setup_pools(configuration.connection_pool_maxsize_per_host,
+                                       configuration.connection_pool_timeout)
+
+    def pool_stats(self):
+        """Per-host connection pool usage.
+
+        requests/new_connections/reused come from urllib3's own counters;
+        saturated counts checkouts that found every connection in use,
+        split into waits (block=True) and overflow connections.
+        """
+        hosts = []
+        for key in list(self.pool_manager.pools.keys()):
+            pool = self.pool_manager.pools.get(key)
+            if pool is None:
+                continue
+            requests = int(getattr(pool, 'num_requests', 0) or 0)
+            new_connections = int(getattr(pool, 'num_connections', 0) or 0)
+            maxsize = getattr(pool.pool, 'maxsize', None) if pool.pool is not None else None
+            idle = pool.pool.qsize() if pool.pool is not None else 0
+            stats = {
+                'host': '%s://%s:%s' % (pool.scheme, pool.host, pool.port),
+                'maxsize': maxsize,
+                'block': bool(pool.block),
+                'in_use': (maxsize - idle) if maxsize else None,
+                'requests': requests,
+                'new_connections': new_connections,
+                'reused': max(requests - new_connections, 0),
+            }
+            metrics = getattr(pool, 'metrics', None)
+            if metrics is not None:
+                with pool._metrics_lock:
+                    stats.update(metrics)
+                stats['wait_seconds'] = round(stats['wait_seconds'], 4)
+            hosts.append(stats)
+        return hosts
 
     def request(self, method, url, query_params=None, headers=None,
                 body=None, post_params=None, _preload_content=True,
@@ -224,6 +356,12 @@ class RESTClientObject(object):
             logger.debug("response body: %s", r.data)
 
         if not 200 <= r.status <= 299:
+            if not _preload_content:
+                # 调用方拿不到异常里的原始响应：先读出响应体再归还连接，否则该连接一直占着池位
+                raw = r
+                r = RESTResponse(raw)
+                raw.release_conn()
+
             if r.status == 401:
                 raise UnauthorizedException(http_resp=r)
 
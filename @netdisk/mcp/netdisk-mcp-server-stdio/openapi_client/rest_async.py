@@ -0,0 +1,217 @@
+# !/usr/bin/env python3
+"""
+    xpan
+
+    xpanapi  # noqa: E501
+
+    The version of the OpenAPI document: 0.1
+    Generated by: https://openapi-generator.tech
+"""
+
+
+import io
+import json
+import logging
+import re
+import ssl
+from urllib.parse import urlencode
+
+from openapi_client.exceptions import ApiException, UnauthorizedException, ForbiddenException
+from openapi_client.exceptions import NotFoundException, ServiceException, ApiValueError
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRESTResponse(io.IOBase):
+    """
+    class AsyncRESTResponse
+
+    Body is always read before the response is returned, so the object
+    behaves like RESTResponse (and like an urllib3 response for callers
+    that pass _preload_content=False and then read ``data``).
+    """
+
+    def __init__(self, resp):
+        self.httpx_response = resp
+        self.status = resp.status_code
+        self.reason = resp.reason_phrase
+        self.data = resp.content
+
+    def getheaders(self):
+        """Returns a dictionary of the response headers."""
+        return self.httpx_response.headers
+
+    def getheader(self, name, default=None):
+        """Returns a given response header."""
+        return self.httpx_response.headers.get(name, default)
+
+    def release_conn(self):
+        """The connection is already back in the pool once data is read."""
+        return None
+
+
+class AsyncRESTClientObject(object):
+    """
+    class AsyncRESTClientObject
+
+    httpx based counterpart of RESTClientObject. The AsyncClient is created
+    lazily and shared by every request; connections are pooled up to
+    ``pools_size * maxsize`` in total (httpx has no per-host limit).
+
+    Pass ``http_client`` to reuse an existing httpx.AsyncClient (for example
+    the application's shared one); it is then left open by close().
+    """
+
+    def __init__(self, configuration, pools_size=None, maxsize=None, http_client=None):
+        if pools_size is None:
+            pools_size = configuration.connection_pools_size
+        if maxsize is None:
+            if configuration.connection_pool_maxsize is not None:
+                maxsize = configuration.connection_pool_maxsize
+            else:
+                maxsize = 4
+        self.pools_size = pools_size
+        self.maxsize = maxsize
+        self.proxy = configuration.proxy
+        self.proxy_headers = configuration.proxy_headers
+
+        # ssl context
+        if configuration.verify_ssl:
+            ssl_context = ssl.create_default_context(cafile=configuration.ssl_ca_cert)
+            if configuration.cert_file:
+                ssl_context.load_cert_chain(configuration.cert_file, keyfile=configuration.key_file)
+            if configuration.assert_hostname is False:
+                ssl_context.check_hostname = False
+        else:
+            ssl_context = False
+        self.ssl_context = ssl_context
+        self._client = http_client
+        self._owns_client = http_client is None
+
+    def _get_client(self):
+        if self._client is None or self._client.is_closed:
+            import httpx
+
+            kwargs = {
+                "verify": self.ssl_context,
+                "limits": httpx.Limits(max_connections=self.pools_size * self.maxsize,
+                                       max_keepalive_connections=self.pools_size * self.maxsize),
+                "timeout": None,
+            }
+            if self.proxy:
+                kwargs["proxy"] = httpx.Proxy(self.proxy, headers=self.proxy_headers)
+            self._client = httpx.AsyncClient(**kwargs)
+            self._owns_client = True
+        return self._client
+
+    async def close(self):
+        if self._owns_client and self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        if self._owns_client:
+            self._client = None
+
+    async def request(self, method, url, query_params=None, headers=None,
+                      body=None, post_params=None, _preload_content=True,
+                      _request_timeout=None):
+        """Perform requests.
+
+        Parameters and errors mirror RESTClientObject.request.
+        """
+        import httpx
+
+        method = method.upper()
+        assert method in ['GET', 'HEAD', 'DELETE', 'POST', 'PUT',
+                          'PATCH', 'OPTIONS']
+
+        if post_params and body:
+            raise ApiValueError(
+                "body parameter cannot be used with post_params parameter."
+            )
+
+        post_params = post_params or {}
+        headers = headers or {}
+
+        timeout = None
+        if _request_timeout:
+            if isinstance(_request_timeout, (int, float)):  # noqa: E501,F821
+                timeout = httpx.Timeout(_request_timeout)
+            elif (isinstance(_request_timeout, tuple) and
+                  len(_request_timeout) == 2):
+                timeout = httpx.Timeout(None, connect=_request_timeout[0], read=_request_timeout[1])
+
+        # endpoint paths already carry a '?', see RESTClientObject.GET
+        if query_params:
+            url += '&' + urlencode(query_params)
+
+        args = {
+            "method": method,
+            "url": url,
+            "timeout": timeout,
+            "headers": headers,
+        }
+
+        # For `POST`, `PUT`, `PATCH`, `OPTIONS`, `DELETE`
+        if method in ['POST', 'PUT', 'PATCH', 'OPTIONS', 'DELETE']:
+            if (method != 'DELETE') and ('Content-Type' not in headers):
+                headers['Content-Type'] = 'application/json'
+            if ('Content-Type' not in headers) or (re.search('json', headers['Content-Type'], re.IGNORECASE)):
+                if body is not None:
+                    args["content"] = json.dumps(body)
+            elif headers['Content-Type'] == 'application/x-www-form-urlencoded':  # noqa: E501
+                args["content"] = urlencode(post_params)
+            elif headers['Content-Type'] == 'multipart/form-data':
+                # must del headers['Content-Type'], or the correct
+                # Content-Type with the boundary will be overwritten.
+                del headers['Content-Type']
+                data = {}
+                files = []
+                for param in post_params:
+                    k, v = param
+                    if isinstance(v, tuple) and len(v) == 3:
+                        files.append((k, v))
+                    else:
+                        data[k] = v
+                args["data"] = data
+                args["files"] = files
+            # Pass a `bytes` parameter directly in the body to support
+            # other content types than Json when `body` argument is provided
+            # in serialized form
+            elif isinstance(body, str) or isinstance(body, bytes):
+                args["content"] = body
+            else:
+                # Cannot generate the request from given parameters
+                msg = """Cannot prepare a request message for provided
+                         arguments. Please check that your arguments match
+                         declared content type."""
+                raise ApiException(status=0, reason=msg)
+
+        try:
+            r = AsyncRESTResponse(await self._get_client().request(**args))
+        except httpx.ConnectError as e:
+            # same as RESTClientObject: only ssl errors are wrapped, timeouts
+            # and connection errors propagate unchanged
+            if not isinstance(e.__cause__ or e.__context__, ssl.SSLError):
+                raise
+            msg = "{0}\n{1}".format(type(e).__name__, str(e))
+            raise ApiException(status=0, reason=msg)
+
+        # log response body
+        logger.debug("response body: %s", r.data)
+
+        if not 200 <= r.status <= 299:
+            if r.status == 401:
+                raise UnauthorizedException(http_resp=r)
+
+            if r.status == 403:
+                raise ForbiddenException(http_resp=r)
+
+            if r.status == 404:
+                raise NotFoundException(http_resp=r)
+
+            if 500 <= r.status <= 599:
+                raise ServiceException(http_resp=r)
+
+            raise ApiException(http_resp=r)
+
+        return r
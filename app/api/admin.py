@@ -13,6 +13,18 @@ from app.models.usage_quota import UsageQuota
 from app.models.ticket import Ticket
 from datetime import datetime, timedelta
 from app.models.user import User
+from app.services.bulkhead import bulkhead_stats
+from app.services.fm_jobs import fm_job_stats
+from app.services.http_pool import pool_stats, session_stats
+from app.services.mcp_async_client import async_http_stats
+from app.services.cache import listing_cache_stats, meta_cache_stats
+from app.services.mcp_client import rapid_upload_stats
+from app.services.meta_coalescer import meta_coalescer_stats
+from app.services.op_registry import op_registry_stats
+from app.services.rate_governor import rate_governor_stats
+from app.services.resilience import resilience_stats
+from app.services.upload_scheduler import upload_scheduler_stats
+from app.services.upload_sessions import UploadSessionStore
 
 
 router = APIRouter(prefix="/admin", tags=["admin"])
@@ -123,3 +135,31 @@ def tickets_gc(
     db.commit()
     return JSONResponse({"status": "ok"})
 
+
+@router.post("/upload_sessions/gc")
+def upload_sessions_gc(admin_secret: str = Query(...)) -> JSONResponse:
+    _require_admin(admin_secret)
+    removed = UploadSessionStore().gc_expired()
+    return JSONResponse({"status": "ok", "removed": removed})
+
+
+# ---- Runtime metrics ----
+@router.get("/metrics")
+def metrics(admin_secret: str = Query(...)) -> JSONResponse:
+    _require_admin(admin_secret)
+    data = {
+        "http_pool": pool_stats(),
+        "http_session": session_stats(),
+        "async_http": async_http_stats(),
+        "rapid_upload": rapid_upload_stats(),
+        "upload_scheduler": upload_scheduler_stats(),
+        "meta_coalescer": meta_coalescer_stats(),
+        "meta_cache": meta_cache_stats(),
+        "listing_cache": listing_cache_stats(),
+        "rate_governor": rate_governor_stats(),
+        "upstream_resilience": resilience_stats(),
+        "mcp_ops": op_registry_stats(),
+        "bulkheads": bulkhead_stats(),
+        "fm_jobs": fm_job_stats(),
+    }
+    return JSONResponse({"status": "ok", "data": data})
@@ -1,18 +1,29 @@
 from __future__ import annotations
 
 from typing import Optional
+import asyncio
 import json
 import logging
+import time
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from app.deps.auth import get_current_user
 from app.models.user import User
 from app.deps.quota import check_and_consume_quota
 from app.core.db import get_db
 from sqlalchemy.orm import Session
-from app.services.mcp_client import get_netdisk_client
+from app.core.config import get_settings
+from app.services.mcp_client import NetdiskClient, get_netdisk_client, resolve_access_token
+from app.services.mcp_async_client import AsyncNetdiskClient, aget_netdisk_client, async_client_available, netdisk_client_for_token
+from app.services.rate_governor import UpstreamThrottled
+from app.services.resilience import UpstreamUnavailable
+from app.services.bulkhead import BulkheadFull, bulkhead_for, get_bulkhead
+from app.services.fm_jobs import FmJobStore, get_fm_job_tracker
+from app.services.idempotency import IdempotencyInProgress, IdempotencyKeyReused, request_fingerprint, run_idempotent
+from app.services.op_registry import Arg, OpOverloaded, OpRegistry, OpSpec, OpTimeout, dispatch, json_value
 from app.core.db import SessionLocal
 from app.models.ticket import Ticket
 from datetime import datetime, timedelta
@@ -23,427 +34,571 @@ logger = logging.getLogger(__name__)
 
 
 @router.get("/user/quota")
-def user_quota(current: User = Depends(get_current_user)) -> JSONResponse:
-    client = get_netdisk_client(user_id=current.id, mode="user")
-    data = client.quota()
+async def user_quota(current: User = Depends(get_current_user)) -> JSONResponse:
+    data = await _run_op("quota", {}, mode="user", user_id=current.id)
     return JSONResponse(data)
 
 
 @router.get("/user/list")
-def user_list_files(
+async def user_list_files(
     dir: str = Query("/", alias="dir"),
     limit: int = 100,
     order: str = "time",
     desc: int = 1,
     current: User = Depends(get_current_user),
 ) -> JSONResponse:
-    client = get_netdisk_client(user_id=current.id, mode="user")
-    data = client.list_files(dir_path=dir, limit=limit, order=order, desc=desc)
+    args = {"dir": dir, "limit": limit, "order": order, "desc": desc}
+    data = await _run_op("list_files", args, mode="user", user_id=current.id)
     return JSONResponse(data)
 
 
 @router.get("/public/quota")
-def public_quota(current: User = Depends(get_current_user)) -> JSONResponse:
+async def public_quota(current: User = Depends(get_current_user)) -> JSONResponse:
     try:
-        client = get_netdisk_client(mode="public")
-        data = client.quota()
+        data = await _run_op("quota", {}, mode="public")
         return JSONResponse(data)
     except Exception as e:
         return JSONResponse({"status": "error", "error": str(e)}, status_code=200)
 
 
 @router.get("/public/list")
-def public_list_files(
+async def public_list_files(
     dir: str = Query("/", alias="dir"),
     limit: int = 100,
     order: str = "time",
     desc: int = 1,
     current: User = Depends(get_current_user),
 ) -> JSONResponse:
-    client = get_netdisk_client(mode="public")
-    data = client.list_files(dir_path=dir, limit=limit, order=order, desc=desc)
+    args = {"dir": dir, "limit": limit, "order": order, "desc": desc}
+    data = await _run_op("list_files", args, mode="public")
     return JSONResponse(data)
 
 
-# ---- Generic exec (allowlist) ----
+def _retry_after(e: UpstreamThrottled | UpstreamUnavailable | OpOverloaded | BulkheadFull | IdempotencyInProgress) -> int:
+    return max(int(e.retry_after + 0.999), 1)
 
-ALLOWED_OPS: set[str] = {
+
+def throttled_response(e: UpstreamThrottled, op: str | None = None) -> JSONResponse:
+    """令牌排队超限：明确返回 429 与 Retry-After，而不是把请求继续压给上游"""
+    retry_after = _retry_after(e)
+    body = {"status": "error", "error": "upstream_throttled", "retry_after": retry_after}
+    if op:
+        body["op"] = op
+    return JSONResponse(body, status_code=429, headers={"Retry-After": str(retry_after)})
+
+
+def unavailable_response(e: UpstreamUnavailable, op: str | None = None) -> JSONResponse:
+    """该类上游接口已熔断：快速返回 503，而不是让请求等满超时"""
+    retry_after = _retry_after(e)
+    body = {"status": "error", "error": "upstream_unavailable", "endpoint_class": e.endpoint_class, "retry_after": retry_after}
+    if op:
+        body["op"] = op
+    return JSONResponse(body, status_code=503, headers={"Retry-After": str(retry_after)})
+
+
+def overloaded_response(e: OpOverloaded) -> JSONResponse:
+    """该操作的并发名额排队超时：返回 503，由调用方稍后重试"""
+    retry_after = _retry_after(e)
+    body = {"status": "error", "error": "op_overloaded", "op": e.op, "retry_after": retry_after}
+    return JSONResponse(body, status_code=503, headers={"Retry-After": str(retry_after)})
+
+
+def bulkhead_full_response(e: BulkheadFull) -> JSONResponse:
+    """该类同步调用的线程池与排队都已占满：返回 503，不影响其他类请求"""
+    retry_after = _retry_after(e)
+    body = {"status": "error", "error": "bulkhead_full", "bulkhead": e.name, "retry_after": retry_after}
+    return JSONResponse(body, status_code=503, headers={"Retry-After": str(retry_after)})
+
+
+def op_timeout_response(e: OpTimeout) -> JSONResponse:
+    return JSONResponse({"status": "error", "error": "op_timeout", "op": e.op, "timeout": e.timeout}, status_code=504)
+
+
+# ---- Generic exec (op registry) ----
+
+def _download_ticket(client, args: dict) -> dict:
+    # 允许通过 fsid 或直接传 dlink 申请票据
+    import time as _time
+    from app.core.config import settings
+    try:
+        import jwt as _jwt
+    except Exception:
+        return {"status": "error", "error": "pyjwt_not_installed"}
+
+    dlink: str | None = args.get("dlink")
+    fsid = args.get("fsid")
+    ttl_seconds = int(args.get("ttl", 300))  # 默认5分钟
+
+    if not dlink and not fsid:
+        return {"status": "error", "error": "missing_dlink_or_fsid"}
+
+    # 若提供 fsid，则用当前 client 获取 dlink（默认走公共态由调用方控制）
+    if not dlink and fsid is not None:
+        try:
+            fsids = [int(fsid)]
+        except Exception:
+            try:
+                fsids = [int(str(fsid))]
+            except Exception:
+                return {"status": "error", "error": "invalid_fsid"}
+        metas = client.download_links(fsids)
+        # 兼容不同返回结构
+        items = metas.get("list") or metas.get("data", {}).get("list") or []
+        if not items:
+            return {"status": "error", "error": "dlink_not_found"}
+        first = items[0] if isinstance(items, list) else items
+        dlink = first.get("dlink") if isinstance(first, dict) else None
+        if not dlink:
+            return {"status": "error", "error": "dlink_not_found"}
+
+    now = int(_time.time())
+    # 根据客户端模式标注票据作用域：public/user
+    try:
+        _mode = getattr(client, "_token_mode", "")
+        _scope = "public" if _mode == "public" else "user"
+    except Exception:
+        _scope = "user"
+    # 生成一次性票据ID（jti），用于后端去重与消费标记
+    try:
+        import uuid as _uuid
+        _jti = str(_uuid.uuid4())
+    except Exception:
+        _jti = str(now)
+    payload = {
+        "typ": "bd.dl.ticket",
+        "dlink": dlink,
+        "iat": now,
+        "exp": now + ttl_seconds,
+        "scope": _scope,
+        "jti": _jti,
+        # 可扩展字段，如文件名、fsid 等
+    }
+    token = _jwt.encode(payload, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
+    # 后端持久化票据，支持一次性与撤销管理
+    try:
+        expires_at = datetime.utcfromtimestamp(now) + timedelta(seconds=ttl_seconds)
+        with SessionLocal() as _db:
+            # 若存在同 jti 记录，避免重复插入
+            exists = _db.query(Ticket).filter(Ticket.jti == _jti).first()
+            if not exists:
+                row = Ticket(
+                    jti=_jti,
+                    scope=_scope,
+                    user_id=getattr(getattr(client, "_user", None), "id", None),
+                    dlink=dlink,
+                    fsid=str(fsid) if fsid is not None else None,
+                    expires_at=expires_at,
+                )
+                _db.add(row)
+                _db.commit()
+    except Exception as _e:
+        logger.warning("persist_ticket_failed jti=%s err=%s", _jti, _e)
+    return {
+        "status": "ok",
+        "ticket": token,
+        "expires_in": ttl_seconds,
+    }
+
+
+def _listall_args(recursion: int) -> tuple[Arg, ...]:
+    return (
+        Arg("path", "path", str, "/"),
+        Arg("recursion", "recursion", int, recursion),
+        Arg("start", "start", int, 0),
+        Arg("limit", "limit", int, 100),
+        Arg("order", "order", str, "time"),
+        Arg("desc", "desc", int, 1),
+    )
+
+
+_PAGED_ARGS = (
+    Arg("dir", "parent_path", None, "/"),
+    Arg("page", "page", int, 1),
+    Arg("num", "num", int, 50),
+    Arg("order", "order", str, "time"),
+    Arg("desc", "desc", str, "1"),
+)
+_SEARCH_ARGS = (
+    Arg("dir", "dir_path", str, "/"),
+    Arg("page", "page", str, "1"),
+    Arg("num", "num", str, "50"),
+    Arg("recursion", "recursion", str, "1"),
+)
+_FM_ARGS = (
+    Arg("filelist", "filelist_json", str, "[]"),
+    Arg("async", "async_mode", int, 1),
+    Arg("ondup", "ondup"),
+)
+
+# 只允许注册表中的操作；async_native 的操作由 AsyncNetdiskClient 在事件循环内原生执行，
+# 上传与下载票据仍在线程池中走同步客户端。改动类操作（mutating）不设操作超时，
+# 由客户端自身的连接/读取超时兜底，避免上游结果未知时报 504 诱发重复执行
+OPS = OpRegistry()
+for _spec in (
     # 基础信息
-    "quota",
+    OpSpec("quota", "quota", cost="meta", timeout=30, cacheable=True, async_native=True),
     # 文件列表/检索
-    "list_files",
-    "list_images",
-    "list_videos",
-    "list_docs",
-    "list_bt",
-    "list_category",
-    "search_filename",
-    "search_semantic",
+    OpSpec(
+        "list_files", "list_files",
+        (Arg("dir", "dir_path", None, "/"), Arg("limit", "limit", int, 100), Arg("order", "order", str, "time"), Arg("desc", "desc", int, 1)),
+        timeout=60, cacheable=True, async_native=True,
+    ),
+    OpSpec("list_images", "list_images", _PAGED_ARGS, timeout=60, cacheable=True, async_native=True),
+    OpSpec("list_videos", "list_videos", _listall_args(0), timeout=120, concurrency=8, cacheable=True, async_native=True),
+    OpSpec("list_docs", "list_docs", _PAGED_ARGS, timeout=60, cacheable=True, async_native=True),
+    OpSpec("list_bt", "list_bt", _listall_args(0), timeout=120, concurrency=8, cacheable=True, async_native=True),
+    OpSpec(
+        "list_category", "list_category",
+        (Arg("path", "path", str, "/"), Arg("recursion", "recursion", int, 1), Arg("limit", "limit", int, 1000)),
+        timeout=120, concurrency=8, cacheable=True, async_native=True,
+    ),
+    OpSpec("search_filename", "search_filename", (Arg("key", "key", str, ""),) + _SEARCH_ARGS, timeout=60, cacheable=True, async_native=True),
+    OpSpec("search_semantic", "search_semantic", (Arg("query", "query", str, ""),) + _SEARCH_ARGS, timeout=60, concurrency=8, cacheable=True, async_native=True),
     # 文件管理
-    "mkdir",
-    "delete",
-    "move",
-    "rename",
-    "copy",
-    # 上传
-    "upload_local",
-    "upload_url",
-    "upload_text",
-    # 批量上传
-    "upload_batch_local",
-    "upload_batch_url",
-    "upload_batch_text",
-    # 播单/最近
-    "playlist",
-    "recent",
+    OpSpec(
+        "mkdir", "mkdir",
+        (Arg("path", "path", str, "/新建文件夹"), Arg("rtype", "rtype", int, omit_none=True)),
+        cost="write", mutating=True, idempotent=True, async_native=True,
+    ),
+    OpSpec("delete", "fm_delete", _FM_ARGS, cost="write", mutating=True, idempotent=True, tracks_task=True, async_native=True),
+    OpSpec("move", "fm_move", _FM_ARGS, cost="write", mutating=True, idempotent=True, tracks_task=True, async_native=True),
+    OpSpec("rename", "fm_rename", _FM_ARGS, cost="write", mutating=True, idempotent=True, tracks_task=True, async_native=True),
+    OpSpec("copy", "fm_copy", _FM_ARGS, cost="write", mutating=True, idempotent=True, tracks_task=True, async_native=True),
+    # 上传（不设超时：大文件耗时取决于文件大小，由上传调度器控制并发）
+    OpSpec(
+        "upload_local", "upload_local",
+        (Arg("local_file_path", "local_file_path", str, ""), Arg("remote_path", "remote_path", str, "/来自：mcp_server/upload.bin")),
+        cost="upload", concurrency=16, mutating=True, idempotent=True, upload_dir=(None, ("remote_path",)),
+    ),
+    OpSpec(
+        "upload_url", "upload_url",
+        (Arg("url", "url", str, ""), Arg("dir", "dir_path", str, "/"), Arg("filename", "filename")),
+        cost="upload", concurrency=16, mutating=True, idempotent=True, upload_dir=(None, ("dir", "dir_path")),
+    ),
+    OpSpec(
+        "upload_text", "upload_text",
+        (Arg("content", "content", str, ""), Arg("dir", "dir_path", str, "/"), Arg("filename", "filename")),
+        cost="upload", concurrency=16, mutating=True, idempotent=True, upload_dir=(None, ("dir",)),
+    ),
+    # 批量上传（args.stream 为真时以 NDJSON 逐条返回进度）
+    OpSpec(
+        "upload_batch_local", "upload_batch_local",
+        (Arg("file_list", None, None, []), Arg("max_concurrent", None, int, 3)),
+        cost="upload", concurrency=4, mutating=True, progress=True, idempotent=True, upload_dir=("file_list", ("remote_path",)),
+    ),
+    OpSpec(
+        "upload_batch_url", "upload_batch_url",
+        (Arg("url_list", None, None, []), Arg("max_concurrent", None, int, 3)),
+        cost="upload", concurrency=4, mutating=True, progress=True, idempotent=True, upload_dir=("url_list", ("dir_path",)),
+    ),
+    OpSpec(
+        "upload_batch_text", "upload_batch_text",
+        (Arg("text_list", None, None, []), Arg("max_concurrent", None, int, 3)),
+        cost="upload", concurrency=4, mutating=True, progress=True, idempotent=True, upload_dir=("text_list", ("dir",)),
+    ),
+    # 播单/最近（播单尚未对接）
+    OpSpec("playlist"),
+    OpSpec(
+        "recent", "recent",
+        (Arg("path", "path", str, "/"), Arg("limit", "limit", int, 50)),
+        timeout=60, cacheable=True, async_native=True,
+    ),
     # 扫描/元信息
-    "list_all",
-    "file_metas",
-    "download_links",
-    "share_create",
-    # 下载票据
-    "download_ticket",
+    OpSpec("list_all", "list_all", _listall_args(1), timeout=120, concurrency=16, cacheable=True, async_native=True),
+    # 以 NDJSON 流式返回：每行一个条目，末行为 {"done": true, "count": N} 或 {"error": ...}
+    OpSpec("list_all_stream", streaming=True),
+    OpSpec(
+        "file_metas", "file_metas",
+        (
+            Arg("fsids", "fsids", str, "[]"),
+            Arg("thumb", "thumb"),
+            Arg("extra", "extra"),
+            Arg("dlink", "dlink"),
+            Arg("path", "path"),
+            Arg("needmedia", "needmedia"),
+        ),
+        cost="meta", charge="public", timeout=30, cacheable=True, async_native=True,
+    ),
+    OpSpec("download_links", "download_links", (Arg("fsids", None, json_value, "[]"),), cost="meta", timeout=30, cacheable=True, async_native=True),
+    OpSpec(
+        "share_create", "create_share_link",
+        (
+            # 支持两种参数名：fsid_list 和 fsids
+            Arg(("fsid_list", "fsids"), "fsid_list", json_value, "[]"),
+            Arg("period", "period", int, 7),
+            Arg("pwd", "pwd", str, "1234"),
+            Arg("remark", "remark"),
+            Arg("ticket", "ticket"),
+        ),
+        cost="share", charge="public", mutating=True, idempotent=True, async_native=True,
+    ),
+    # 下载票据（计费改为在 /files/proxy_download 成功开始下载时进行）
+    OpSpec("download_ticket", handler=_download_ticket, cost="meta", timeout=30),
     # 离线下载
-    "offline_add",
-    "offline_status",
-    "offline_cancel",
-}
-
-
-def _exec_with_client(op: str, args: dict, client) -> dict:
-    # 已实现的操作
-    if op == "quota":
-        return client.quota()
-    if op == "list_files":
-        return client.list_files(
-            dir_path=args.get("dir", "/"),
-            limit=int(args.get("limit", 100)),
-            order=str(args.get("order", "time")),
-            desc=int(args.get("desc", 1)),
-        )
-    if op == "list_images":
-        return client.list_images(
-            parent_path=args.get("dir", "/"),
-            page=int(args.get("page", 1)),
-            num=int(args.get("num", 50)),
-            order=str(args.get("order", "time")),
-            desc=str(args.get("desc", "1")),
-        )
-    if op == "list_docs":
-        return client.list_docs(
-            parent_path=args.get("dir", "/"),
-            page=int(args.get("page", 1)),
-            num=int(args.get("num", 50)),
-            order=str(args.get("order", "time")),
-            desc=str(args.get("desc", "1")),
-        )
-    if op == "search_filename":
-        return client.search_filename(
-            key=str(args.get("key", "")),
-            dir_path=str(args.get("dir", "/")),
-            page=str(args.get("page", "1")),
-            num=str(args.get("num", "50")),
-            recursion=str(args.get("recursion", "1")),
-        )
-    if op == "list_videos":
-        return client.list_videos(
-            path=str(args.get("path", "/")),
-            recursion=int(args.get("recursion", 0)),
-            start=int(args.get("start", 0)),
-            limit=int(args.get("limit", 100)),
-            order=str(args.get("order", "time")),
-            desc=int(args.get("desc", 1)),
-        )
-    if op == "list_bt":
-        return client.list_bt(
-            path=str(args.get("path", "/")),
-            recursion=int(args.get("recursion", 0)),
-            start=int(args.get("start", 0)),
-            limit=int(args.get("limit", 100)),
-            order=str(args.get("order", "time")),
-            desc=int(args.get("desc", 1)),
-        )
-    if op == "list_category":
-        return client.list_category(
-            path=str(args.get("path", "/")),
-            recursion=int(args.get("recursion", 1)),
-            limit=int(args.get("limit", 1000)),
-        )
-    if op == "recent":
-        return client.recent(
-            path=str(args.get("path", "/")),
-            limit=int(args.get("limit", 50)),
-        )
-    if op == "mkdir":
-        path_val = str(args.get("path", "/新建文件夹"))
-        if args.get("rtype") is not None:
-            return client.mkdir(path=path_val, rtype=int(args.get("rtype")))
-        return client.mkdir(path=path_val)
-    if op == "search_semantic":
-        return client.search_semantic(
-            query=str(args.get("query", "")),
-            dir_path=str(args.get("dir", "/")),
-            page=str(args.get("page", "1")),
-            num=str(args.get("num", "50")),
-            recursion=str(args.get("recursion", "1")),
-        )
-    if op == "upload_local":
-        return client.upload_local(
-            local_file_path=str(args.get("local_file_path", "")),
-            remote_path=str(args.get("remote_path", "/来自：mcp_server/upload.bin")),
-        )
-    if op == "upload_url":
-        return client.upload_url(
-            url=str(args.get("url", "")),
-            dir_path=str(args.get("dir", "/")),
-            filename=args.get("filename"),
-        )
-    if op == "upload_text":
-        return client.upload_text(
-            content=str(args.get("content", "")),
-            dir_path=str(args.get("dir", "/")),
-            filename=args.get("filename"),
-        )
-    if op == "upload_batch_local":
-        file_list = args.get("file_list", [])
-        max_concurrent = int(args.get("max_concurrent", 3))
-        return client.upload_batch_local(file_list, max_concurrent)
-    if op == "upload_batch_url":
-        url_list = args.get("url_list", [])
-        max_concurrent = int(args.get("max_concurrent", 3))
-        return client.upload_batch_url(url_list, max_concurrent)
-    if op == "upload_batch_text":
-        text_list = args.get("text_list", [])
-        max_concurrent = int(args.get("max_concurrent", 3))
-        return client.upload_batch_text(text_list, max_concurrent)
-    if op == "delete":
-        return client.fm_delete(
-            filelist_json=str(args.get("filelist", "[]")),
-            async_mode=int(args.get("async", 1)),
-            ondup=args.get("ondup"),
-        )
-    if op == "move":
-        return client.fm_move(
-            filelist_json=str(args.get("filelist", "[]")),
-            async_mode=int(args.get("async", 1)),
-            ondup=args.get("ondup"),
-        )
-    if op == "rename":
-        return client.fm_rename(
-            filelist_json=str(args.get("filelist", "[]")),
-            async_mode=int(args.get("async", 1)),
-            ondup=args.get("ondup"),
-        )
-    if op == "copy":
-        return client.fm_copy(
-            filelist_json=str(args.get("filelist", "[]")),
-            async_mode=int(args.get("async", 1)),
-            ondup=args.get("ondup"),
-        )
-    if op == "list_all":
-        return client.list_all(
-            path=str(args.get("path", "/")),
-            recursion=int(args.get("recursion", 1)),
-            start=int(args.get("start", 0)),
-            limit=int(args.get("limit", 100)),
-            order=str(args.get("order", "time")),
-            desc=int(args.get("desc", 1)),
-        )
-    if op == "file_metas":
-        return client.file_metas(
-            fsids=str(args.get("fsids", "[]")),
-            thumb=args.get("thumb"),
-            extra=args.get("extra"),
-            dlink=args.get("dlink"),
-            path=args.get("path"),
-            needmedia=args.get("needmedia"),
-        )
-    if op == "download_links":
-        fsids_val = args.get("fsids", "[]")
-        try:
-            parsed = json.loads(fsids_val) if isinstance(fsids_val, str) else fsids_val
-        except Exception:
-            parsed = fsids_val
-        return client.download_links(parsed)
-    if op == "share_create":
-        # 支持两种参数名：fsid_list 和 fsids
-        fsids_val = args.get("fsid_list") or args.get("fsids", "[]")
-        try:
-            fsid_list = json.loads(fsids_val) if isinstance(fsids_val, str) else fsids_val
-        except Exception:
-            fsid_list = fsids_val
-        period = int(args.get("period", 7))
-        pwd = str(args.get("pwd", "1234"))
-        remark = args.get("remark")
-        ticket = args.get("ticket")
-        return client.create_share_link(fsid_list=fsid_list, period=period, pwd=pwd, remark=remark, ticket=ticket)
-    if op == "download_ticket":
-        # 允许通过 fsid 或直接传 dlink 申请票据
-        import time as _time
-        from app.core.config import settings
-        try:
-            import jwt as _jwt
-        except Exception:
-            return {"status": "error", "error": "pyjwt_not_installed"}
+    OpSpec(
+        "offline_add", "offline_add",
+        (Arg("url", "url", str, ""), Arg("save_path", "save_path", str, "/"), Arg("filename", "filename")),
+        cost="offline", mutating=True, async_native=True,
+    ),
+    OpSpec("offline_status", "offline_status", (Arg("task_id", "task_id"),), cost="offline", timeout=30, async_native=True),
+    OpSpec("offline_cancel", "offline_cancel", (Arg("task_id", "task_id", str, ""),), cost="offline", mutating=True, async_native=True),
+):
+    OPS.register(_spec)
+
+
+async def _dispatch_op(spec: OpSpec, args: dict, client=None, aclient=None) -> dict:
+    """在操作自身的并发上限与超时内执行；异步原生操作优先走 aclient"""
+    if spec.async_native and aclient is not None:
+        return await dispatch(spec, lambda: spec.call(aclient, args))
+    # 同步调用按上游接口分类进入各自的隔离舱线程池
+    return await dispatch(spec, lambda: bulkhead_for(spec.cost).run(spec.call, client, args))
+
+
+async def _track_task(spec: OpSpec, args: dict, data, mode: str, user_id: Optional[int]):
+    """文件管理操作由上游异步执行（返回 taskid）时登记后台任务，响应中附带 job
+
+    任务结束后通过 WebSocket 推送 {"type": "fm_job", ...}，也可查询 GET /mcp/fm_jobs/{job_id}。
+    """
+    if not spec.tracks_task or user_id is None or not isinstance(data, dict):
+        return data
+    taskid = data.get("taskid")
+    if not taskid or data.get("errno", 0) not in (0, None):
+        return data
+    job = await get_fm_job_tracker().track(user_id, mode, spec.name, str(taskid), str(args.get("filelist") or "[]"))
+    return {**data, "job": job.to_dict()}
+
+
+async def _run_op(op: str, args: dict, mode: str, user_id: Optional[int] = None) -> dict:
+    """Execute a registered op without tying up the shared threadpool on upstream I/O."""
+    spec = OPS.get(op)
+    if spec is None or spec.streaming:
+        raise NotImplementedError(op)
+    if spec.async_native and async_client_available():
+        aclient = await aget_netdisk_client(user_id=user_id, mode=mode)
+        data = await _dispatch_op(spec, args, aclient=aclient)
+    else:
+        client = await get_bulkhead("auth").run(get_netdisk_client, None, user_id, mode)
+        data = await _dispatch_op(spec, args, client=client)
+    return await _track_task(spec, args, data, mode, user_id)
+
+
+def _walk_args(args: dict) -> dict:
+    return {
+        "path": str(args.get("path", "/")),
+        "recursion": int(args.get("recursion", 1)),
+        "order": str(args.get("order", "time")),
+        "desc": int(args.get("desc", 1)),
+        "page_size": int(args.get("page_size", 1000)),
+    }
+
+
+def _ndjson(obj: dict) -> bytes:
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+async def _stream_op(op: str, args: dict, mode: str, user_id: Optional[int] = None) -> StreamingResponse:
+    """Stream a whole listing as NDJSON without materialising it in memory."""
+    walk = _walk_args(args)
+    if async_client_available():
+        aclient = await aget_netdisk_client(user_id=user_id, mode=mode)
+
+        async def _agen():
+            count = 0
+            try:
+                async for item in aclient.walk_all(**walk):
+                    count += 1
+                    yield _ndjson(item)
+            except Exception as e:
+                yield _ndjson({"error": str(e), "count": count})
+                return
+            yield _ndjson({"done": True, "count": count})
 
-        dlink: str | None = args.get("dlink")
-        fsid = args.get("fsid")
-        ttl_seconds = int(args.get("ttl", 300))  # 默认5分钟
+        return StreamingResponse(_agen(), media_type="application/x-ndjson")
 
-        if not dlink and not fsid:
-            return {"status": "error", "error": "missing_dlink_or_fsid"}
+    client = await get_bulkhead("auth").run(get_netdisk_client, None, user_id, mode)
 
-        # 若提供 fsid，则用当前 client 获取 dlink（默认走公共态由调用方控制）
-        if not dlink and fsid is not None:
-            try:
-                fsids = [int(fsid)]
-            except Exception:
-                try:
-                    fsids = [int(str(fsid))]
-                except Exception:
-                    return {"status": "error", "error": "invalid_fsid"}
-            metas = client.download_links(fsids)
-            # 兼容不同返回结构
-            items = metas.get("list") or metas.get("data", {}).get("list") or []
-            if not items:
-                return {"status": "error", "error": "dlink_not_found"}
-            first = items[0] if isinstance(items, list) else items
-            dlink = first.get("dlink") if isinstance(first, dict) else None
-            if not dlink:
-                return {"status": "error", "error": "dlink_not_found"}
-
-        now = int(_time.time())
-        # 根据客户端模式标注票据作用域：public/user
+    def _gen():
+        # 同步生成器由 Starlette 放到线程池中逐块迭代
+        count = 0
         try:
-            _mode = getattr(client, "_token_mode", "")
-            _scope = "public" if _mode == "public" else "user"
-        except Exception:
-            _scope = "user"
-        # 生成一次性票据ID（jti），用于后端去重与消费标记
-        try:
-            import uuid as _uuid
-            _jti = str(_uuid.uuid4())
-        except Exception:
-            _jti = str(now)
-        payload = {
-            "typ": "bd.dl.ticket",
-            "dlink": dlink,
-            "iat": now,
-            "exp": now + ttl_seconds,
-            "scope": _scope,
-            "jti": _jti,
-            # 可扩展字段，如文件名、fsid 等
-        }
-        token = _jwt.encode(payload, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
-        # 后端持久化票据，支持一次性与撤销管理
+            for item in client.walk_all(**walk):
+                count += 1
+                yield _ndjson(item)
+        except Exception as e:
+            yield _ndjson({"error": str(e), "count": count})
+            return
+        yield _ndjson({"done": True, "count": count})
+
+    return StreamingResponse(_gen(), media_type="application/x-ndjson")
+
+
+def _progress_error(e: Exception) -> dict:
+    if isinstance(e, UpstreamThrottled):
+        return {"error": "upstream_throttled", "retry_after": _retry_after(e)}
+    if isinstance(e, UpstreamUnavailable):
+        return {"error": "upstream_unavailable", "endpoint_class": e.endpoint_class, "retry_after": _retry_after(e)}
+    if isinstance(e, OpOverloaded):
+        return {"error": "op_overloaded", "retry_after": _retry_after(e)}
+    if isinstance(e, BulkheadFull):
+        return {"error": "bulkhead_full", "bulkhead": e.name, "retry_after": _retry_after(e)}
+    return {"error": str(e)}
+
+
+async def _progress_op(spec: OpSpec, args: dict, mode: str, user_id: Optional[int] = None) -> StreamingResponse:
+    """批量上传以 NDJSON 逐条返回进度，长批次不会在收到首字节前撞上网关/worker 超时
+
+    每完成一个条目输出一行 {"index", "total", "ok", ..., "result"}；空闲时定期输出
+    {"heartbeat": true}；末行为 {"done": true, "total", "success", "failed"} 或 {"error": ...}。
+    客户端断开后已提交的上传继续执行完毕，不会因重试而重复上传已完成的条目。
+    """
+    client = await get_bulkhead("auth").run(get_netdisk_client, None, user_id, mode)
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def _progress(record: dict) -> None:
+        # 由上传线程调用
+        loop.call_soon_threadsafe(queue.put_nowait, record)
+
+    job = asyncio.ensure_future(dispatch(spec, lambda: bulkhead_for(spec.cost).run(spec.call, client, args, progress=_progress)))
+    def _finished(fut: asyncio.Future) -> None:
+        # 客户端已断开时没人读取结果，这里先取一次异常，避免 "exception was never retrieved"
+        if not fut.cancelled():
+            fut.exception()
+        # 条目回调先于任务完成回调进入事件循环，结束标记总在最后一条进度之后
+        queue.put_nowait(None)
+
+    job.add_done_callback(_finished)
+
+    async def _agen():
+        heartbeat = float(get_settings().mcp_progress_heartbeat_seconds)
+        while True:
+            try:
+                record = await asyncio.wait_for(queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield _ndjson({"heartbeat": True})
+                continue
+            if record is None:
+                break
+            yield _ndjson(record)
         try:
-            expires_at = datetime.utcfromtimestamp(now) + timedelta(seconds=ttl_seconds)
-            with SessionLocal() as _db:
-                # 若存在同 jti 记录，避免重复插入
-                exists = _db.query(Ticket).filter(Ticket.jti == _jti).first()
-                if not exists:
-                    row = Ticket(
-                        jti=_jti,
-                        scope=_scope,
-                        user_id=getattr(getattr(client, "_user", None), "id", None),
-                        dlink=dlink,
-                        fsid=str(fsid) if fsid is not None else None,
-                        expires_at=expires_at,
-                    )
-                    _db.add(row)
-                    _db.commit()
-        except Exception as _e:
-            logger.warning("persist_ticket_failed jti=%s err=%s", _jti, _e)
-        return {
-            "status": "ok",
-            "ticket": token,
-            "expires_in": ttl_seconds,
-        }
-    
-    # 离线下载功能
-    if op == "offline_add":
-        url = str(args.get("url", ""))
-        save_path = str(args.get("save_path", "/"))
-        filename = args.get("filename")
-        return client.offline_add(url=url, save_path=save_path, filename=filename)
-    
-    if op == "offline_status":
-        task_id = args.get("task_id")
-        return client.offline_status(task_id=task_id)
-    
-    if op == "offline_cancel":
-        task_id = str(args.get("task_id", ""))
-        return client.offline_cancel(task_id=task_id)
-    
-    # 其他操作待逐步对接 openapi_client 具体方法
-    raise NotImplementedError(op)
+            summary = job.result()
+        except Exception as e:
+            logger.error("mcp.progress result op=%s error=%s", spec.name, e)
+            yield _ndjson(_progress_error(e))
+            return
+        summary = summary if isinstance(summary, dict) else {}
+        yield _ndjson({
+            "done": True,
+            "status": summary.get("status"),
+            "total": summary.get("total"),
+            "success": summary.get("success"),
+            "failed": summary.get("failed"),
+        })
+
+    return StreamingResponse(_agen(), media_type="application/x-ndjson")
+
+
+def _path_starts_with_user_upload(p: str | None) -> bool:
+    if not p:
+        return False
+    try:
+        s = str(p)
+    except Exception:
+        return False
+    s = s.strip()
+    return s == "/用户上传" or s.startswith("/用户上传/")
+
+
+def _enforce_upload_dir(spec: OpSpec, args: dict) -> None:
+    """上传操作只允许写入 /用户上传 目录（路径字段由操作声明）"""
+    if spec.upload_dir is None:
+        return
+    list_key, path_keys = spec.upload_dir
+    items = (args.get(list_key) or []) if list_key else [args]
+    for it in items:
+        it = it if isinstance(it, dict) else {}
+        if not _path_starts_with_user_upload(next((it.get(k) for k in path_keys if it.get(k)), None)):
+            raise HTTPException(status_code=400, detail="upload_dir_not_allowed")
+
+
+def _safe_args_preview(d: dict) -> dict:
+    # 日志只输出路径类字段，避免记录敏感内容
+    keys = {
+        "dir", "dir_path", "filename", "url", "remote_path", "local_file_path",
+        "url_list", "text_list", "file_list", "fsids", "fsid_list", "path", "key"
+    }
+    return {k: d.get(k) for k in keys if k in d}
+
+
+def _idempotency_error(error: str, key: str, status_code: int, **extra) -> JSONResponse:
+    headers = {"Retry-After": str(extra["retry_after"])} if "retry_after" in extra else None
+    return JSONResponse({"status": "error", "error": error, "idempotency_key": key, **extra}, status_code=status_code, headers=headers)
+
+
+async def _idempotent_exec(spec: OpSpec, args: dict, key: str, current: User, scope: str, run) -> JSONResponse:
+    """带 Idempotency-Key 的改动类操作：同一用户同键只执行一次
+
+    成功结果按用户、作用域与键保存（idempotency_ttl_hours），重试直接返回保存的结果而不再请求上游；
+    首个请求仍在执行时，重复请求等待其完成；同键不同参数返回 422。失败结果不保存，重试会重新执行。
+    """
+    key = key.strip()
+    if not key or len(key) > 255:
+        return _idempotency_error("invalid_idempotency_key", key, 400)
+    if spec.streaming or (spec.progress and args.get("stream")):
+        # 流式响应无法整体保存与重放
+        return _idempotency_error("idempotency_not_supported_for_stream", key, 400, op=spec.name)
+    first: dict = {}
+
+    async def _run() -> tuple[int, dict]:
+        resp = first["response"] = await run()
+        return resp.status_code, json.loads(resp.body)
+
+    try:
+        status_code, body, replayed = await run_idempotent(current.id, scope, key, spec.name, request_fingerprint(spec.name, args), _run)
+    except IdempotencyKeyReused:
+        return _idempotency_error("idempotency_key_reused", key, 422, op=spec.name)
+    except IdempotencyInProgress as e:
+        return _idempotency_error("idempotency_in_progress", key, 409, op=spec.name, retry_after=_retry_after(e))
+    if replayed:
+        logger.info("mcp.%s replay op=%s user=%s key=%s", scope, spec.name, current.username, key)
+        return JSONResponse(body, status_code=status_code, headers={"Idempotency-Key": key, "Idempotent-Replayed": "true"})
+    resp = first["response"]
+    resp.headers["Idempotency-Key"] = key
+    return resp
 
 
 @router.post("/public/exec")
-def public_exec(payload: dict, current: User = Depends(get_current_user), db: Session = Depends(get_db)) -> JSONResponse:
+async def public_exec(
+    payload: dict,
+    current: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+) -> JSONResponse:
     op = str(payload.get("op", "")).strip()
     args = payload.get("args") or {}
-    if op not in ALLOWED_OPS:
+    spec = OPS.get(op)
+    if spec is None:
         return JSONResponse({"status": "error", "error": "op_not_allowed", "op": op}, status_code=400)
-    try:
-        # temporary debug: safe args preview (avoid sensitive fields)
-        def _safe_args_preview(d: dict) -> dict:
-            keys = {
-                "dir", "dir_path", "filename", "url", "remote_path", "local_file_path",
-                "url_list", "text_list", "file_list", "fsids", "fsid_list", "path", "key"
-            }
-            return {k: d.get(k) for k in keys if k in d}
+    if idempotency_key is not None and spec.idempotent:
+        return await _idempotent_exec(spec, args, idempotency_key, current, "public", lambda: _public_exec(spec, args, current, db))
+    return await _public_exec(spec, args, current, db)
 
-        logger.info(f"mcp.public op=%s user=%s args=%s", op, current.username, _safe_args_preview(args))
-        # ---- Upload directory enforcement ----
-        def _path_starts_with_user_upload(p: str | None) -> bool:
-            if not p:
-                return False
-            try:
-                s = str(p)
-            except Exception:
-                return False
-            s = s.strip()
-            return s == "/用户上传" or s.startswith("/用户上传/")
-
-        def _enforce_upload_dir(op_name: str, op_args: dict) -> None:
-            # Only enforce for upload ops
-            if op_name in {"upload_url"}:
-                if not _path_starts_with_user_upload(op_args.get("dir") or op_args.get("dir_path")):
-                    raise HTTPException(status_code=400, detail="upload_dir_not_allowed")
-            if op_name in {"upload_text"}:
-                if not _path_starts_with_user_upload(op_args.get("dir")):
-                    raise HTTPException(status_code=400, detail="upload_dir_not_allowed")
-            if op_name in {"upload_local"}:
-                if not _path_starts_with_user_upload(op_args.get("remote_path")):
-                    raise HTTPException(status_code=400, detail="upload_dir_not_allowed")
-            if op_name in {"upload_batch_url"}:
-                items = op_args.get("url_list") or []
-                for it in items:
-                    if not _path_starts_with_user_upload((it or {}).get("dir_path")):
-                        raise HTTPException(status_code=400, detail="upload_dir_not_allowed")
-            if op_name in {"upload_batch_text"}:
-                items = op_args.get("text_list") or []
-                for it in items:
-                    if not _path_starts_with_user_upload((it or {}).get("dir")):
-                        raise HTTPException(status_code=400, detail="upload_dir_not_allowed")
-            if op_name in {"upload_batch_local"}:
-                items = op_args.get("file_list") or []
-                for it in items:
-                    if not _path_starts_with_user_upload((it or {}).get("remote_path")):
-                        raise HTTPException(status_code=400, detail="upload_dir_not_allowed")
-
-        if op.startswith("upload_"):
-            _enforce_upload_dir(op, args)
 
+async def _public_exec(spec: OpSpec, args: dict, current: User, db: Session) -> JSONResponse:
+    op = spec.name
+    try:
+        logger.info(f"mcp.public op=%s user=%s args=%s", op, current.username, _safe_args_preview(args))
+        _enforce_upload_dir(spec, args)
         # Charge quota for public-mode operations too, except for space quota queries
-        # 注意：download_ticket 改为在 /files/proxy_download 成功开始下载时计费
-        CHARGE_OPS = {"share_create", "file_metas"}
-        if op in CHARGE_OPS:
-            check_and_consume_quota(current, db)
-        client = get_netdisk_client(mode="public")
+        if spec.charge == "public":
+            await run_in_threadpool(check_and_consume_quota, current, db)
+        if spec.streaming:
+            return await _stream_op(op, args, mode="public", user_id=current.id)
+        if spec.progress and args.get("stream"):
+            return await _progress_op(spec, args, mode="public", user_id=current.id)
         try:
-            data = _exec_with_client(op, args, client)
+            # 传入 user_id 仅用于上传调度的按用户公平排队，令牌仍是服务账户令牌
+            data = await _run_op(op, args, mode="public", user_id=current.id)
             logger.info(f"mcp.public result op=%s status=ok", op)
         except Exception as e:
             logger.error("mcp.public result op=%s error=%s", op, e)
@@ -451,12 +606,27 @@ def public_exec(payload: dict, current: User = Depends(get_current_user), db: Se
         return JSONResponse({"status": "ok", "data": data})
     except NotImplementedError:
         return JSONResponse({"status": "error", "error": "op_not_implemented", "op": op}, status_code=400)
+    except UpstreamThrottled as e:
+        return throttled_response(e, op)
+    except UpstreamUnavailable as e:
+        return unavailable_response(e, op)
+    except OpOverloaded as e:
+        return overloaded_response(e)
+    except OpTimeout as e:
+        return op_timeout_response(e)
+    except BulkheadFull as e:
+        return bulkhead_full_response(e)
     except Exception as e:
         # 尝试从 HTTPError 中提取原始响应体，便于定位（如 MAC check failed、errno 等）
         try:
             from urllib.error import HTTPError
+            body = None
             if isinstance(e, HTTPError) and e.fp is not None:
                 body = e.fp.read().decode("utf-8", errors="ignore")
+            elif getattr(e, "response", None) is not None and hasattr(e.response, "text"):
+                # AsyncNetdiskClient (httpx.HTTPStatusError)
+                body = e.response.text
+            if body is not None:
                 try:
                     import json as _json
                     parsed = _json.loads(body)
@@ -475,64 +645,36 @@ def public_exec(payload: dict, current: User = Depends(get_current_user), db: Se
 
 
 @router.post("/user/exec")
-def user_exec(payload: dict, current: User = Depends(get_current_user), db: Session = Depends(get_db)) -> JSONResponse:
+async def user_exec(
+    payload: dict,
+    current: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+) -> JSONResponse:
     op = str(payload.get("op", "")).strip()
     args = payload.get("args") or {}
-    if op not in ALLOWED_OPS:
+    spec = OPS.get(op)
+    if spec is None:
         return JSONResponse({"status": "error", "error": "op_not_allowed", "op": op}, status_code=400)
+    if idempotency_key is not None and spec.idempotent:
+        return await _idempotent_exec(spec, args, idempotency_key, current, "user", lambda: _user_exec(spec, args, current))
+    return await _user_exec(spec, args, current)
+
+
+async def _user_exec(spec: OpSpec, args: dict, current: User) -> JSONResponse:
+    op = spec.name
     # 用户态不计入日配额（download_ticket/share_create/file_metas 等均不扣减），
     # 仅公共态在 /mcp/public/exec 中计费。
-    # temporary debug: safe args preview
-    def _safe_args_preview_user(d: dict) -> dict:
-        keys = {
-            "dir", "dir_path", "filename", "url", "remote_path", "local_file_path",
-            "url_list", "text_list", "file_list", "fsids", "fsid_list", "path", "key"
-        }
-        return {k: d.get(k) for k in keys if k in d}
-    logger.info("mcp.user op=%s user=%s args=%s", op, current.username, _safe_args_preview_user(args))
+    logger.info("mcp.user op=%s user=%s args=%s", op, current.username, _safe_args_preview(args))
     # Enforce upload directory for user mode as well
-    if op.startswith("upload_"):
-        def _path_starts_with_user_upload(p: str | None) -> bool:
-            if not p:
-                return False
-            try:
-                s = str(p)
-            except Exception:
-                return False
-            s = s.strip()
-            return s == "/用户上传" or s.startswith("/用户上传/")
-
-        def _enforce_upload_dir_user(op_name: str, op_args: dict) -> None:
-            if op_name in {"upload_url"}:
-                if not _path_starts_with_user_upload(op_args.get("dir") or op_args.get("dir_path")):
-                    raise HTTPException(status_code=400, detail="upload_dir_not_allowed")
-            if op_name in {"upload_text"}:
-                if not _path_starts_with_user_upload(op_args.get("dir")):
-                    raise HTTPException(status_code=400, detail="upload_dir_not_allowed")
-            if op_name in {"upload_local"}:
-                if not _path_starts_with_user_upload(op_args.get("remote_path")):
-                    raise HTTPException(status_code=400, detail="upload_dir_not_allowed")
-            if op_name in {"upload_batch_url"}:
-                items = op_args.get("url_list") or []
-                for it in items:
-                    if not _path_starts_with_user_upload((it or {}).get("dir_path")):
-                        raise HTTPException(status_code=400, detail="upload_dir_not_allowed")
-            if op_name in {"upload_batch_text"}:
-                items = op_args.get("text_list") or []
-                for it in items:
-                    if not _path_starts_with_user_upload((it or {}).get("dir")):
-                        raise HTTPException(status_code=400, detail="upload_dir_not_allowed")
-            if op_name in {"upload_batch_local"}:
-                items = op_args.get("file_list") or []
-                for it in items:
-                    if not _path_starts_with_user_upload((it or {}).get("remote_path")):
-                        raise HTTPException(status_code=400, detail="upload_dir_not_allowed")
-
-        _enforce_upload_dir_user(op, args)
+    _enforce_upload_dir(spec, args)
     try:
-        client = get_netdisk_client(user_id=current.id, mode="user")
+        if spec.streaming:
+            return await _stream_op(op, args, mode="user", user_id=current.id)
+        if spec.progress and args.get("stream"):
+            return await _progress_op(spec, args, mode="user", user_id=current.id)
         try:
-            data = _exec_with_client(op, args, client)
+            data = await _run_op(op, args, mode="user", user_id=current.id)
             logger.info("mcp.user result op=%s status=ok", op)
         except Exception as e:
             logger.error("mcp.user result op=%s error=%s", op, e)
@@ -540,6 +682,217 @@ def user_exec(payload: dict, current: User = Depends(get_current_user), db: Sess
         return JSONResponse({"status": "ok", "data": data})
     except NotImplementedError:
         return JSONResponse({"status": "error", "error": "op_not_implemented", "op": op}, status_code=400)
+    except UpstreamThrottled as e:
+        return throttled_response(e, op)
+    except UpstreamUnavailable as e:
+        return unavailable_response(e, op)
+    except OpOverloaded as e:
+        return overloaded_response(e)
+    except OpTimeout as e:
+        return op_timeout_response(e)
+    except BulkheadFull as e:
+        return bulkhead_full_response(e)
     except Exception as e:
         return JSONResponse({"status": "error", "error": str(e)}, status_code=200)
 
+
+@router.get("/fm_jobs/{job_id}")
+async def fm_job_status(job_id: int, current: User = Depends(get_current_user)) -> JSONResponse:
+    """查询文件管理异步任务（未连接 WebSocket 时的兜底）"""
+    job = await run_in_threadpool(FmJobStore().get, current.id, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job_not_found")
+    return JSONResponse({"status": "ok", "data": job.to_dict()})
+
+
+# ---- Batch exec ----
+
+class _BatchClients:
+    """一次批量请求共用的令牌与客户端：令牌只解析一次，同步/异步客户端各按需建一个"""
+
+    def __init__(self, token: str, user_id: Optional[int], mode: str) -> None:
+        self._token = token
+        self.user_id = user_id
+        self.mode = mode
+        self._client: Optional[NetdiskClient] = None
+        self._aclient: Optional[AsyncNetdiskClient] = None
+
+    def sync_client(self) -> NetdiskClient:
+        if self._client is None:
+            self._client = NetdiskClient(self._token, self.user_id, self.mode, token_resolved=True)
+        return self._client
+
+    def async_client(self) -> AsyncNetdiskClient:
+        if self._aclient is None:
+            self._aclient = netdisk_client_for_token(self._token, self.user_id, self.mode)
+        return self._aclient
+
+
+def _batch_stages(specs: list[Optional[OpSpec]], sequential: bool) -> list[list[int]]:
+    """按顺序切分执行阶段：连续的只读操作并发执行，改动类操作单独成一段（作为屏障）"""
+    stages: list[list[int]] = []
+    current: list[int] = []
+    for i, spec in enumerate(specs):
+        if sequential or (spec is not None and spec.mutating):
+            if current:
+                stages.append(current)
+                current = []
+            stages.append([i])
+        else:
+            current.append(i)
+    if current:
+        stages.append(current)
+    return stages
+
+
+def _charge_batch(current: User, db: Session, indices: list[int]) -> set[int]:
+    """按顺序逐个扣减配额，返回额度不足的下标（同一 Session 不能并发使用，故集中在此处扣减）"""
+    denied: set[int] = set()
+    for i in indices:
+        try:
+            check_and_consume_quota(current, db)
+        except HTTPException:
+            denied.add(i)
+    return denied
+
+
+async def _batch_run_one(spec: OpSpec, args: dict, clients: _BatchClients, sem: asyncio.Semaphore) -> dict:
+    entry: dict = {"op": spec.name}
+    async with sem:
+        started = time.perf_counter()
+        try:
+            if spec.async_native and async_client_available():
+                data = await _dispatch_op(spec, args, aclient=clients.async_client())
+            else:
+                data = await _dispatch_op(spec, args, client=clients.sync_client())
+            data = await _track_task(spec, args, data, clients.mode, clients.user_id)
+            entry.update(status="ok", data=data)
+        except NotImplementedError:
+            entry.update(status="error", error="op_not_implemented")
+        except UpstreamThrottled as e:
+            entry.update(status="error", error="upstream_throttled", retry_after=_retry_after(e))
+        except UpstreamUnavailable as e:
+            entry.update(status="error", error="upstream_unavailable", endpoint_class=e.endpoint_class, retry_after=_retry_after(e))
+        except OpOverloaded as e:
+            entry.update(status="error", error="op_overloaded", retry_after=_retry_after(e))
+        except OpTimeout as e:
+            entry.update(status="error", error="op_timeout", timeout=e.timeout)
+        except BulkheadFull as e:
+            entry.update(status="error", error="bulkhead_full", bulkhead=e.name, retry_after=_retry_after(e))
+        except HTTPException as e:
+            entry.update(status="error", error=e.detail)
+        except Exception as e:
+            logger.error("mcp.batch result op=%s error=%s", spec.name, e)
+            entry.update(status="error", error=str(e))
+        entry["elapsed_ms"] = round((time.perf_counter() - started) * 1000.0, 2)
+    return entry
+
+
+async def _batch_run_stage(stage: list[int], specs: list[OpSpec], op_args: list[dict], clients: _BatchClients, sem: asyncio.Semaphore) -> dict[int, dict]:
+    """并发执行一个阶段；可缓存的操作参数相同时只执行一次，结果共享"""
+    keys: dict[int, object] = {}
+    for i in stage:
+        if specs[i].cacheable:
+            keys[i] = (specs[i].name, json.dumps(op_args[i], sort_keys=True, default=str))
+        else:
+            keys[i] = i
+    first: dict[object, int] = {}
+    for i in stage:
+        first.setdefault(keys[i], i)
+    leaders = list(first.values())
+    done = await asyncio.gather(*(_batch_run_one(specs[i], op_args[i], clients, sem) for i in leaders))
+    by_leader = dict(zip(leaders, done))
+    results: dict[int, dict] = {}
+    for i in stage:
+        leader = first[keys[i]]
+        entry = {"index": i, **by_leader[leader]}
+        if leader != i:
+            entry["deduplicated_from"] = leader
+        results[i] = entry
+    return results
+
+
+@router.post("/{scope}/exec_batch")
+async def exec_batch(scope: str, payload: dict, current: User = Depends(get_current_user), db: Session = Depends(get_db)) -> JSONResponse:
+    """按顺序执行一组 {op,args}：共用一次鉴权、一个令牌与客户端，结果与耗时逐项返回
+
+    连续的只读操作在单请求并发上限内并发执行；改动类操作（mkdir/上传/文件管理等）
+    作为屏障按顺序执行。payload: {"ops": [{"op": ..., "args": {...}}], "concurrency": N, "sequential": false}
+    """
+    if scope not in {"public", "user"}:
+        raise HTTPException(status_code=404, detail="scope_not_found")
+    settings = get_settings()
+    items = payload.get("ops")
+    if not isinstance(items, list) or not items:
+        return JSONResponse({"status": "error", "error": "invalid_batch"}, status_code=400)
+    max_ops = int(settings.mcp_batch_max_ops)
+    if len(items) > max_ops:
+        return JSONResponse({"status": "error", "error": "batch_too_large", "max_ops": max_ops}, status_code=400)
+    limit = max(int(settings.mcp_batch_concurrency), 1)
+    try:
+        if payload.get("concurrency") is not None:
+            limit = max(min(int(payload.get("concurrency")), limit), 1)
+    except (TypeError, ValueError):
+        return JSONResponse({"status": "error", "error": "invalid_concurrency"}, status_code=400)
+
+    started = time.perf_counter()
+    ops: list[str] = []
+    specs: list[Optional[OpSpec]] = []
+    op_args: list[dict] = []
+    results: list[Optional[dict]] = [None] * len(items)
+    for i, item in enumerate(items):
+        item = item if isinstance(item, dict) else {}
+        op = str(item.get("op", "")).strip()
+        args = item.get("args") or {}
+        spec = OPS.get(op)
+        ops.append(op)
+        specs.append(spec)
+        op_args.append(args if isinstance(args, dict) else {})
+        error = None
+        if spec is None:
+            error = "op_not_allowed"
+        elif spec.streaming:
+            error = "op_not_batchable"
+        elif not isinstance(args, dict):
+            error = "invalid_args"
+        else:
+            try:
+                _enforce_upload_dir(spec, args)
+            except HTTPException as e:
+                error = e.detail
+        if error is not None:
+            results[i] = {"index": i, "op": op, "status": "error", "error": error, "elapsed_ms": 0.0}
+
+    pending = [i for i in range(len(items)) if results[i] is None]
+    logger.info("mcp.batch scope=%s user=%s ops=%d runnable=%d concurrency=%d", scope, current.username, len(items), len(pending), limit)
+    if scope == "public":
+        charged = [i for i in pending if specs[i].charge == "public"]
+        if charged:
+            for i in await run_in_threadpool(_charge_batch, current, db, charged):
+                results[i] = {"index": i, "op": ops[i], "status": "error", "error": "daily_quota_exceeded", "elapsed_ms": 0.0}
+        pending = [i for i in pending if results[i] is None]
+
+    if pending:
+        try:
+            # 传入 user_id：用户态取用户令牌；公共态仍用服务令牌，仅用于上传调度的按用户排队
+            token = await get_bulkhead("auth").run(resolve_access_token, None, current.id, scope)
+        except BulkheadFull as e:
+            return bulkhead_full_response(e)
+        except Exception as e:
+            return JSONResponse({"status": "error", "error": str(e)}, status_code=200)
+        clients = _BatchClients(token, current.id, scope)
+        sem = asyncio.Semaphore(limit)
+        runnable = set(pending)
+        for stage in _batch_stages(specs, bool(payload.get("sequential"))):
+            stage = [i for i in stage if i in runnable]
+            if not stage:
+                continue
+            for i, entry in (await _batch_run_stage(stage, specs, op_args, clients, sem)).items():
+                results[i] = entry
+
+    return JSONResponse({
+        "status": "ok",
+        "scope": scope,
+        "results": results,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000.0, 2),
+    })
@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 from app.core.db import get_db
 from app.deps.auth import get_current_user
 from app.models.user import User
+from app.services.bulkhead import bulkhead_route
 from app.services.token_store import TokenStore
 from app.services.ws_manager import manager
 from app.core.config import get_settings
@@ -20,6 +21,7 @@ router = APIRouter(prefix="/oauth", tags=["oauth"])
 
 
 @router.post("/device/start")
+@bulkhead_route("auth")
 def device_start(current: User = Depends(get_current_user), db: Session = Depends(get_db)) -> JSONResponse:
     store = TokenStore(db)
     data = store.start_device_code()
@@ -43,6 +45,7 @@ def device_start(current: User = Depends(get_current_user), db: Session = Depend
 
 
 @router.post("/device/poll")
+@bulkhead_route("auth")
 def device_poll(device_code: str, current: User = Depends(get_current_user), db: Session = Depends(get_db)) -> JSONResponse:
     store = TokenStore(db)
     try:
@@ -73,6 +76,7 @@ def device_poll(device_code: str, current: User = Depends(get_current_user), db:
 
 
 @router.get("/token")
+@bulkhead_route("auth")
 def token_masked(current: User = Depends(get_current_user), db: Session = Depends(get_db)) -> JSONResponse:
     store = TokenStore(db)
     tok = store.get_user_token(current.id)
@@ -91,6 +95,7 @@ def token_masked(current: User = Depends(get_current_user), db: Session = Depend
 
 # ---- Service (public) token device flow ----
 @router.post("/service/device/start")
+@bulkhead_route("auth")
 def service_device_start(admin_secret: str, current: User = Depends(get_current_user), db: Session = Depends(get_db)) -> JSONResponse:
     if admin_secret != get_settings().admin_secret:
         raise HTTPException(status_code=401, detail="invalid admin_secret")
@@ -106,6 +111,7 @@ def service_device_start(admin_secret: str, current: User = Depends(get_current_
 
 
 @router.post("/service/device/poll")
+@bulkhead_route("auth")
 def service_device_poll(device_code: str, admin_secret: str, current: User = Depends(get_current_user), db: Session = Depends(get_db)) -> JSONResponse:
     if admin_secret != get_settings().admin_secret:
         raise HTTPException(status_code=401, detail="invalid admin_secret")
@@ -167,12 +173,18 @@ MOBILE_HTML_BASE = """
 
 
 @router.get("/callback", response_class=HTMLResponse)
+@bulkhead_route("auth")
 def oauth_callback(code: str, state: str | None = None, db: Session = Depends(get_db)) -> HTMLResponse:
     """统一回调：通过 state 区分 user / service。
 
     - state == 'service' → 作为服务账户令牌保存
     - 其他或空 → 保存为当前用户令牌
     """
+    return _handle_oauth_callback(code, state, db)
+
+
+def _handle_oauth_callback(code: str, state: str | None, db: Session) -> HTMLResponse:
+    # 回调逻辑不带隔离舱装饰，供多个路由在各自的隔离舱线程中直接调用
     store = TokenStore(db)
     # 交换 token
     if state == "service":
@@ -225,11 +237,13 @@ def oauth_callback(code: str, state: str | None = None, db: Session = Depends(ge
 # ---- Authorization Code flow (service/public) ----
 # 兼容旧地址：保留但内部转发到统一逻辑
 @router.get("/service/callback")
+@bulkhead_route("auth")
 def oauth_service_callback_compat(code: str, db: Session = Depends(get_db)) -> JSONResponse:
-    return oauth_callback(code=code, state="service", db=db)
+    return _handle_oauth_callback(code, "service", db)
 
 
 @router.get("/service/token")
+@bulkhead_route("auth")
 def service_token_masked(current: User = Depends(get_current_user), db: Session = Depends(get_db)) -> JSONResponse:
     store = TokenStore(db)
     tok = store.get_service_token()
@@ -247,6 +261,7 @@ def service_token_masked(current: User = Depends(get_current_user), db: Session
 
 
 @router.get("/service/token/raw")
+@bulkhead_route("auth")
 def service_token_raw(admin_secret: str = Query(...), db: Session = Depends(get_db)) -> JSONResponse:
     """Return unmasked service (public) token. Admin secret required."""
     if admin_secret != get_settings().admin_secret:
@@ -266,6 +281,7 @@ def service_token_raw(admin_secret: str = Query(...), db: Session = Depends(get_
 
 # ---- User token upsert (frontend provides user access/refresh) ----
 @router.post("/user/token/upsert")
+@bulkhead_route("auth")
 def user_token_upsert(
     access_token: str,
     refresh_token: str | None = None,
@@ -284,6 +300,7 @@ def user_token_upsert(
 
 # ---- 自动扫码授权（无需JWT认证） ----
 @router.post("/device/start_auto")
+@bulkhead_route("auth")
 def device_start_auto(db: Session = Depends(get_db)) -> JSONResponse:
     """启动自动授权流程，无需JWT认证"""
     store = TokenStore(db)
@@ -329,6 +346,7 @@ def device_start_auto(db: Session = Depends(get_db)) -> JSONResponse:
 
 
 @router.post("/device/poll_auto")
+@bulkhead_route("auth")
 def device_poll_auto(device_code: str, device_fingerprint: str = None, db: Session = Depends(get_db)) -> JSONResponse:
     """轮询自动授权状态，自动创建用户账号"""
     store = TokenStore(db)
@@ -12,6 +12,7 @@ from fastapi.responses import JSONResponse
 
 from app.deps.auth import get_current_user
 from app.models.user import User
+from app.services.bulkhead import BulkheadFull, get_bulkhead
 from app.services.mcp_client import get_netdisk_client
 from app.services.file_service import FileService
 
@@ -102,10 +103,10 @@ async def upload_public(
             # 查重失败不阻塞上传
             pass
 
-        # 调用公共态客户端执行上传
-        client = get_netdisk_client(mode="public")
+        # 调用公共态客户端执行上传（同步调用放到对应隔离舱，不阻塞事件循环）
+        client = await get_bulkhead("auth").run(get_netdisk_client, mode="public")
         remote_path = f"{target_dir.rstrip('/')}/{save_name}"
-        data = client.upload_local(local_file_path=tmp_path, remote_path=remote_path)
+        data = await get_bulkhead("upload").run(client.upload_local, local_file_path=tmp_path, remote_path=remote_path)
         # 解析 SDK 结果，尽量获取 fs_id、md5、size、category、ctime/mtime
         fs_id: Optional[int] = None
         file_md5: Optional[str] = None
@@ -141,7 +142,7 @@ async def upload_public(
         # 若开启 enrich，则通过 file_metas 补齐权威信息（默认关闭以提升速度）
         if enrich and fs_id and (not file_md5 or not size_val or category_val is None or not ctime_val or not mtime_val):
             try:
-                metas = client.file_metas(fsids=json.dumps([int(fs_id)]))
+                metas = await get_bulkhead("list").run(client.file_metas, fsids=json.dumps([int(fs_id)]))
                 # 解析与脚本相同逻辑
                 candidates = []
                 if isinstance(metas, dict):
@@ -201,7 +202,7 @@ async def upload_public(
             pass
 
         return JSONResponse({"status": "ok", "data": data, "remote_path": remote_path})
-    except HTTPException:
+    except (HTTPException, BulkheadFull):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"upload_failed: {str(e)}")
@@ -42,6 +42,85 @@ class Settings(BaseSettings):
     baidu_service_redirect_uri: str | None = None  # 可单独配置服务账户回调，如未配置将自动推断为 /oauth/service/callback
     baidu_app_id: str | None = None  # 分享等部分接口需要 appid
 
+    # Upstream HTTP pool (shared by all NetdiskClient instances in a process)
+    netdisk_http_num_pools: int = 8  # 同时保留连接池的上游主机数
+    netdisk_http_pool_maxsize: int = 16  # 每个主机保留的连接数
+    netdisk_http_keepalive: bool = True
+    netdisk_http_keepalive_idle_seconds: int = 60
+    netdisk_http_connect_timeout_seconds: float = 5.0
+    netdisk_http_read_timeout_seconds: float = 30.0
+    netdisk_http_retries: int = 2  # 连接失败/幂等请求 5xx 的重试次数
+    netdisk_http_upload_pool_maxsize: int = 32  # d.pcs.baidu.com（分片上传）的连接数；0 与其他主机相同
+    netdisk_http_pool_block: bool = False  # 连接用满时排队等待空闲连接，而不是临时新建后丢弃
+    netdisk_http_pool_timeout_seconds: float = 10.0  # 排队等待空闲连接的上限
+    netdisk_async_max_connections: int = 100  # AsyncNetdiskClient 总连接上限
+    netdisk_raw_json: bool = True  # SDK 调用跳过模型反序列化，直接解析 JSON（有 orjson 时更快）
+    meta_coalesce_window_ms: float = 5.0  # 同键已有 filemetas 调用在途时，合并后续查询的等待窗口（0 关闭合并）
+    meta_cache_ttl_seconds: float = 600.0  # fsid 元信息/dlink 缓存时长，需远小于 dlink 有效期（约 8 小时）；0 关闭
+    meta_cache_max_entries: int = 20000
+    listing_cache_ttl_seconds: float = 30.0  # 目录列表视为新鲜的时长；0 关闭列表缓存
+    listing_cache_stale_seconds: float = 300.0  # 过期后仍可先返回旧值并后台刷新的时长
+    listing_cache_max_entries: int = 5000
+    cache_invalidation_poll_seconds: float = 1.0  # 多 worker 时写出/回放缓存失效记录的间隔（跨进程失效最多延迟约两个间隔）
+    cache_invalidation_retention_seconds: float = 600.0  # 失效记录保留时长，需远大于回放间隔
+    # 上游速率调节（按令牌作用域的 AIMD 令牌桶）
+    upstream_governor_enabled: bool = True
+    upstream_governor_initial_rate: float = 10.0  # 每令牌初始 req/s
+    upstream_governor_min_rate: float = 0.5
+    upstream_governor_max_rate: float = 50.0
+    upstream_governor_increase: float = 1.0  # 无频控时每秒约增加的 req/s
+    upstream_governor_decrease: float = 0.5  # 命中频控时速率乘以该系数
+    upstream_governor_max_wait_seconds: float = 5.0  # 排队超过该时长则直接拒绝
+    # 上游熔断（按接口分类：list/meta/write/upload/share/offline）
+    breaker_failure_threshold: int = 5  # 连续失败（超时/连接错误/5xx）次数达到后熔断
+    breaker_cooldown_seconds: float = 30.0  # 熔断后快速失败的时长，之后放行一个探测请求
+    # 对冲请求（仅 list/meta 等幂等读取）
+    hedge_enabled: bool = False
+    hedge_percentile: float = 0.95  # 首个请求超过该耗时分位仍未返回则再发一个
+    hedge_min_delay_ms: float = 500.0  # 对冲等待下限，样本不足时也用该值
+    hedge_pool_size: int = 32
+    netdisk_api_base: str = "https://pan.baidu.com"  # 仅供压测时指向本地替身
+    # /mcp exec：批量请求与按操作的并发排队
+    mcp_batch_max_ops: int = 50  # 单次批量请求最多包含的操作数
+    mcp_batch_concurrency: int = 4  # 单次批量请求内同时执行的操作数上限（请求可调小，不可调大）
+    mcp_op_queue_timeout_seconds: float = 2.0  # 操作并发名额已满时的排队上限，超过返回 503 op_overloaded
+    mcp_progress_heartbeat_seconds: float = 15.0  # 批量上传流式进度无新条目时的心跳间隔
+    # Idempotency-Key：改动类操作的结果按用户与键保存，重试直接返回已保存结果
+    idempotency_ttl_hours: int = 24
+    idempotency_wait_seconds: float = 30.0  # 同键请求执行中时的等待上限，超过返回 409 idempotency_in_progress
+    idempotency_pending_lease_seconds: float = 3600.0  # 执行中记录的租约，超过视为执行进程已退出
+    # 文件管理异步任务（delete/move/rename/copy 返回 taskid）的后台轮询
+    fm_job_poll_initial_seconds: float = 1.0  # 首次查询延迟，之后每次翻倍
+    fm_job_poll_max_seconds: float = 30.0  # 轮询间隔上限
+    fm_job_poll_batch: int = 50  # 每轮最多查询的任务数
+    fm_job_poll_concurrency: int = 8  # 每轮同时进行的查询数
+    fm_job_max_seconds: float = 3600.0  # 超过该时长仍未结束则标记为 timeout 并停止轮询
+    fm_job_keep_hours: int = 24  # 已结束任务的保留时长
+    fm_job_lease_seconds: float = 120.0  # worker 认领到期任务后的租约，期间其他 worker 不再查询该任务
+    fm_job_notify_poll_seconds: float = 2.0  # 各 worker 检查本机连接用户待推送完成事件的间隔
+    # 同步调用的隔离舱（各自独立的有界线程池，排队满即返回 503 bulkhead_full）
+    bulkhead_upload_workers: int = 16
+    bulkhead_upload_queue: int = 64
+    bulkhead_list_workers: int = 32  # 列表/检索/元信息
+    bulkhead_list_queue: int = 256
+    bulkhead_fm_workers: int = 16  # 文件管理/分享/离线下载
+    bulkhead_fm_queue: int = 64
+    bulkhead_auth_workers: int = 8  # /oauth/* 与令牌解析（含刷新）
+    bulkhead_auth_queue: int = 64
+
+    # Uploads
+    upload_block_size_mb: int = 4  # 普通用户分片上限 4MB，会员可调大
+    upload_part_concurrency: int = 4  # 单文件并行上传的分片数（同时受 upload_token_part_concurrency 约束）
+    upload_part_retries: int = 3
+    upload_global_concurrency: int = 8  # 进程内批量上传同时执行的条目数
+    upload_per_user_concurrency: int = 3  # 单个用户同时执行的条目数
+    upload_token_starts_per_second: float = 5.0  # 同一百度令牌每秒最多启动的上传条目数（0 为不限）
+    # 同一百度令牌在本进程内同时进行的分片请求上限，所有上传任务共享（0 为不限）；
+    # 实际并发为 min(本值, upload_global_concurrency × upload_part_concurrency)，多 worker 时再乘以 worker 数
+    upload_token_part_concurrency: int = 8
+    upload_inmemory_max_mb: int = 8  # 不超过此大小的文本/字节负载直接在内存中上传
+    upload_session_ttl_hours: int = 24  # 未完成的上传会话保留时长（百度 uploadid 约 1 天内有效）
+
     # Crypto
     enc_master_key: str = "dev-master-key-32-bytes-please-change!!!"
 
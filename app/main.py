@@ -81,6 +81,38 @@ app.include_router(quota_router)
 app.include_router(reports_router)
 app.include_router(upload_router)
 
+# ---- Upstream throttling / circuit breaker / op limits / bulkheads ----
+from app.api.mcp import bulkhead_full_response, op_timeout_response, overloaded_response, throttled_response, unavailable_response
+from app.services.bulkhead import BulkheadFull
+from app.services.op_registry import OpOverloaded, OpTimeout
+from app.services.rate_governor import UpstreamThrottled
+from app.services.resilience import UpstreamUnavailable
+
+
+@app.exception_handler(UpstreamThrottled)
+async def _upstream_throttled(_request, exc: UpstreamThrottled) -> JSONResponse:
+    return throttled_response(exc)
+
+
+@app.exception_handler(UpstreamUnavailable)
+async def _upstream_unavailable(_request, exc: UpstreamUnavailable) -> JSONResponse:
+    return unavailable_response(exc)
+
+
+@app.exception_handler(OpOverloaded)
+async def _op_overloaded(_request, exc: OpOverloaded) -> JSONResponse:
+    return overloaded_response(exc)
+
+
+@app.exception_handler(OpTimeout)
+async def _op_timeout(_request, exc: OpTimeout) -> JSONResponse:
+    return op_timeout_response(exc)
+
+
+@app.exception_handler(BulkheadFull)
+async def _bulkhead_full(_request, exc: BulkheadFull) -> JSONResponse:
+    return bulkhead_full_response(exc)
+
 # ---- Files wiring ----
 from app.api.files import router as files_router
 
@@ -120,10 +152,92 @@ async def _tickets_gc_loop() -> None:
         await asyncio.sleep(interval_seconds)
 
 
+async def _upload_sessions_gc_loop() -> None:
+    """Periodic GC for expired resumable upload sessions."""
+    from app.services.upload_sessions import UploadSessionStore
+
+    interval_seconds = 60 * 60  # hourly
+    while True:
+        try:
+            UploadSessionStore().gc_expired()
+        except Exception:
+            pass
+        await asyncio.sleep(interval_seconds)
+
+
+async def _idempotency_gc_loop() -> None:
+    """Periodic GC for expired Idempotency-Key results."""
+    from app.services.idempotency import IdempotencyStore
+
+    interval_seconds = 60 * 60  # hourly
+    while True:
+        try:
+            IdempotencyStore().gc_expired()
+        except Exception:
+            pass
+        await asyncio.sleep(interval_seconds)
+
+
+async def _fm_jobs_gc_loop() -> None:
+    """Periodic GC for finished async file-manager jobs."""
+    from app.services.fm_jobs import FmJobStore
+
+    interval_seconds = 60 * 60  # hourly
+    while True:
+        try:
+            FmJobStore().gc_finished()
+        except Exception:
+            pass
+        await asyncio.sleep(interval_seconds)
+
+
+async def _cache_invalidations_gc_loop() -> None:
+    """Periodic GC for replayed cross-worker cache invalidations."""
+    from app.services.cache import gc_invalidations
+
+    interval_seconds = 10 * 60
+    while True:
+        try:
+            await asyncio.to_thread(gc_invalidations)
+        except Exception:
+            pass
+        await asyncio.sleep(interval_seconds)
+
+
+@app.on_event("shutdown")
+async def _close_async_http() -> None:
+    from app.services.mcp_async_client import aclose_shared_async_http
+
+    await aclose_shared_async_http()
+
+
+@app.on_event("shutdown")
+async def _flush_cache_invalidations() -> None:
+    # 退出前写出尚在队列中的缓存失效，其他 worker 才能收到
+    from app.services.cache import flush_broadcasts
+
+    await asyncio.to_thread(flush_broadcasts)
+
+
+@app.on_event("startup")
+async def _resume_fm_jobs() -> None:
+    # 继续轮询重启前未结束的文件管理异步任务
+    from app.services.fm_jobs import get_fm_job_tracker
+
+    get_fm_job_tracker().start()
+
+
 @app.on_event("startup")
 def _start_background_jobs() -> None:
+    from app.services.cache import invalidation_sync_loop
+
     try:
         loop = asyncio.get_event_loop()
         loop.create_task(_tickets_gc_loop())
+        loop.create_task(_upload_sessions_gc_loop())
+        loop.create_task(_idempotency_gc_loop())
+        loop.create_task(_fm_jobs_gc_loop())
+        loop.create_task(_cache_invalidations_gc_loop())
+        loop.create_task(invalidation_sync_loop())
     except Exception:
         pass
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.db import Base
+
+
+class FmJob(Base):
+    __tablename__ = "fm_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    # 令牌模式：public（服务令牌）/ user（用户令牌），轮询时按此解析令牌
+    mode: Mapped[str] = mapped_column(String(16), nullable=False)
+    # delete / move / rename / copy
+    op: Mapped[str] = mapped_column(String(16), nullable=False)
+    taskid: Mapped[str] = mapped_column(String(64), nullable=False)
+    # 提交时的 filelist JSON，完成后据此使缓存失效
+    filelist: Mapped[str] = mapped_column(Text, nullable=False, default="[]")
+    # running / success / failed / timeout
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="running", index=True)
+    # JSON：最后一次查询结果（含逐项结果 list）
+    result: Mapped[str | None] = mapped_column(Text, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    next_poll_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    # 完成事件已由持有该用户 WebSocket 的 worker 推送的时间
+    notified_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
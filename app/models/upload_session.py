@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Integer, String, Text, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.db import Base
+
+
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+    __table_args__ = (
+        # 同一令牌作用域下，同一目标路径的同一内容只保留一个会话
+        UniqueConstraint("scope", "remote_path", "fingerprint", name="uq_upload_sessions_scope_path_fp"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # 令牌作用域：public / user:<id> / token:<hash>
+    scope: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
+    remote_path: Mapped[str] = mapped_column(String(1024), nullable=False)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    # 内容指纹：分片 md5 列表的摘要
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    uploadid: Mapped[str] = mapped_column(String(256), nullable=False)
+    # JSON：分片 md5 列表 / 已完成的 partseq 列表
+    block_list: Mapped[str] = mapped_column(Text, nullable=False)
+    completed_parts: Mapped[str] = mapped_column(Text, nullable=False, default="[]")
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
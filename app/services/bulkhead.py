@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import inspect
+import threading
+import time
+import typing
+from typing import Any, Callable, Dict, TypeVar
+
+from app.core.config import get_settings
+
+
+T = TypeVar("T")
+
+# 隔离舱：上传 / 列表与元信息 / 文件管理（含分享、离线） / 授权与令牌解析
+BULKHEADS = ("upload", "list", "fm", "auth")
+# 上游接口分类 -> 隔离舱
+_COST_BULKHEAD = {
+    "upload": "upload",
+    "list": "list",
+    "meta": "list",
+    "write": "fm",
+    "share": "fm",
+    "offline": "fm",
+}
+
+
+class BulkheadFull(RuntimeError):
+    """Raised without queueing when a bulkhead's workers and queue are all taken."""
+
+    def __init__(self, name: str, retry_after: float = 1.0) -> None:
+        super().__init__(f"bulkhead_full: {name}")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class Bulkhead:
+    """独立的有界线程池：最多 ``workers`` 个同时执行、``queue_limit`` 个排队，
+    超出即拒绝，使一类流量占满时不会拖住其他类请求（AnyIO 默认线程池是全局共享的）。"""
+
+    def __init__(self, name: str, workers: int, queue_limit: int) -> None:
+        self.name = name
+        self.workers = max(int(workers), 1)
+        self.queue_limit = max(int(queue_limit), 0)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"bulkhead-{name}")
+        self._lock = threading.Lock()
+        self._pending = 0  # 排队 + 执行中
+        self._active = 0
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.peak_queued = 0
+        self.wait_seconds = 0.0
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self._pending >= self.workers + self.queue_limit:
+                self.rejected += 1
+                raise BulkheadFull(self.name)
+            self._pending += 1
+            self.submitted += 1
+            self.peak_queued = max(self.peak_queued, self._pending - self._active)
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        self._admit()
+        enqueued = time.perf_counter()
+        ctx = contextvars.copy_context()
+
+        def _task() -> T:
+            with self._lock:
+                self._active += 1
+                self.wait_seconds += time.perf_counter() - enqueued
+            try:
+                return ctx.run(fn, *args, **kwargs)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._pending -= 1
+                    self.completed += 1
+
+        try:
+            fut = self._executor.submit(_task)
+        except BaseException:
+            self._release()
+            raise
+        # 尚未开始就被取消的任务不会执行 _task，在这里归还名额
+        fut.add_done_callback(lambda f: self._release() if f.cancelled() else None)
+        afut = asyncio.wrap_future(fut)
+        try:
+            return await asyncio.shield(afut)
+        except asyncio.CancelledError:
+            # 已开始执行的同步调用无法中断：与 AnyIO 线程池一致，等它结束后再传播取消
+            if not fut.cancel():
+                await asyncio.wait({afut})
+                if not afut.cancelled():
+                    afut.exception()
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "active": self._active,
+                "queued": self._pending - self._active,
+                "peak_queued": self.peak_queued,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.wait_seconds / self.completed * 1000.0, 2) if self.completed else None,
+            }
+
+
+_lock = threading.Lock()
+_bulkheads: Dict[str, Bulkhead] = {}
+
+
+def get_bulkhead(name: str) -> Bulkhead:
+    bh = _bulkheads.get(name)
+    if bh is None:
+        with _lock:
+            bh = _bulkheads.get(name)
+            if bh is None:
+                settings = get_settings()
+                bh = Bulkhead(
+                    name,
+                    getattr(settings, f"bulkhead_{name}_workers"),
+                    getattr(settings, f"bulkhead_{name}_queue"),
+                )
+                _bulkheads[name] = bh
+    return bh
+
+
+def bulkhead_for(cost: str) -> Bulkhead:
+    """按操作的上游接口分类选择隔离舱"""
+    return get_bulkhead(_COST_BULKHEAD.get(cost, "list"))
+
+
+def bulkhead_route(name: str) -> Callable[[Callable[..., T]], Callable[..., Any]]:
+    """把同步路由函数放到指定隔离舱执行，而不是 AnyIO 默认线程池
+
+    用在 @router.xxx 之下。参数注解预先解析后写入 __signature__，
+    FastAPI 仍按原函数的参数解析依赖与请求参数。
+    """
+
+    def _decorate(fn: Callable[..., T]) -> Callable[..., Any]:
+        sig = inspect.signature(fn)
+        hints = typing.get_type_hints(fn, include_extras=True)
+        params = [p.replace(annotation=hints.get(p.name, p.annotation)) for p in sig.parameters.values()]
+
+        @functools.wraps(fn)
+        async def _endpoint(*args: Any, **kwargs: Any) -> Any:
+            return await get_bulkhead(name).run(fn, *args, **kwargs)
+
+        _endpoint.__signature__ = sig.replace(parameters=params, return_annotation=hints.get("return", sig.return_annotation))  # type: ignore[attr-defined]
+        return _endpoint
+
+    return _decorate
+
+
+def bulkhead_stats() -> Dict[str, Any]:
+    with _lock:
+        return {name: bh.stats() for name, bh in _bulkheads.items()}
@@ -0,0 +1,462 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import json
+import os
+import posixpath
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional
+
+from sqlalchemy import delete, func, select
+
+from app.core.config import get_settings
+from app.core.db import SessionLocal
+from app.models.cache_invalidation import CacheInvalidation
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry expiry and hit/miss counters."""
+
+    def __init__(self, name: str, ttl_seconds: float, max_entries: int) -> None:
+        self.name = name
+        self.ttl = float(ttl_seconds)
+        self.max_entries = max(int(max_entries), 1)
+        self._lock = threading.Lock()
+        # key -> (expires_at, stored_at, value)
+        self._data: "collections.OrderedDict[Hashable, tuple[float, float, Any]]" = collections.OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, key: Hashable) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self._misses += 1
+                return None
+            self._data.move_to_end(key)
+            self._hits += 1
+            return entry[2]
+
+    def lookup(self, key: Hashable) -> Optional[tuple[float, Any]]:
+        """返回 (已缓存秒数, 值)；过期或不存在时为 None，计入命中统计"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self._misses += 1
+                return None
+            self._data.move_to_end(key)
+            self._hits += 1
+            return now - entry[1], entry[2]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._data[key] = (now + (self.ttl if ttl is None else float(ttl)), now, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self._invalidations += 1
+
+    def invalidate(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        with self._lock:
+            doomed = [k for k, (_, _, v) in self._data.items() if predicate(k, v)]
+            for k in doomed:
+                del self._data[k]
+            self._invalidations += len(doomed)
+            return len(doomed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else None,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+
+def _path_affected(path: Any, roots: Iterable[str]) -> bool:
+    if not isinstance(path, str):
+        return False
+    return any(path == r or path.startswith(r.rstrip("/") + "/") for r in roots)
+
+
+def paths_from_filelist(filelist_json: Any) -> list[str]:
+    """从 filemanager 的 filelist 参数中取出源路径（delete 为路径列表，move/rename/copy 为对象列表）"""
+    try:
+        items = json.loads(filelist_json) if isinstance(filelist_json, str) else filelist_json
+    except (TypeError, ValueError):
+        return []
+    paths: list[str] = []
+    for it in items or []:
+        if isinstance(it, str):
+            paths.append(it)
+        elif isinstance(it, dict) and isinstance(it.get("path"), str):
+            paths.append(it["path"])
+    return [p for p in paths if p]
+
+
+# ---- 跨 worker 失效广播 ----
+# 缓存在每个 worker 进程内各有一份：本进程的失效先入队，由后台任务每
+# cache_invalidation_poll_seconds 批量写入 cache_invalidations 表，并回放其他进程的记录。
+# 查缓存与写操作路径上不访问数据库
+_ORIGIN = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+_sync_lock = threading.Lock()
+_sync_cursor: Optional[int] = None
+# 待写库的失效 (kind, scope, paths)；未启动后台任务时（如脚本）只保留最近的记录
+_outbox: "collections.deque[tuple[str, str, list[str]]]" = collections.deque(maxlen=10000)
+
+
+def _broadcast(kind: str, scope: str, paths: list[str]) -> None:
+    _outbox.append((kind, scope, list(paths)))
+
+
+def flush_broadcasts() -> int:
+    """把排队的失效写入数据库，返回写入条数（阻塞调用，事件循环中经 to_thread 执行）"""
+    batch: list[tuple[str, str, list[str]]] = []
+    while True:
+        try:
+            batch.append(_outbox.popleft())
+        except IndexError:
+            break
+    if not batch:
+        return 0
+    try:
+        with SessionLocal() as db:
+            db.add_all([
+                CacheInvalidation(origin=_ORIGIN, kind=kind, scope=scope, paths=json.dumps(paths, ensure_ascii=False))
+                for kind, scope, paths in batch
+            ])
+            db.commit()
+    except Exception:
+        # 写库失败时其他 worker 的条目只能等 TTL 过期
+        return 0
+    return len(batch)
+
+
+def sync_invalidations() -> int:
+    """回放其他 worker 写入的失效记录，返回回放条数（阻塞调用，由后台任务周期执行）"""
+    global _sync_cursor
+    if not _sync_lock.acquire(blocking=False):
+        return 0
+    try:
+        with SessionLocal() as db:
+            if _sync_cursor is None:
+                # 首次同步前本进程还没有缓存条目，旧记录无需回放
+                _sync_cursor = int(db.execute(select(func.max(CacheInvalidation.id))).scalar() or 0)
+                return 0
+            rows = db.execute(
+                select(CacheInvalidation)
+                .where(CacheInvalidation.id > _sync_cursor)
+                .order_by(CacheInvalidation.id)
+            ).scalars().all()
+            for row in rows:
+                _sync_cursor = row.id
+                if row.origin == _ORIGIN:
+                    continue
+                try:
+                    paths = [p for p in json.loads(row.paths or "[]") if isinstance(p, str)]
+                except (TypeError, ValueError):
+                    continue
+                if row.kind == "meta":
+                    _meta_invalidate_local(row.scope, paths)
+                elif row.kind == "listing":
+                    _listing_invalidate_local(row.scope, paths)
+            return len(rows)
+    except Exception:
+        return 0
+    finally:
+        _sync_lock.release()
+
+
+async def invalidation_sync_loop() -> None:
+    """后台任务：写出本进程的失效并回放其他 worker 的记录，数据库访问都在线程池中"""
+    # 启动时先确定游标：此前的记录与本进程尚为空的缓存无关
+    await asyncio.to_thread(sync_invalidations)
+    while True:
+        await asyncio.sleep(float(get_settings().cache_invalidation_poll_seconds))
+        try:
+            await asyncio.to_thread(flush_broadcasts)
+            await asyncio.to_thread(sync_invalidations)
+        except Exception:
+            pass
+
+
+def gc_invalidations() -> int:
+    retention = timedelta(seconds=float(get_settings().cache_invalidation_retention_seconds))
+    with SessionLocal() as db:
+        res = db.execute(delete(CacheInvalidation).where(CacheInvalidation.created_at < datetime.utcnow() - retention))
+        db.commit()
+        return int(res.rowcount or 0)
+
+
+# ---- fsid 元信息 / dlink 缓存 ----
+_meta_cache: Optional[TTLCache] = None
+_meta_lock = threading.Lock()
+
+
+def get_meta_cache() -> TTLCache:
+    global _meta_cache
+    if _meta_cache is None:
+        with _meta_lock:
+            if _meta_cache is None:
+                settings = get_settings()
+                _meta_cache = TTLCache("file_metas", settings.meta_cache_ttl_seconds, settings.meta_cache_max_entries)
+    return _meta_cache
+
+
+def meta_cache_lookup(scope: str, variant: Hashable, fsids: list[int]) -> tuple[Dict[int, dict], list[int]]:
+    """拆分为 (已缓存条目, 需向上游查询的 fsid)"""
+    if float(get_settings().meta_cache_ttl_seconds) <= 0:
+        return {}, list(fsids)
+    cache = get_meta_cache()
+    found: Dict[int, dict] = {}
+    missing: list[int] = []
+    for fsid in fsids:
+        item = cache.get((scope, fsid, variant))
+        if item is None:
+            missing.append(fsid)
+        else:
+            found[fsid] = item
+    return found, missing
+
+
+def meta_cache_store(scope: str, variant: Hashable, resp: Any) -> Dict[int, dict]:
+    """缓存上游返回的条目（仅 errno=0 时），返回 {fsid: item}"""
+    if not isinstance(resp, dict) or int(resp.get("errno", 0) or 0) != 0:
+        return {}
+    items = resp.get("list")
+    if not isinstance(items, list) and isinstance(resp.get("data"), dict):
+        items = resp["data"].get("list")
+    out: Dict[int, dict] = {}
+    cache = get_meta_cache() if float(get_settings().meta_cache_ttl_seconds) > 0 else None
+    for it in items or []:
+        if not isinstance(it, dict):
+            continue
+        try:
+            fsid = int(it.get("fs_id") or it.get("fsid") or 0)
+        except (TypeError, ValueError):
+            continue
+        if not fsid:
+            continue
+        out[fsid] = it
+        if cache is not None:
+            cache.set((scope, fsid, variant), it)
+    return out
+
+
+def _meta_invalidate_local(scope: str, paths: list[str]) -> int:
+    if not paths or _meta_cache is None:
+        return 0
+    return _meta_cache.invalidate(lambda k, v: k[0] == scope and _path_affected((v or {}).get("path"), paths))
+
+
+def meta_cache_invalidate_paths(scope: str, paths: list[str]) -> int:
+    """fm_delete/move/rename 后清除这些路径（含其子路径）下的缓存条目，并通知其他 worker"""
+    if not paths or float(get_settings().meta_cache_ttl_seconds) <= 0:
+        return 0
+    _broadcast("meta", scope, list(paths))
+    return _meta_invalidate_local(scope, paths)
+
+
+def meta_cache_stats() -> Dict[str, Any]:
+    if _meta_cache is None:
+        return {"initialized": False}
+    data = _meta_cache.stats()
+    data["initialized"] = True
+    return data
+
+
+# ---- 目录列表缓存（stale-while-revalidate）----
+# 键：(scope, kind, dir, params)；kind 为 "list"（单层）或 "imagelist"/"doclist"（递归子树）
+RECURSIVE_LISTINGS = {"imagelist", "doclist"}
+
+_listing_cache: Optional[TTLCache] = None
+_listing_lock = threading.Lock()
+_refreshing: set = set()
+# 异步后台刷新任务（保留引用，避免被回收）
+_refresh_tasks: set = set()
+_listing_counters = {"stale_served": 0, "refreshes": 0, "refresh_errors": 0}
+# 每次失效递增；失效前发起的拉取结果不再写回，避免把旧列表重新放进缓存
+_listing_generation = 0
+
+
+def get_listing_cache() -> TTLCache:
+    global _listing_cache
+    if _listing_cache is None:
+        with _listing_lock:
+            if _listing_cache is None:
+                settings = get_settings()
+                # 条目保留 fresh + stale 时长，超过 fresh 即视为陈旧
+                ttl = float(settings.listing_cache_ttl_seconds) + float(settings.listing_cache_stale_seconds)
+                _listing_cache = TTLCache("listing", ttl, settings.listing_cache_max_entries)
+    return _listing_cache
+
+
+def _listing_store(key: Hashable, resp: Any, generation: int) -> None:
+    if not (isinstance(resp, dict) and int(resp.get("errno", 0) or 0) == 0):
+        return
+    with _listing_lock:
+        if generation == _listing_generation:
+            get_listing_cache().set(key, resp)
+
+
+def _serve_stale(key: Hashable) -> bool:
+    """记录一次陈旧命中；返回是否由本次调用发起后台刷新"""
+    with _listing_lock:
+        _listing_counters["stale_served"] += 1
+        if key in _refreshing:
+            return False
+        _refreshing.add(key)
+        return True
+
+
+def _end_refresh(key: Hashable, error: bool) -> None:
+    with _listing_lock:
+        _refreshing.discard(key)
+        _listing_counters["refreshes"] += 1
+        if error:
+            _listing_counters["refresh_errors"] += 1
+
+
+def cached_listing(key: tuple, fetch: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """新鲜命中直接返回；陈旧命中先返回旧值并在后台刷新；未命中同步拉取"""
+    fresh = float(get_settings().listing_cache_ttl_seconds)
+    if fresh <= 0:
+        return fetch()
+    generation = _listing_generation
+    hit = get_listing_cache().lookup(key)
+    if hit is not None:
+        age, value = hit
+        if age >= fresh and _serve_stale(key):
+            def _refresh() -> None:
+                try:
+                    _listing_store(key, fetch(), generation)
+                except Exception:
+                    _end_refresh(key, True)
+                    return
+                _end_refresh(key, False)
+
+            threading.Thread(target=_refresh, name="listing-refresh", daemon=True).start()
+        return value
+    resp = fetch()
+    _listing_store(key, resp, generation)
+    return resp
+
+
+async def acached_listing(key: tuple, fetch: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    fresh = float(get_settings().listing_cache_ttl_seconds)
+    if fresh <= 0:
+        return await fetch()
+    generation = _listing_generation
+    hit = get_listing_cache().lookup(key)
+    if hit is not None:
+        age, value = hit
+        if age >= fresh and _serve_stale(key):
+            async def _refresh() -> None:
+                try:
+                    _listing_store(key, await fetch(), generation)
+                except Exception:
+                    _end_refresh(key, True)
+                    return
+                _end_refresh(key, False)
+
+            task = asyncio.ensure_future(_refresh())
+            _refresh_tasks.add(task)
+            task.add_done_callback(_refresh_tasks.discard)
+        return value
+    resp = await fetch()
+    _listing_store(key, resp, generation)
+    return resp
+
+
+def _norm_dir(path: str) -> str:
+    p = posixpath.normpath(path or "/")
+    return "/" if p in {".", "//"} else p
+
+
+def listing_cache_invalidate(scope: str, changed: Iterable[str]) -> int:
+    """路径 changed 新增/删除/改名后，清除受影响的列表，并通知其他 worker
+
+    - 单层列表：所在父目录，以及位于该路径之下的目录（目录本身被删/移走）
+    - 递归列表（图片/文档）：以该路径为后代的所有祖先目录
+    """
+    paths = [_norm_dir(p) for p in changed if p]
+    if not paths or float(get_settings().listing_cache_ttl_seconds) <= 0:
+        return 0
+    _broadcast("listing", scope, paths)
+    return _listing_invalidate_local(scope, paths)
+
+
+def _listing_invalidate_local(scope: str, paths: list[str]) -> int:
+    global _listing_generation
+    if not paths or _listing_cache is None:
+        return 0
+    with _listing_lock:
+        _listing_generation += 1
+    parents = {posixpath.dirname(p) or "/" for p in paths}
+
+    def _affected(key: Hashable, _value: Any) -> bool:
+        k_scope, kind, d = key[0], key[1], key[2]
+        if k_scope != scope:
+            return False
+        if _path_affected(d, paths):
+            return True
+        if kind in RECURSIVE_LISTINGS:
+            return any(d == "/" or p.startswith(d.rstrip("/") + "/") for p in paths)
+        return d in parents
+
+    return _listing_cache.invalidate(_affected)
+
+
+def filelist_touched_paths(filelist_json: Any) -> list[str]:
+    """filemanager 操作涉及的路径：源路径，以及 move/copy/rename 的目标路径"""
+    try:
+        items = json.loads(filelist_json) if isinstance(filelist_json, str) else filelist_json
+    except (TypeError, ValueError):
+        return []
+    out: list[str] = []
+    for it in items or []:
+        if isinstance(it, str):
+            out.append(it)
+        elif isinstance(it, dict) and isinstance(it.get("path"), str):
+            src = it["path"]
+            out.append(src)
+            if isinstance(it.get("dest"), str):
+                out.append(posixpath.join(it["dest"], it.get("newname") or posixpath.basename(src)))
+            elif isinstance(it.get("newname"), str):
+                out.append(posixpath.join(posixpath.dirname(src), it["newname"]))
+    return [p for p in out if p]
+
+
+def listing_cache_stats() -> Dict[str, Any]:
+    if _listing_cache is None:
+        return {"initialized": False}
+    data = _listing_cache.stats()
+    with _listing_lock:
+        data.update(_listing_counters)
+    data["fresh_seconds"] = float(get_settings().listing_cache_ttl_seconds)
+    data["initialized"] = True
+    return data
@@ -0,0 +1,365 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+
+from app.core.config import get_settings
+from app.core.db import SessionLocal
+from app.models.fm_job import FmJob
+from app.services.bulkhead import get_bulkhead
+from app.services.cache import filelist_touched_paths, listing_cache_invalidate, meta_cache_invalidate_paths, paths_from_filelist
+from app.services.mcp_async_client import async_client_available, netdisk_client_for_token
+from app.services.mcp_client import NetdiskClient, resolve_access_token, token_scope
+from app.services.ws_manager import manager
+
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("success", "failed", "timeout")
+# 频控类 errno：任务状态未知，按退避继续查询
+_THROTTLE_ERRNOS = {31034, -31034}
+
+
+@dataclass
+class FmJobView:
+    id: int
+    user_id: int
+    mode: str
+    op: str
+    taskid: str
+    filelist: str
+    status: str
+    result: Optional[dict]
+    attempts: int
+    created_at: datetime
+    finished_at: Optional[datetime]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "op": self.op,
+            "taskid": self.taskid,
+            "status": self.status,
+            "result": self.result,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+def _view(rec: FmJob) -> FmJobView:
+    try:
+        result = json.loads(rec.result) if rec.result else None
+    except Exception:
+        result = None
+    return FmJobView(
+        id=rec.id,
+        user_id=rec.user_id,
+        mode=rec.mode,
+        op=rec.op,
+        taskid=rec.taskid,
+        filelist=rec.filelist,
+        status=rec.status,
+        result=result,
+        attempts=rec.attempts,
+        created_at=rec.created_at,
+        finished_at=rec.finished_at,
+    )
+
+
+def task_status(resp: Dict[str, Any]) -> str:
+    """把任务查询结果归一为 running/success/failed"""
+    status = str(resp.get("status") or "").lower()
+    if status == "success":
+        return "success"
+    if status in {"failed", "fail"}:
+        return "failed"
+    try:
+        errno = int(resp.get("errno") or 0)
+    except (TypeError, ValueError):
+        errno = 0
+    if errno != 0 and errno not in _THROTTLE_ERRNOS:
+        return "failed"
+    return "running"
+
+
+def poll_delay(attempts: int) -> float:
+    settings = get_settings()
+    initial = max(float(settings.fm_job_poll_initial_seconds), 0.1)
+    return min(initial * (2 ** max(attempts - 1, 0)), max(float(settings.fm_job_poll_max_seconds), initial))
+
+
+class FmJobStore:
+    """Persisted async file-manager tasks (taskid) awaiting completion."""
+
+    def create(self, user_id: int, mode: str, op: str, taskid: str, filelist: str) -> FmJobView:
+        now = datetime.utcnow()
+        with SessionLocal() as db:
+            rec = FmJob(
+                user_id=user_id,
+                mode=mode,
+                op=op,
+                taskid=taskid,
+                filelist=filelist,
+                status="running",
+                attempts=0,
+                next_poll_at=now + timedelta(seconds=poll_delay(0)),
+            )
+            db.add(rec)
+            db.commit()
+            db.refresh(rec)
+            return _view(rec)
+
+    def get(self, user_id: int, job_id: int) -> Optional[FmJobView]:
+        with SessionLocal() as db:
+            rec = db.get(FmJob, job_id)
+            if rec is None or rec.user_id != user_id:
+                return None
+            return _view(rec)
+
+    def claim_due(self, now: datetime, limit: int, lease_seconds: float) -> list[FmJobView]:
+        """认领到期任务：把 next_poll_at 推迟到租约结束（按原值比较并更新），
+        多个 worker 同时轮询时每个任务只被一个 worker 查询"""
+        lease_until = now + timedelta(seconds=max(float(lease_seconds), 1.0))
+        claimed: list[FmJobView] = []
+        with SessionLocal() as db:
+            rows = db.execute(
+                select(FmJob)
+                .where(FmJob.status == "running", FmJob.next_poll_at <= now)
+                .order_by(FmJob.next_poll_at)
+                .limit(limit)
+            ).scalars().all()
+            candidates = [(r.next_poll_at, _view(r)) for r in rows]
+            for due_at, job in candidates:
+                res = db.execute(
+                    update(FmJob)
+                    .where(FmJob.id == job.id, FmJob.status == "running", FmJob.next_poll_at == due_at)
+                    .values(next_poll_at=lease_until)
+                    .execution_options(synchronize_session=False)
+                )
+                if res.rowcount == 1:
+                    claimed.append(job)
+            db.commit()
+        return claimed
+
+    def unnotified(self, user_ids: list[int], limit: int) -> list[FmJobView]:
+        """已结束但完成事件尚未推送的任务（仅限本 worker 上有连接的用户）"""
+        if not user_ids:
+            return []
+        with SessionLocal() as db:
+            rows = db.execute(
+                select(FmJob)
+                .where(FmJob.status.in_(TERMINAL_STATUSES), FmJob.notified_at.is_(None), FmJob.user_id.in_(user_ids))
+                .order_by(FmJob.finished_at)
+                .limit(limit)
+            ).scalars().all()
+            return [_view(r) for r in rows]
+
+    def mark_notified(self, job_id: int) -> bool:
+        """抢占推送权：只有一个 worker 能把 notified_at 从空改为当前时间"""
+        with SessionLocal() as db:
+            res = db.execute(
+                update(FmJob)
+                .where(FmJob.id == job_id, FmJob.notified_at.is_(None))
+                .values(notified_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            return res.rowcount == 1
+
+    def next_due_at(self) -> Optional[datetime]:
+        with SessionLocal() as db:
+            return db.execute(select(func.min(FmJob.next_poll_at)).where(FmJob.status == "running")).scalar_one_or_none()
+
+    def record_poll(self, job_id: int, status: str, result: Optional[dict], attempts: int, next_poll_at: datetime) -> None:
+        values: Dict[str, Any] = {"status": status, "attempts": attempts, "next_poll_at": next_poll_at, "updated_at": datetime.utcnow()}
+        if result is not None:
+            values["result"] = json.dumps(result, ensure_ascii=False, default=str)
+        if status in TERMINAL_STATUSES:
+            values["finished_at"] = datetime.utcnow()
+        with SessionLocal() as db:
+            db.execute(update(FmJob).where(FmJob.id == job_id).values(**values))
+            db.commit()
+
+    def gc_finished(self) -> int:
+        cutoff = datetime.utcnow() - timedelta(hours=int(get_settings().fm_job_keep_hours))
+        with SessionLocal() as db:
+            res = db.execute(delete(FmJob).where(FmJob.status.in_(TERMINAL_STATUSES), FmJob.finished_at < cutoff))
+            db.commit()
+            return int(res.rowcount or 0)
+
+
+class FmJobTracker:
+    """后台轮询文件管理异步任务
+
+    到期的任务按令牌（用户 + 模式）分组，每组只解析一次令牌，在并发上限内批量查询；
+    未结束的任务按指数退避安排下次查询。任务结束后使相关缓存失效，
+    并通过 WebSocket 向提交者推送 {"type": "fm_job", ...}。任务记录在 DB 中，重启后继续轮询。
+
+    多 worker 部署时每个 worker 都运行一个跟踪器：到期任务经租约认领，只由一个 worker 查询；
+    完成事件由持有该用户连接的 worker 推送（各 worker 定期检查本机连接用户的待推送任务）。
+    """
+
+    def __init__(self, store: Optional[FmJobStore] = None) -> None:
+        self._store = store or FmJobStore()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+        self.tracked = 0
+        self.polls = 0
+        self.poll_errors = 0
+        self.finished: Dict[str, int] = {s: 0 for s in TERMINAL_STATUSES}
+
+    def start(self) -> None:
+        """在当前事件循环中启动轮询（已在运行则忽略）"""
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def track(self, user_id: int, mode: str, op: str, taskid: str, filelist: str) -> FmJobView:
+        job = await asyncio.to_thread(self._store.create, user_id, mode, op, taskid, filelist)
+        with self._lock:
+            self.tracked += 1
+        self.start()
+        if self._wake is not None:
+            self._wake.set()
+        return job
+
+    async def run(self) -> None:
+        settings = get_settings()
+        wake = self._wake = asyncio.Event()
+        while True:
+            wake.clear()
+            delay: Optional[float] = None
+            try:
+                await self._deliver_pending()
+                jobs = await asyncio.to_thread(
+                    self._store.claim_due, datetime.utcnow(), max(int(settings.fm_job_poll_batch), 1), float(settings.fm_job_lease_seconds)
+                )
+                if jobs:
+                    await self._poll(jobs)
+                    continue
+                next_at = await asyncio.to_thread(self._store.next_due_at)
+                if next_at is not None:
+                    delay = max((next_at - datetime.utcnow()).total_seconds(), 0.05)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("fm_jobs poll loop error: %s", e)
+                delay = float(settings.fm_job_poll_max_seconds)
+            # 其他 worker 完成的任务也要及时推送给本机连接的用户
+            notify = max(float(settings.fm_job_notify_poll_seconds), 0.1)
+            delay = notify if delay is None else min(delay, notify)
+            try:
+                await asyncio.wait_for(wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll(self, jobs: list[FmJobView]) -> None:
+        groups: Dict[Tuple[int, str], list[FmJobView]] = {}
+        for job in jobs:
+            groups.setdefault((job.user_id, job.mode), []).append(job)
+        sem = asyncio.Semaphore(max(int(get_settings().fm_job_poll_concurrency), 1))
+        await asyncio.gather(*(self._poll_group(user_id, mode, group, sem) for (user_id, mode), group in groups.items()))
+
+    async def _poll_group(self, user_id: int, mode: str, jobs: list[FmJobView], sem: asyncio.Semaphore) -> None:
+        try:
+            token = await get_bulkhead("auth").run(resolve_access_token, None, user_id, mode)
+        except Exception as e:
+            # 令牌暂不可用：整组按退避稍后再查
+            for job in jobs:
+                await self._record(job, "running", {"error": f"token_unavailable: {e}"}, token=None)
+            return
+        if async_client_available():
+            aclient = netdisk_client_for_token(token, user_id, mode)
+            query = aclient.fm_task_query
+        else:
+            client = NetdiskClient(token, user_id, mode, token_resolved=True)
+
+            async def query(taskid: str) -> Dict[str, Any]:
+                return await get_bulkhead("list").run(client.fm_task_query, taskid)
+
+        async def _one(job: FmJobView) -> None:
+            async with sem:
+                try:
+                    resp = await query(job.taskid)
+                    status = task_status(resp)
+                except Exception as e:
+                    with self._lock:
+                        self.poll_errors += 1
+                    resp, status = {"error": str(e)}, "running"
+                await self._record(job, status, resp, token=token)
+
+        await asyncio.gather(*(_one(job) for job in jobs))
+
+    async def _record(self, job: FmJobView, status: str, resp: Dict[str, Any], token: Optional[str]) -> None:
+        attempts = job.attempts + 1
+        with self._lock:
+            self.polls += 1
+        max_age = float(get_settings().fm_job_max_seconds)
+        if status == "running" and max_age > 0 and (datetime.utcnow() - job.created_at).total_seconds() > max_age:
+            status = "timeout"
+        next_poll_at = datetime.utcnow() + timedelta(seconds=poll_delay(attempts))
+        await asyncio.to_thread(self._store.record_poll, job.id, status, resp, attempts, next_poll_at)
+        if status not in TERMINAL_STATUSES:
+            return
+        with self._lock:
+            self.finished[status] += 1
+        if token is not None:
+            # 任务在提交后才真正完成，期间刷新的列表/元信息缓存需再次失效
+            scope = token_scope(token, job.user_id, job.mode)
+            if job.op != "copy":
+                meta_cache_invalidate_paths(scope, paths_from_filelist(job.filelist))
+            listing_cache_invalidate(scope, filelist_touched_paths(job.filelist))
+        job.status, job.result, job.attempts = status, resp, attempts
+        job.finished_at = datetime.utcnow()
+        await self._deliver(job)
+
+    async def _deliver(self, job: FmJobView) -> None:
+        # 用户连在其他 worker 上时留给那个 worker 推送
+        if not manager.is_connected(job.user_id):
+            return
+        if not await asyncio.to_thread(self._store.mark_notified, job.id):
+            return
+        try:
+            await manager.send_to_user(job.user_id, {"type": "fm_job", **job.to_dict()})
+        except Exception as e:
+            logger.warning("fm_jobs push failed job=%s err=%s", job.id, e)
+
+    async def _deliver_pending(self) -> None:
+        users = manager.connected_users()
+        if not users:
+            return
+        jobs = await asyncio.to_thread(self._store.unnotified, users, max(int(get_settings().fm_job_poll_batch), 1))
+        for job in jobs:
+            await self._deliver(job)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self._task is not None and not self._task.done(),
+                "tracked": self.tracked,
+                "polls": self.polls,
+                "poll_errors": self.poll_errors,
+                "finished": dict(self.finished),
+            }
+
+
+_tracker: Optional[FmJobTracker] = None
+
+
+def get_fm_job_tracker() -> FmJobTracker:
+    global _tracker
+    if _tracker is None:
+        _tracker = FmJobTracker()
+    return _tracker
+
+
+def fm_job_stats() -> Dict[str, Any]:
+    return get_fm_job_tracker().stats()
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import json
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from openapi_client import ApiClient, Configuration
+
+from app.core.config import get_settings
+
+try:
+    import orjson as _orjson  # type: ignore
+except Exception:  # pragma: no cover - 可选依赖，缺失时用标准库 json
+    _orjson = None
+
+
+# 进程级共享的 SDK 客户端：urllib3 PoolManager 本身线程安全，
+# 复用它即可让 pan.baidu.com / d.pcs.baidu.com 的 TCP+TLS 连接保持复用
+_lock = threading.Lock()
+_api_client: Optional[ApiClient] = None
+# 手写的 requests 调用（uinfo/离线下载/分享/URL 拉取）共用的会话
+_session: Any = None
+# 分片上传（superfile2）所在主机
+UPLOAD_HOST = "d.pcs.baidu.com"
+
+
+def _apply_keepalive(cfg: Configuration) -> Configuration:
+    # 由 SDK 的 Configuration.get_socket_options 生成 socket 选项（TCP_NODELAY + keep-alive 探测）
+    settings = get_settings()
+    cfg.tcp_keepalive_idle = int(settings.netdisk_http_keepalive_idle_seconds) if settings.netdisk_http_keepalive else None
+    return cfg
+
+
+def _build_api_client() -> ApiClient:
+    settings = get_settings()
+    cfg = Configuration()
+    cfg.connection_pools_size = int(settings.netdisk_http_num_pools)
+    cfg.connection_pool_maxsize = int(settings.netdisk_http_pool_maxsize)
+    # 分片上传走 d.pcs.baidu.com，单独定连接数，避免与 pan.baidu.com 的 API 调用争抢
+    upload_maxsize = int(settings.netdisk_http_upload_pool_maxsize)
+    if upload_maxsize > 0:
+        cfg.connection_pool_maxsize_per_host = {UPLOAD_HOST: upload_maxsize}
+    cfg.connection_pool_block = bool(settings.netdisk_http_pool_block)
+    cfg.connection_pool_timeout = float(settings.netdisk_http_pool_timeout_seconds)
+    _apply_keepalive(cfg)
+    return ApiClient(cfg)
+
+
+def get_shared_api_client() -> ApiClient:
+    """Return the process-wide ApiClient (lazily created, thread-safe).
+
+    Callers must not use it as a context manager: closing it would tear
+    down the shared pool for every other request.
+    """
+    global _api_client
+    if _api_client is None:
+        with _lock:
+            if _api_client is None:
+                _api_client = _build_api_client()
+    return _api_client
+
+
+def _build_retry(total: int) -> Any:
+    from urllib3.util.retry import Retry
+
+    kwargs = dict(
+        total=total,
+        connect=total,
+        read=total,
+        status=total,
+        backoff_factor=0.3,
+        status_forcelist=(500, 502, 503, 504),
+        raise_on_status=False,
+    )
+    # 仅对幂等方法重试读/状态错误；连接建立失败对所有方法都可安全重试
+    try:
+        return Retry(allowed_methods=frozenset({"GET", "HEAD"}), **kwargs)
+    except TypeError:
+        # urllib3 < 1.26
+        return Retry(method_whitelist=frozenset({"GET", "HEAD"}), **kwargs)
+
+
+def _build_session() -> Any:
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    settings = get_settings()
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=int(settings.netdisk_http_num_pools),
+        pool_maxsize=int(settings.netdisk_http_pool_maxsize),
+        max_retries=_build_retry(int(settings.netdisk_http_retries)),
+    )
+    opts = _apply_keepalive(Configuration()).get_socket_options()
+    if opts is not None:
+        # HTTPAdapter 不直接暴露 socket_options，通过 pool kwargs 下发
+        adapter.poolmanager.connection_pool_kw["socket_options"] = opts
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_shared_session() -> Any:
+    """Return the process-wide ``requests.Session`` for hand-rolled upstream calls.
+
+    Raises ImportError when ``requests`` is not installed; callers keep their
+    existing ``requests_not_installed`` fallbacks.
+    """
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def upstream_timeout() -> tuple[float, float]:
+    """(connect, read) timeout applied to every call made through the shared session."""
+    settings = get_settings()
+    return float(settings.netdisk_http_connect_timeout_seconds), float(settings.netdisk_http_read_timeout_seconds)
+
+
+def json_loads(data: bytes | str) -> Any:
+    """解析上游 JSON；安装了 orjson 时使用它，否则回落到标准库"""
+    if _orjson is not None:
+        return _orjson.loads(data)
+    return json.loads(data)
+
+
+def raw_json(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """包装 SDK 接口方法：跳过模型反序列化，直接返回解析后的 JSON
+
+    SDK 默认把响应解码后经 validate_and_convert_types 转换，调用方随后又 to_dict()；
+    这里以 _preload_content=False 取回原始响应体，用 json_loads 自行解析。
+    响应类型为 (dict,) 的接口（如 listall）收益主要来自 orjson。非 2xx 仍由 SDK 抛出 ApiException
+    （SDK 在抛出前已归还连接）。
+    """
+    if not get_settings().netdisk_raw_json:
+        return fn
+
+    def _invoke(*args: Any, **kwargs: Any) -> Any:
+        resp = fn(*args, _preload_content=False, **kwargs)
+        try:
+            parsed = json_loads(resp.data)
+        finally:
+            resp.release_conn()
+        return parsed if isinstance(parsed, dict) else {"data": parsed}
+
+    return _invoke
+
+
+# SDK 连接池（openapi_client.rest 的计量连接池）额外提供的饱和度计数
+_SATURATION_KEYS = ("saturated", "waits", "wait_timeouts", "overflow")
+
+
+def _summarize(hosts: list[dict]) -> Dict[str, Any]:
+    total_requests = sum(int(h.get("requests", 0)) for h in hosts)
+    reused = sum(int(h.get("reused", 0)) for h in hosts)
+    data: Dict[str, Any] = {
+        "requests": total_requests,
+        "new_connections": sum(int(h.get("new_connections", 0)) for h in hosts),
+        "reused": reused,
+        "hit_ratio": round(reused / total_requests, 4) if total_requests else None,
+        "hosts": hosts,
+    }
+    if any("saturated" in h for h in hosts):
+        for k in _SATURATION_KEYS:
+            data[k] = sum(int(h.get(k, 0)) for h in hosts)
+    return data
+
+
+def _pool_manager_stats(pool_manager: Any) -> Dict[str, Any]:
+    """普通 urllib3 PoolManager（requests 会话）的复用统计"""
+    hosts: list[dict] = []
+    try:
+        keys = list(pool_manager.pools.keys())
+    except Exception:
+        keys = []
+    for key in keys:
+        pool = pool_manager.pools.get(key)
+        if pool is None:
+            continue
+        requests_cnt = int(getattr(pool, "num_requests", 0) or 0)
+        conns_cnt = int(getattr(pool, "num_connections", 0) or 0)
+        idle = 0
+        try:
+            idle = pool.pool.qsize() if pool.pool is not None else 0
+        except Exception:
+            idle = 0
+        hosts.append({
+            "host": f"{pool.scheme}://{pool.host}:{pool.port}",
+            "requests": requests_cnt,
+            "new_connections": conns_cnt,
+            "reused": max(requests_cnt - conns_cnt, 0),
+            "idle": idle,
+            "maxsize": getattr(getattr(pool, "pool", None), "maxsize", None),
+        })
+    return _summarize(hosts)
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Connection reuse statistics of the shared SDK transport."""
+    if _api_client is None:
+        return {"initialized": False}
+    # 逐主机数据（含饱和度计数）由 SDK 的 RESTClientObject.pool_stats 在计数锁内读取
+    data = _summarize(_api_client.rest_client.pool_stats())
+    data["initialized"] = True
+    return data
+
+
+def session_stats() -> Dict[str, Any]:
+    """Connection reuse statistics of the shared requests session."""
+    if _session is None:
+        return {"initialized": False}
+    merged: Dict[str, Any] = {"requests": 0, "new_connections": 0, "reused": 0, "hosts": []}
+    seen: set[int] = set()
+    for adapter in _session.adapters.values():
+        pm = getattr(adapter, "poolmanager", None)
+        if pm is None or id(pm) in seen:
+            continue
+        seen.add(id(pm))
+        part = _pool_manager_stats(pm)
+        for k in ("requests", "new_connections", "reused"):
+            merged[k] += part[k]
+        merged["hosts"].extend(part["hosts"])
+    merged["hit_ratio"] = round(merged["reused"] / merged["requests"], 4) if merged["requests"] else None
+    merged["initialized"] = True
+    return merged
@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.db import SessionLocal
+from app.models.idempotency import IdempotencyRecord
+
+
+class IdempotencyKeyReused(ValueError):
+    """Raised when an Idempotency-Key is sent again with a different op or args."""
+
+    def __init__(self, key: str) -> None:
+        super().__init__(f"idempotency_key_reused: {key}")
+        self.key = key
+
+
+class IdempotencyInProgress(RuntimeError):
+    """Raised when the first request for a key is still running after the wait limit."""
+
+    def __init__(self, key: str, retry_after: float) -> None:
+        super().__init__(f"idempotency_in_progress: {key}")
+        self.key = key
+        self.retry_after = retry_after
+
+
+@dataclass
+class IdempotencyState:
+    # claimed：本请求获得执行权；pending：其他请求执行中；done：已有结果；mismatch：同键不同请求
+    status: str
+    status_code: Optional[int] = None
+    body: Optional[dict] = None
+
+
+def request_fingerprint(op: str, args: dict) -> str:
+    raw = json.dumps({"op": op, "args": args}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """Stored exec results keyed by (user, scope, Idempotency-Key)."""
+
+    def _state(self, rec: IdempotencyRecord, fingerprint: str) -> IdempotencyState:
+        if rec.fingerprint != fingerprint:
+            return IdempotencyState("mismatch")
+        if rec.status != "done":
+            return IdempotencyState("pending")
+        try:
+            body = json.loads(rec.response or "{}")
+        except Exception:
+            body = {}
+        return IdempotencyState("done", rec.status_code or 200, body)
+
+    def _stale(self, rec: IdempotencyRecord, now: datetime) -> bool:
+        if rec.expires_at < now:
+            return True
+        # 执行进程异常退出留下的 pending 记录，超过租约后允许重新执行
+        lease = timedelta(seconds=float(get_settings().idempotency_pending_lease_seconds))
+        return rec.status != "done" and rec.updated_at < now - lease
+
+    def _find(self, db: Session, user_id: int, scope: str, key: str) -> Optional[IdempotencyRecord]:
+        return db.execute(
+            select(IdempotencyRecord).where(
+                IdempotencyRecord.user_id == user_id,
+                IdempotencyRecord.scope == scope,
+                IdempotencyRecord.key == key,
+            )
+        ).scalar_one_or_none()
+
+    def claim(self, user_id: int, scope: str, key: str, op: str, fingerprint: str) -> IdempotencyState:
+        """占用幂等键；已被占用时返回现有记录的状态"""
+        now = datetime.utcnow()
+        ttl = timedelta(hours=int(get_settings().idempotency_ttl_hours))
+        with SessionLocal() as db:
+            rec = self._find(db, user_id, scope, key)
+            if rec is not None and self._stale(rec, now):
+                db.delete(rec)
+                db.commit()
+                rec = None
+            if rec is not None:
+                return self._state(rec, fingerprint)
+            db.add(IdempotencyRecord(
+                user_id=user_id,
+                scope=scope,
+                key=key,
+                op=op,
+                fingerprint=fingerprint,
+                status="pending",
+                expires_at=now + ttl,
+            ))
+            try:
+                db.commit()
+            except IntegrityError:
+                # 并发的同键请求先插入成功：按执行中处理，由调用方轮询
+                db.rollback()
+                return IdempotencyState("pending")
+            return IdempotencyState("claimed")
+
+    def complete(self, user_id: int, scope: str, key: str, status_code: int, body: dict) -> None:
+        ttl = timedelta(hours=int(get_settings().idempotency_ttl_hours))
+        with SessionLocal() as db:
+            rec = self._find(db, user_id, scope, key)
+            if rec is None:
+                return
+            rec.status = "done"
+            rec.status_code = int(status_code)
+            rec.response = json.dumps(body, ensure_ascii=False, default=str)
+            rec.expires_at = datetime.utcnow() + ttl
+            db.commit()
+
+    def touch(self, user_id: int, scope: str, key: str) -> None:
+        """续租执行中的记录：刷新 updated_at，避免长时间运行的操作被视为遗留的 pending"""
+        with SessionLocal() as db:
+            db.execute(
+                update(IdempotencyRecord)
+                .where(
+                    IdempotencyRecord.user_id == user_id,
+                    IdempotencyRecord.scope == scope,
+                    IdempotencyRecord.key == key,
+                    IdempotencyRecord.status == "pending",
+                )
+                .values(updated_at=datetime.utcnow())
+            )
+            db.commit()
+
+    def release(self, user_id: int, scope: str, key: str) -> None:
+        """放弃执行权（失败的请求不保存结果，重试时重新执行）"""
+        with SessionLocal() as db:
+            db.execute(
+                delete(IdempotencyRecord).where(
+                    IdempotencyRecord.user_id == user_id,
+                    IdempotencyRecord.scope == scope,
+                    IdempotencyRecord.key == key,
+                    IdempotencyRecord.status == "pending",
+                )
+            )
+            db.commit()
+
+    def gc_expired(self) -> int:
+        with SessionLocal() as db:
+            res = db.execute(delete(IdempotencyRecord).where(IdempotencyRecord.expires_at < datetime.utcnow()))
+            db.commit()
+            return int(res.rowcount or 0)
+
+
+# 本进程内执行中的幂等键：同进程的重复请求等事件，不必轮询数据库；只在事件循环内使用
+_inflight: Dict[Tuple[int, str, str], asyncio.Event] = {}
+# 请求取消后仍在等待执行结束的收尾任务（保留引用，避免被回收）
+_settling: Set[asyncio.Future] = set()
+_POLL_SECONDS = 0.5
+
+
+def _data_succeeded(data: Any) -> bool:
+    """外层 status 为 ok 时检查操作本身的结果：上游 errno≠0、status=error、批量中有失败条目都不算成功"""
+    if not isinstance(data, dict):
+        return True
+    if str(data.get("status") or "").lower() in {"error", "failed"}:
+        return False
+    try:
+        if int(data.get("errno") or 0) != 0:
+            return False
+    except (TypeError, ValueError):
+        return False
+    try:
+        return int(data.get("failed") or 0) == 0
+    except (TypeError, ValueError):
+        return False
+
+
+def _is_final(status_code: int, body: Any) -> bool:
+    # 只保存成功结果；限流、熔断、上游错误与可续传的失败都允许重试时重新执行
+    return status_code == 200 and isinstance(body, dict) and body.get("status") == "ok" and _data_succeeded(body.get("data"))
+
+
+async def run_idempotent(
+    user_id: int,
+    scope: str,
+    key: str,
+    op: str,
+    fingerprint: str,
+    run: Callable[[], Awaitable[Tuple[int, dict]]],
+    store: Optional[IdempotencyStore] = None,
+) -> Tuple[int, dict, bool]:
+    """同一幂等键只执行一次 run，返回 (状态码, 响应体, 是否为已保存结果的重放)
+
+    执行中的重复请求最多等待 idempotency_wait_seconds，之后抛出 IdempotencyInProgress。
+    """
+    store = store or IdempotencyStore()
+    ident = (user_id, scope, key)
+    wait = float(get_settings().idempotency_wait_seconds)
+    deadline = time.monotonic() + wait
+    while True:
+        state = await asyncio.to_thread(store.claim, user_id, scope, key, op, fingerprint)
+        if state.status == "claimed":
+            break
+        if state.status == "mismatch":
+            raise IdempotencyKeyReused(key)
+        if state.status == "done":
+            return state.status_code or 200, state.body or {}, True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise IdempotencyInProgress(key, max(min(wait, 5.0), 1.0))
+        event = _inflight.get(ident)
+        try:
+            if event is not None:
+                await asyncio.wait_for(event.wait(), remaining)
+            else:
+                await asyncio.sleep(min(_POLL_SECONDS, remaining))
+        except asyncio.TimeoutError:
+            pass
+
+    event = asyncio.Event()
+    _inflight[ident] = event
+
+    async def _heartbeat(task: asyncio.Future) -> None:
+        # 执行期间按租约的 1/3 续租，运行超过租约的操作不会被同键重试再执行一次
+        interval = max(float(get_settings().idempotency_pending_lease_seconds) / 3.0, 1.0)
+        while True:
+            await asyncio.wait({task}, timeout=interval)
+            if task.done():
+                return
+            try:
+                await asyncio.to_thread(store.touch, user_id, scope, key)
+            except Exception:
+                pass
+
+    async def _settle(task: asyncio.Future) -> None:
+        """执行结束后保存成功结果，否则释放键；之后唤醒同进程的等待者"""
+        stored = False
+        try:
+            await asyncio.wait({task})
+            if not task.cancelled() and task.exception() is None:
+                status_code, body = task.result()
+                if _is_final(status_code, body):
+                    await asyncio.to_thread(store.complete, user_id, scope, key, status_code, body)
+                    stored = True
+        finally:
+            try:
+                if not stored:
+                    await asyncio.to_thread(store.release, user_id, scope, key)
+            finally:
+                _inflight.pop(ident, None)
+                event.set()
+
+    task = asyncio.ensure_future(run())
+    heartbeat = asyncio.ensure_future(_heartbeat(task))
+    _settling.add(heartbeat)
+    heartbeat.add_done_callback(_settling.discard)
+    try:
+        await asyncio.shield(task)
+    except asyncio.CancelledError:
+        # 请求被取消（如客户端断开）时改动可能仍在执行：保持 pending，等它结束再保存结果或释放键，
+        # 避免同键重试在结果未知时再执行一次
+        settle = asyncio.ensure_future(_settle(task))
+        _settling.add(settle)
+        settle.add_done_callback(_settling.discard)
+        raise
+    except Exception:
+        pass
+    await _settle(task)
+    status_code, body = task.result()
+    return status_code, body, False
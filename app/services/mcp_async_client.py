@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from app.core.config import get_settings
+from app.services.bulkhead import get_bulkhead
+from app.services.cache import (
+    acached_listing,
+    filelist_touched_paths,
+    listing_cache_invalidate,
+    meta_cache_invalidate_paths,
+    meta_cache_lookup,
+    meta_cache_store,
+    paths_from_filelist,
+)
+from app.services.http_pool import json_loads
+from app.services.rate_governor import UpstreamThrottled, get_rate_governor, is_throttle_signal
+from app.services.resilience import UpstreamUnavailable, aguarded_call
+from app.services.meta_coalescer import get_async_meta_coalescer, parse_fsid_list, subset_response
+from app.services.mcp_client import (
+    LISTALL_PAGE_LIMIT,
+    FM_TASKQUERY_PATH,
+    PAN_API_BASE,
+    check_offline_result,
+    filter_category,
+    listall_page,
+    parse_share_response,
+    prepare_share_request,
+    resolve_access_token,
+    token_scope,
+)
+
+
+# 进程级共享的 httpx.AsyncClient（按需创建，应用关闭时释放）
+_http: Any = None
+_http_lock = asyncio.Lock()
+
+
+def async_client_available() -> bool:
+    """httpx 为可选依赖；未安装时路由回退到线程池中的同步客户端"""
+    return importlib.util.find_spec("httpx") is not None
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+async def get_shared_async_http() -> Any:
+    global _http
+    if _http is None:
+        async with _http_lock:
+            if _http is None:
+                import httpx
+
+                settings = get_settings()
+                # 传入 transport 时 AsyncClient 会忽略自身的 limits/http2，需在 transport 上设置
+                _http = httpx.AsyncClient(
+                    timeout=httpx.Timeout(
+                        float(settings.netdisk_http_read_timeout_seconds),
+                        connect=float(settings.netdisk_http_connect_timeout_seconds),
+                    ),
+                    transport=httpx.AsyncHTTPTransport(
+                        http2=_http2_available(),
+                        retries=int(settings.netdisk_http_retries),
+                        limits=httpx.Limits(
+                            max_connections=int(settings.netdisk_async_max_connections),
+                            max_keepalive_connections=int(settings.netdisk_http_pool_maxsize),
+                            keepalive_expiry=float(settings.netdisk_http_keepalive_idle_seconds),
+                        ),
+                    ),
+                )
+    return _http
+
+
+async def aclose_shared_async_http() -> None:
+    global _http
+    client, _http = _http, None
+    if client is not None:
+        await client.aclose()
+
+
+def async_http_stats() -> Dict[str, Any]:
+    if _http is None:
+        return {"initialized": False, "available": async_client_available()}
+    return {"initialized": True, "available": True, "http2": _http2_available()}
+
+
+class AsyncNetdiskClient:
+    """Event-loop native counterpart of NetdiskClient.
+
+    Covers the read, file-manager, share and offline surface; uploads stay on
+    the synchronous client. Requests mirror the SDK endpoints so responses
+    have the same shape as NetdiskClient's.
+    """
+
+    def __init__(self, access_token: str, mode: str = "user", base_url: str = PAN_API_BASE, scope: Optional[str] = None) -> None:
+        self._token_mode = mode
+        self._access_token = access_token
+        self._scope = scope or token_scope(access_token, None, mode)
+        self._base_url = base_url.rstrip("/")
+
+    async def _call(self, endpoint_class: str, fn: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+        governor = get_rate_governor()
+
+        async def _attempt() -> Any:
+            if governor is None:
+                return await fn(*args, **kwargs)
+            wait = governor.reserve(self._scope)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                resp = await fn(*args, **kwargs)
+            except Exception as e:
+                governor.record(self._scope, is_throttle_signal(error=e))
+                raise
+            governor.record(self._scope, is_throttle_signal(resp))
+            return resp
+
+        return await aguarded_call(endpoint_class, _attempt)
+
+    async def _request(self, method: str, path: str, params: Dict[str, Any], form: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        http = await get_shared_async_http()
+        query = {"access_token": self._access_token, "openapi": "xpansdk"}
+        query.update({k: v for k, v in params.items() if v is not None})
+        data = {k: str(v) for k, v in (form or {}).items() if v is not None} if form is not None else None
+        # 写操作走 POST；filemetas/uinfo/quota/异步任务查询归为元信息类，其余 GET 为列表类
+        if method != "GET":
+            endpoint_class = "write"
+        elif path in {"/api/quota", FM_TASKQUERY_PATH} or params.get("method") in {"filemetas", "uinfo"}:
+            endpoint_class = "meta"
+        else:
+            endpoint_class = "list"
+        resp = await self._call(endpoint_class, http.request, method, f"{self._base_url}{path}", params=query, data=data)
+        resp.raise_for_status()
+        try:
+            parsed = json_loads(resp.content)
+        except ValueError:
+            return {"raw": resp.text}
+        return parsed if isinstance(parsed, dict) else {"data": parsed}
+
+    async def quota(self) -> Dict[str, Any]:
+        return await self._request("GET", "/api/quota", {})
+
+    async def get_user_info(self) -> Dict[str, Any]:
+        try:
+            return await self._request("GET", "/rest/2.0/xpan/nas", {"method": "uinfo", "vip_version": "v2"})
+        except Exception as e:
+            return {"errno": -1, "errmsg": f"获取用户信息失败: {str(e)}"}
+
+    async def list_files(self, dir_path: str = "/", limit: int = 100, order: str = "time", desc: int = 1) -> Dict[str, Any]:
+        return await acached_listing(
+            (self._scope, "list", dir_path, (order, str(desc), limit)),
+            lambda: self._request("GET", "/rest/2.0/xpan/file", {"method": "list", "dir": dir_path, "limit": limit, "order": order, "desc": desc}),
+        )
+
+    async def list_images(self, parent_path: str = "/", page: int = 1, num: int = 50, order: str = "time", desc: str = "1") -> Dict[str, Any]:
+        return await acached_listing(
+            (self._scope, "imagelist", parent_path, (order, str(desc), int(page), int(num))),
+            lambda: self._request("GET", "/rest/2.0/xpan/file", {"method": "imagelist", "parent_path": parent_path, "page": page, "num": num, "order": order, "desc": desc}),
+        )
+
+    async def list_docs(self, parent_path: str = "/", page: int = 1, num: int = 50, order: str = "time", desc: str = "1") -> Dict[str, Any]:
+        return await acached_listing(
+            (self._scope, "doclist", parent_path, (order, str(desc), int(page), int(num))),
+            lambda: self._request("GET", "/rest/2.0/xpan/file", {"method": "doclist", "parent_path": parent_path, "page": page, "num": num, "order": order, "desc": desc}),
+        )
+
+    async def search_filename(self, key: str, dir_path: str = "/", page: str = "1", num: str = "50", recursion: str = "1") -> Dict[str, Any]:
+        return await self._request("GET", "/rest/2.0/xpan/file", {"method": "search", "key": key, "dir": dir_path, "page": page, "num": num, "recursion": recursion})
+
+    async def search_semantic(self, query: str, dir_path: str = "/", page: str = "1", num: str = "50", recursion: str = "1") -> Dict[str, Any]:
+        return await self.search_filename(key=query, dir_path=dir_path, page=page, num=num, recursion=recursion)
+
+    # ---- File manager operations ----
+    async def _filemanager(self, opera: str, filelist_json: str, async_mode: int, ondup: str | None) -> Dict[str, Any]:
+        form = {"async": async_mode, "filelist": filelist_json, "ondup": ondup}
+        try:
+            return await self._request("POST", "/rest/2.0/xpan/file", {"method": "filemanager", "opera": opera}, form=form)
+        finally:
+            if opera != "copy":
+                meta_cache_invalidate_paths(self._scope, paths_from_filelist(filelist_json))
+            listing_cache_invalidate(self._scope, filelist_touched_paths(filelist_json))
+
+    async def fm_delete(self, filelist_json: str, async_mode: int = 1, ondup: str | None = None) -> Dict[str, Any]:
+        return await self._filemanager("delete", filelist_json, async_mode, ondup)
+
+    async def fm_move(self, filelist_json: str, async_mode: int = 1, ondup: str | None = None) -> Dict[str, Any]:
+        return await self._filemanager("move", filelist_json, async_mode, ondup)
+
+    async def fm_rename(self, filelist_json: str, async_mode: int = 1, ondup: str | None = None) -> Dict[str, Any]:
+        return await self._filemanager("rename", filelist_json, async_mode, ondup)
+
+    async def fm_copy(self, filelist_json: str, async_mode: int = 1, ondup: str | None = None) -> Dict[str, Any]:
+        return await self._filemanager("copy", filelist_json, async_mode, ondup)
+
+    async def fm_task_query(self, taskid: str | int) -> Dict[str, Any]:
+        return await self._request("GET", FM_TASKQUERY_PATH, {"taskid": str(taskid)})
+
+    async def mkdir(self, path: str, rtype: int = 0) -> Dict[str, Any]:
+        form = {"path": path, "isdir": 1, "size": 0, "uploadid": "", "block_list": "[]", "rtype": int(rtype)}
+        try:
+            return await self._request("POST", "/rest/2.0/xpan/file", {"method": "create"}, form=form)
+        finally:
+            listing_cache_invalidate(self._scope, [path])
+
+    # ---- Multimedia ----
+    async def list_all(self, path: str = "/", recursion: int = 1, start: int = 0, limit: int = 100, order: str = "time", desc: int = 1) -> Dict[str, Any]:
+        return await self._request("GET", "/rest/2.0/xpan/multimedia", {"method": "listall", "path": path, "recursion": recursion, "start": start, "limit": limit, "order": order, "desc": desc})
+
+    async def walk_all(self, path: str = "/", recursion: int = 1, order: str = "time", desc: int = 1, page_size: int = LISTALL_PAGE_LIMIT) -> AsyncIterator[Dict[str, Any]]:
+        page_size = max(1, min(int(page_size), LISTALL_PAGE_LIMIT))
+
+        def _fetch(start: int) -> "asyncio.Task[Dict[str, Any]]":
+            return asyncio.ensure_future(self.list_all(path=path, recursion=recursion, start=start, limit=page_size, order=order, desc=desc))
+
+        start = 0
+        task: Optional[asyncio.Task] = _fetch(start)
+        try:
+            while task is not None:
+                items, nxt = listall_page(await task, start)
+                # 下一页请求与当前页的消费并行
+                task = _fetch(nxt) if nxt is not None else None
+                start = nxt or start
+                for it in items:
+                    yield it
+        finally:
+            if task is not None and not task.done():
+                task.cancel()
+
+    async def _file_metas_direct(self, fsids: str, thumb: str | None = None, extra: str | None = None, dlink: str | None = None, path: str | None = None, needmedia: int | None = None) -> Dict[str, Any]:
+        return await self._request("GET", "/rest/2.0/xpan/multimedia", {"method": "filemetas", "fsids": fsids, "thumb": thumb, "extra": extra, "dlink": dlink, "path": path, "needmedia": needmedia})
+
+    async def file_metas(self, fsids: str, thumb: str | None = None, extra: str | None = None, dlink: str | None = None, path: str | None = None, needmedia: int | None = None) -> Dict[str, Any]:
+        ids = parse_fsid_list(fsids) if path is None else None
+        if not ids:
+            return await self._file_metas_direct(fsids, thumb=thumb, extra=extra, dlink=dlink, path=path, needmedia=needmedia)
+        variant = (thumb, extra, dlink, needmedia)
+        found, missing = meta_cache_lookup(self._scope, variant, ids)
+        if not missing:
+            return {"errno": 0, "list": [found[f] for f in ids]}
+        resp = await get_async_meta_coalescer().load(
+            (self._access_token,) + variant,
+            missing,
+            lambda merged: self._file_metas_direct(json.dumps(merged), thumb=thumb, extra=extra, dlink=dlink, needmedia=needmedia),
+        )
+        if int(resp.get("errno", 0) or 0) != 0:
+            return resp
+        found.update(meta_cache_store(self._scope, variant, resp))
+        # 以本次上游响应为底，只替换列表为缓存与新取条目按请求顺序的合并
+        return subset_response(resp, found, ids)
+
+    async def download_links(self, fsids: list[int] | list[str] | str) -> Dict[str, Any]:
+        if isinstance(fsids, (list, tuple)):
+            fsids_str = json.dumps([int(x) for x in fsids])
+        else:
+            fsids_str = str(fsids)
+        return await self.file_metas(fsids=fsids_str, dlink="1")
+
+    async def list_videos(self, path: str = "/", recursion: int = 0, start: int = 0, limit: int = 100, order: str = "time", desc: int = 1) -> Dict[str, Any]:
+        data = await self.list_all(path=path, recursion=recursion, start=start, limit=limit, order=order, desc=desc)
+        return filter_category(data, 1)
+
+    async def list_bt(self, path: str = "/", recursion: int = 0, start: int = 0, limit: int = 100, order: str = "time", desc: int = 1) -> Dict[str, Any]:
+        data = await self.list_all(path=path, recursion=recursion, start=start, limit=limit, order=order, desc=desc)
+        return filter_category(data, 7)
+
+    async def list_category(self, path: str = "/", recursion: int = 1, limit: int = LISTALL_PAGE_LIMIT) -> Dict[str, Any]:
+        counts: Dict[int, int] = {}
+        total = 0
+        async for it in self.walk_all(path=path, recursion=recursion, page_size=limit):
+            if not isinstance(it, dict):
+                continue
+            cat = int(it.get("category") or 0)
+            counts[cat] = counts.get(cat, 0) + 1
+            total += 1
+        return {"errno": 0, "counts": counts, "total": total}
+
+    async def recent(self, path: str = "/", limit: int = 50) -> Dict[str, Any]:
+        return await self.list_all(path=path, recursion=1, limit=limit, order="time", desc=1)
+
+    # ---- Share ----
+    async def create_share_link(self, fsid_list: list[int] | list[str] | str, period: int, pwd: str, remark: str | None = None, ticket: dict | None = None) -> Dict[str, Any]:
+        error, url, form, fsid_list_str = prepare_share_request(self._access_token, fsid_list, period, pwd, remark, ticket, base_url=self._base_url)
+        if error is not None:
+            return error
+        try:
+            http = await get_shared_async_http()
+            resp = await self._call("share", http.post, url, data=form)
+        except (UpstreamThrottled, UpstreamUnavailable):
+            # 限流/熔断交给路由层返回 429/503 与 Retry-After
+            raise
+        except Exception as e:
+            return {"errno": -1, "errmsg": str(e)}
+        return parse_share_response(resp.is_success, resp.status_code, resp.reason_phrase, resp.text, fsid_list_str, self._token_mode)
+
+    # ---- 离线下载 ----
+    async def _offline_request(self, params: Dict[str, Any], error_prefix: str) -> Dict[str, Any]:
+        try:
+            http = await get_shared_async_http()
+            query = {"access_token": self._access_token}
+            query.update({k: v for k, v in params.items() if v is not None})
+            resp = await self._call("offline", http.post, f"{self._base_url}/rest/2.0/xpan/offline", params=query)
+            resp.raise_for_status()
+            return check_offline_result(resp.json())
+        except (UpstreamThrottled, UpstreamUnavailable):
+            # 限流/熔断交给路由层返回 429/503 与 Retry-After
+            raise
+        except Exception as e:
+            return {"status": "error", "error": f"{error_prefix}: {str(e)}"}
+
+    async def offline_add(self, url: str, save_path: str = "/", filename: str | None = None) -> Dict[str, Any]:
+        return await self._offline_request({"method": "add_task", "url": url, "save_path": save_path, "filename": filename or None}, "offline_add_failed")
+
+    async def offline_status(self, task_id: str | None = None) -> Dict[str, Any]:
+        return await self._offline_request({"method": "query_task", "task_id": task_id or None}, "offline_status_failed")
+
+    async def offline_cancel(self, task_id: str) -> Dict[str, Any]:
+        return await self._offline_request({"method": "cancel_task", "task_id": task_id}, "offline_cancel_failed")
+
+
+def netdisk_client_for_token(token: str, user_id: Optional[int] = None, mode: str = "user") -> AsyncNetdiskClient:
+    """用已解析的令牌构造客户端（不访问 DB，可在事件循环内直接调用）"""
+    return AsyncNetdiskClient(access_token=token, mode=mode, base_url=get_settings().netdisk_api_base, scope=token_scope(token, user_id, mode))
+
+
+async def aget_netdisk_client(access_token: Optional[str] = None, user_id: Optional[int] = None, mode: str = "user") -> AsyncNetdiskClient:
+    # 令牌解析涉及 DB、解密与可能的刷新，放到授权隔离舱避免阻塞事件循环
+    token = await get_bulkhead("auth").run(resolve_access_token, access_token, user_id, mode)
+    return netdisk_client_for_token(token, user_id, mode)
@@ -1,13 +1,18 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+import concurrent.futures
 import hashlib
+import io
 import json
 import os
 import tempfile
+import threading
 import time
+import uuid
+import zlib
+from dataclasses import dataclass, field
 
-from openapi_client import ApiClient, Configuration
 from openapi_client.api.userinfo_api import UserinfoApi
 from openapi_client.api.fileinfo_api import FileinfoApi
 from openapi_client.api.filemanager_api import FilemanagerApi
@@ -16,39 +21,350 @@ from openapi_client.api.fileupload_api import FileuploadApi
 
 from app.core.config import get_settings
 import urllib.parse
-import urllib.request
 from app.services.token_store import TokenStore
+from app.services.http_pool import get_shared_api_client, get_shared_session, raw_json, upstream_timeout
+from app.services.cache import (
+    cached_listing,
+    filelist_touched_paths,
+    listing_cache_invalidate,
+    meta_cache_invalidate_paths,
+    meta_cache_lookup,
+    meta_cache_store,
+    paths_from_filelist,
+)
+from app.services.meta_coalescer import get_meta_coalescer, parse_fsid_list, subset_response
+from app.services.rate_governor import UpstreamThrottled, get_rate_governor, is_throttle_signal
+from app.services.resilience import UpstreamUnavailable, guarded_call
+from app.services.upload_scheduler import PRIORITY_HIGH, PRIORITY_NORMAL, get_upload_scheduler, part_slot
+from app.services.upload_sessions import UploadSessionStore, session_fingerprint
 from app.core.db import SessionLocal
 
 
+PAN_API_BASE = "https://pan.baidu.com"
+# 文件管理异步任务（filemanager async=1/2 返回的 taskid）查询接口
+FM_TASKQUERY_PATH = "/share/taskquery"
+# create/superfile2 返回这些 errno 时续传会话已在上游失效（2：uploadid 无效；31363：分片已被清理）
+UPLOAD_SESSION_EXPIRED_ERRNOS = frozenset({2, 31363})
+
+
+class UploadSessionExpired(RuntimeError):
+    """superfile2 reports that the uploadid is no longer valid; retrying the part cannot help."""
+
+
+def _upload_error(body: Any) -> tuple[int, str]:
+    """从上传接口的响应体（dict / JSON 文本）取出 (errno, 错误信息)；无错误时 errno 为 0"""
+    if isinstance(body, (bytes, str)):
+        try:
+            body = json.loads(body)
+        except (TypeError, ValueError):
+            return 0, ""
+    if not isinstance(body, dict):
+        return 0, ""
+    try:
+        code = int(body.get("errno") or body.get("error_code") or 0)
+    except (TypeError, ValueError):
+        code = 0
+    return code, str(body.get("errmsg") or body.get("error_msg") or "")
+
+
+def upload_session_expired(body: Any) -> bool:
+    code, msg = _upload_error(body)
+    return code in UPLOAD_SESSION_EXPIRED_ERRNOS or "uploadid" in msg.lower().replace(" ", "")
+
+
+def resolve_access_token(access_token: Optional[str] = None, user_id: Optional[int] = None, mode: str = "user") -> str:
+    """按令牌模式解析百度 access_token（同步/异步客户端共用）"""
+    if mode == "public":
+        # 仅使用服务账户令牌，不再回退环境变量
+        with SessionLocal() as db:
+            store = TokenStore(db)
+            token = store.ensure_fresh_service_token()
+            return token or ""
+    if user_id is not None:
+        with SessionLocal() as db:
+            store = TokenStore(db)
+            token = store.ensure_fresh_access_token(user_id)
+            # 用户态：必须拿到用户自己的百度token，禁止任何服务态/环境变量兜底
+            if not token:
+                raise ValueError("user_baidu_token_missing")
+            return token
+    return access_token or ""
+
+
+def token_scope(access_token: str, user_id: Optional[int] = None, mode: str = "user") -> str:
+    if mode == "public":
+        return "public"
+    if user_id is not None:
+        return f"user:{user_id}"
+    return "token:" + hashlib.sha256((access_token or "").encode()).hexdigest()[:32]
+
+
+def filter_category(data: Dict[str, Any], category: int) -> Dict[str, Any]:
+    """从 listall 结果中按 category 过滤（1=视频, 7=BT）"""
+    items = data.get("list") or data.get("data", {}).get("list") or data
+    if isinstance(items, dict) and "list" in items:
+        items = items["list"]
+    filtered = [it for it in (items or []) if isinstance(it, dict) and it.get("category") == category]
+    return {"errno": 0, "list": filtered}
+
+
+def count_category_items(items: Iterable[Any]) -> Dict[str, Any]:
+    counts: Dict[int, int] = {}
+    total = 0
+    for it in items:
+        if not isinstance(it, dict):
+            continue
+        cat = int(it.get("category") or 0)
+        counts[cat] = counts.get(cat, 0) + 1
+        total += 1
+    return {"errno": 0, "counts": counts, "total": total}
+
+
+LISTALL_PAGE_LIMIT = 1000  # xpanfilelistall 单页上限
+
+
+def listall_page(data: Dict[str, Any], start: int) -> tuple[list, Optional[int]]:
+    """取出 listall 单页条目与下一页起点（无更多时为 None）"""
+    errno = int(data.get("errno", 0) or 0) if isinstance(data, dict) else 0
+    if errno != 0:
+        raise RuntimeError(f"listall_failed errno={errno}")
+    items = data.get("list") or []
+    if not int(data.get("has_more") or 0) or not items:
+        return items, None
+    cursor = data.get("cursor")
+    nxt = int(cursor) if cursor is not None else start + len(items)
+    # 游标不前进时终止，避免上游异常导致死循环
+    return items, (nxt if nxt > start else None)
+
+
+def prepare_share_request(access_token: str, fsid_list: list[int] | list[str] | str, period: int, pwd: str, remark: str | None = None, ticket: dict | None = None, base_url: str = PAN_API_BASE) -> tuple[Optional[Dict[str, Any]], str, Dict[str, str], str]:
+    """校验分享参数并构造请求，返回 (error, url, form, fsid_list_str)"""
+    settings = get_settings()
+    appid = settings.baidu_app_id or ""
+    # 基础参数校验（提前拦截明显错误）
+    try:
+        import re
+        if period not in {1, 7, 30}:
+            return {"errno": -40001, "errmsg": "invalid period, must be 1/7/30", "period": period}, "", {}, ""
+        if not isinstance(pwd, str) or not re.fullmatch(r"[a-z0-9]{4}", pwd or ""):
+            return {"errno": -40002, "errmsg": "invalid pwd, must be 4 chars [a-z0-9]", "pwd": pwd}, "", {}, ""
+    except Exception:
+        pass
+
+    if isinstance(fsid_list, (list, tuple)):
+        fsid_list_str = json.dumps([str(x) for x in fsid_list])
+    else:
+        fsid_list_str = str(fsid_list)
+
+    # doc requires: POST form to https://pan.baidu.com/apaas/1.0/share/set?product=netdisk&appid=...&access_token=...
+    query = urllib.parse.urlencode({
+        "product": "netdisk",
+        "appid": appid,
+        "access_token": access_token,
+    })
+    url = f"{base_url}/apaas/1.0/share/set?{query}"
+    form = {
+        "fsid_list": fsid_list_str,
+        "period": str(period),
+        "pwd": pwd,
+    }
+    if remark:
+        form["remark"] = remark
+    if ticket:
+        form["ticket"] = json.dumps(ticket, ensure_ascii=False)
+    return None, url, form, fsid_list_str
+
+
+def parse_share_response(ok: bool, status: int, reason: str, body: str, fsid_list_str: str, token_mode: str) -> Dict[str, Any]:
+    if ok:
+        try:
+            parsed = json.loads(body)
+        except Exception:
+            parsed = {"raw": body}
+        # 正常 2xx 时直接返回百度结构
+        return parsed
+
+    # 非 2xx：透传百度原始错误以便定位（如 MAC check failed / errno）
+    try:
+        err_parsed = json.loads(body)
+        if not isinstance(err_parsed, dict):
+            err_parsed = {"errmsg": body}
+    except Exception:
+        err_parsed = {"errmsg": body}
+    # 附带调试关键信息（不包含 token），帮助确认是否为 appid/令牌不匹配
+    err_parsed.setdefault("errno", -1)
+    err_parsed.setdefault("errmsg", f"HTTP Error {status}: {reason}")
+    # 解析 fsid_list 长度时避免再次抛错
+    fs_len = 0
+    try:
+        parsed_fs = json.loads(fsid_list_str) if fsid_list_str and fsid_list_str.strip().startswith("[") else None
+        if isinstance(parsed_fs, list):
+            fs_len = len(parsed_fs)
+    except Exception:
+        fs_len = 0
+    err_parsed["__debug"] = {
+        "appid": get_settings().baidu_app_id or "",
+        "token_mode": token_mode or "unknown",
+        "fsid_list_len": fs_len,
+        "http_status": status,
+    }
+    return err_parsed
+
+
+def upload_block_size() -> int:
+    return max(int(get_settings().upload_block_size_mb), 1) * 1024 * 1024
+
+
+RAPID_SLICE_SIZE = 256 * 1024  # slice-md5 取文件前 256KB；小于此大小的文件不做秒传
+
+
+@dataclass
+class ContentDigest:
+    block_md5s: list[str]
+    content_md5: str
+    slice_md5: str
+    crc32: int
+
+
+def _digest_blocks(blocks: Iterable[bytes]) -> ContentDigest:
+    md5s: list[str] = []
+    whole = hashlib.md5()
+    head = hashlib.md5()
+    head_left = RAPID_SLICE_SIZE
+    crc = 0
+    for chunk in blocks:
+        md5s.append(hashlib.md5(chunk).hexdigest())
+        whole.update(chunk)
+        crc = zlib.crc32(chunk, crc)
+        if head_left > 0:
+            head.update(chunk[:head_left])
+            head_left -= min(len(chunk), head_left)
+    return ContentDigest(
+        block_md5s=md5s or [hashlib.md5(b"").hexdigest()],
+        content_md5=whole.hexdigest(),
+        slice_md5=head.hexdigest(),
+        crc32=crc & 0xFFFFFFFF,
+    )
+
+
+def hash_file(local_file_path: str, block_size: int) -> ContentDigest:
+    """单次流式读取，同时得到分片 md5、全文 md5、前 256KB md5 与 CRC32"""
+    with open(local_file_path, "rb") as f:
+        return _digest_blocks(iter(lambda: f.read(block_size), b""))
+
+
+def hash_bytes(data: bytes, block_size: int) -> ContentDigest:
+    view = memoryview(data)
+    return _digest_blocks(view[i:i + block_size] for i in range(0, len(data), block_size))
+
+
+def inmemory_upload_limit() -> int:
+    return max(int(get_settings().upload_inmemory_max_mb), 0) * 1024 * 1024
+
+
+# 流式上传时 precreate 声明分片数用的占位 md5（真实值在 create 时提交）
+PLACEHOLDER_BLOCK_MD5 = "5910a591dd8fc18c32a8f3df4fdc1761"
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def iter_blocks(chunks: Iterable[bytes], block_size: int) -> Iterator[bytes]:
+    """把任意大小的数据块重组为定长分片（末片可短）"""
+    buf = bytearray()
+    for chunk in chunks:
+        if not chunk:
+            continue
+        buf += chunk
+        while len(buf) >= block_size:
+            yield bytes(buf[:block_size])
+            del buf[:block_size]
+    if buf:
+        yield bytes(buf)
+
+
+# 秒传命中统计（进程级）
+_rapid_lock = threading.Lock()
+_rapid_stats: Dict[str, int] = {"attempts": 0, "hits": 0, "misses": 0, "errors": 0, "bytes_saved": 0}
+
+
+def _record_rapid(outcome: str, size: int = 0) -> None:
+    with _rapid_lock:
+        _rapid_stats["attempts"] += 1
+        _rapid_stats[outcome] += 1
+        if outcome == "hits":
+            _rapid_stats["bytes_saved"] += int(size)
+
+
+def rapid_upload_stats() -> Dict[str, Any]:
+    with _rapid_lock:
+        data: Dict[str, Any] = dict(_rapid_stats)
+    decided = data["hits"] + data["misses"]
+    data["hit_ratio"] = round(data["hits"] / decided, 4) if decided else None
+    return data
+
+
+def check_offline_result(result: Any) -> Any:
+    # 检查百度网盘API返回的错误码
+    if isinstance(result, dict) and "errno" in result:
+        errno = result.get("errno", 0)
+        if errno != 0:
+            error_msg = result.get("errmsg", "未知错误")
+            return {"status": "error", "error": f"百度网盘API错误 {errno}: {error_msg}"}
+    return result
+
+
+@dataclass
+class _BytesUpload:
+    """内存上传在 precreate → 分片 → create 各阶段之间传递的状态"""
+    remote_path: str
+    data: bytes
+    digest: ContentDigest | None = None
+    uploadid: str = ""
+    pending: list[int] = field(default_factory=list)
+    result: Dict[str, Any] | None = None
+
+
 class NetdiskClient:
-    def __init__(self, access_token: Optional[str] = None, user_id: Optional[int] = None, mode: str = "user") -> None:
-        settings = get_settings()
+    def __init__(self, access_token: Optional[str] = None, user_id: Optional[int] = None, mode: str = "user", token_resolved: bool = False) -> None:
         # 记录令牌模式，便于下游调试输出
         self._token_mode = mode
-        if mode == "public":
-            # 仅使用服务账户令牌，不再回退环境变量
-            with SessionLocal() as db:
-                store = TokenStore(db)
-                token = store.ensure_fresh_service_token()
-                self._access_token = token or ""
-        elif user_id is not None:
-            with SessionLocal() as db:
-                store = TokenStore(db)
-                token = store.ensure_fresh_access_token(user_id)
-                # 用户态：必须拿到用户自己的百度token，禁止任何服务态/环境变量兜底
-                if not token:
-                    raise ValueError("user_baidu_token_missing")
-                self._access_token = token
-        else:
+        # token_resolved=True 时 access_token 已按模式解析过（批量执行共用一次解析结果）
+        if token_resolved:
             self._access_token = access_token or ""
-        self._config = Configuration()
+        else:
+            self._access_token = resolve_access_token(access_token=access_token, user_id=user_id, mode=mode)
+        # 上传会话等持久化状态按令牌作用域隔离（不落库原始令牌）
+        self._scope = token_scope(self._access_token, user_id, mode)
+        # 上传调度按用户公平排队；公共模式下多个用户共用服务令牌，仍按用户区分
+        self._owner = f"user:{user_id}" if user_id is not None else self._scope
+        # 复用进程级连接池，避免每次调用都重新握手
+        self._api_client = get_shared_api_client()
+
+    def _call(self, endpoint_class: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """所有上游调用的统一入口
+
+        按接口分类熔断（上游故障时快速失败），每次实际请求（含对冲请求）
+        先经令牌级速率调节器排队，再根据结果调整速率。
+        """
+        governor = get_rate_governor()
+
+        def _attempt() -> Any:
+            if governor is None:
+                return fn(*args, **kwargs)
+            governor.acquire(self._scope)
+            try:
+                resp = fn(*args, **kwargs)
+            except Exception as e:
+                governor.record(self._scope, is_throttle_signal(error=e))
+                raise
+            governor.record(self._scope, is_throttle_signal(resp))
+            return resp
+
+        return guarded_call(endpoint_class, _attempt)
 
     def quota(self) -> Dict[str, Any]:
-        with ApiClient(self._config) as api_client:
-            api = UserinfoApi(api_client)
-            resp = api.apiquota(access_token=self._access_token)
-            return resp.to_dict() if hasattr(resp, "to_dict") else dict(resp)
+        api = UserinfoApi(self._api_client)
+        resp = self._call("meta", raw_json(api.apiquota), access_token=self._access_token)
+        return resp.to_dict() if hasattr(resp, "to_dict") else dict(resp)
 
     def get_user_info(self) -> Dict[str, Any]:
         """获取百度网盘用户信息"""
@@ -62,7 +378,7 @@ class NetdiskClient:
         }
         
         try:
-            response = requests.get(url, params=params)
+            response = self._call("meta", get_shared_session().get, url, params=params, timeout=upstream_timeout())
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -72,200 +388,179 @@ class NetdiskClient:
             }
 
     def list_files(self, dir_path: str = "/", limit: int = 100, order: str = "time", desc: int = 1) -> Dict[str, Any]:
-        with ApiClient(self._config) as api_client:
-            api = FileinfoApi(api_client)
-            resp = api.xpanfilelist(access_token=self._access_token, dir=dir_path, limit=limit, order=order, desc=desc)
+        def _fetch() -> Dict[str, Any]:
+            api = FileinfoApi(self._api_client)
+            resp = self._call("list", raw_json(api.xpanfilelist), access_token=self._access_token, dir=dir_path, limit=limit, order=order, desc=desc)
             return resp.to_dict() if hasattr(resp, "to_dict") else (resp if isinstance(resp, dict) else {"data": resp})
 
+        return cached_listing((self._scope, "list", dir_path, (order, str(desc), limit)), _fetch)
+
     def list_images(self, parent_path: str = "/", page: int = 1, num: int = 50, order: str = "time", desc: str = "1") -> Dict[str, Any]:
-        with ApiClient(self._config) as api_client:
-            api = FileinfoApi(api_client)
-            resp = api.xpanfileimagelist(access_token=self._access_token, parent_path=parent_path, page=page, num=num, order=order, desc=desc)
+        def _fetch() -> Dict[str, Any]:
+            api = FileinfoApi(self._api_client)
+            resp = self._call("list", raw_json(api.xpanfileimagelist), access_token=self._access_token, parent_path=parent_path, page=page, num=num, order=order, desc=desc)
             return resp.to_dict() if hasattr(resp, "to_dict") else (resp if isinstance(resp, dict) else {"data": resp})
 
+        return cached_listing((self._scope, "imagelist", parent_path, (order, str(desc), int(page), int(num))), _fetch)
+
     def list_docs(self, parent_path: str = "/", page: int = 1, num: int = 50, order: str = "time", desc: str = "1") -> Dict[str, Any]:
-        with ApiClient(self._config) as api_client:
-            api = FileinfoApi(api_client)
-            resp = api.xpanfiledoclist(access_token=self._access_token, parent_path=parent_path, page=page, num=num, order=order, desc=desc)
+        def _fetch() -> Dict[str, Any]:
+            api = FileinfoApi(self._api_client)
+            resp = self._call("list", raw_json(api.xpanfiledoclist), access_token=self._access_token, parent_path=parent_path, page=page, num=num, order=order, desc=desc)
             return resp.to_dict() if hasattr(resp, "to_dict") else (resp if isinstance(resp, dict) else {"data": resp})
 
+        return cached_listing((self._scope, "doclist", parent_path, (order, str(desc), int(page), int(num))), _fetch)
+
     def search_filename(self, key: str, dir_path: str = "/", page: str = "1", num: str = "50", recursion: str = "1") -> Dict[str, Any]:
-        with ApiClient(self._config) as api_client:
-            api = FileinfoApi(api_client)
-            resp = api.xpanfilesearch(access_token=self._access_token, key=key, dir=dir_path, page=page, num=num, recursion=recursion)
-            return resp.to_dict() if hasattr(resp, "to_dict") else (resp if isinstance(resp, dict) else {"data": resp})
+        api = FileinfoApi(self._api_client)
+        resp = self._call("list", raw_json(api.xpanfilesearch), access_token=self._access_token, key=key, dir=dir_path, page=page, num=num, recursion=recursion)
+        return resp.to_dict() if hasattr(resp, "to_dict") else (resp if isinstance(resp, dict) else {"data": resp})
 
     # ---- File manager operations ----
     def fm_delete(self, filelist_json: str, async_mode: int = 1, ondup: str | None = None) -> Dict[str, Any]:
-        with ApiClient(self._config) as api_client:
-            api = FilemanagerApi(api_client)
-            kwargs = {"access_token": self._access_token, "_async": async_mode, "filelist": filelist_json}
-            if ondup is not None:
-                kwargs["ondup"] = ondup
-            resp = api.filemanagerdelete(**kwargs)
-            return resp.to_dict() if hasattr(resp, "to_dict") else (resp if isinstance(resp, dict) else {"status": "ok"})
+        api = FilemanagerApi(self._api_client)
+        kwargs = {"access_token": self._access_token, "_async": async_mode, "filelist": filelist_json}
+        if ondup is not None:
+            kwargs["ondup"] = ondup
+        try:
+            resp = self._call("write", raw_json(api.filemanagerdelete), **kwargs)
+        finally:
+            # 源路径（含子路径）下缓存的元信息/dlink 以及涉及目录的列表失效
+            meta_cache_invalidate_paths(self._scope, paths_from_filelist(filelist_json))
+            listing_cache_invalidate(self._scope, filelist_touched_paths(filelist_json))
+        return resp.to_dict() if hasattr(resp, "to_dict") else (resp if isinstance(resp, dict) else {"status": "ok"})
 
     def fm_move(self, filelist_json: str, async_mode: int = 1, ondup: str | None = None) -> Dict[str, Any]:
-        with ApiClient(self._config) as api_client:
-            api = FilemanagerApi(api_client)
-            kwargs = {"access_token": self._access_token, "_async": async_mode, "filelist": filelist_json}
-            if ondup is not None:
-                kwargs["ondup"] = ondup
-            resp = api.filemanagermove(**kwargs)
-            return resp.to_dict() if hasattr(resp, "to_dict") else (resp if isinstance(resp, dict) else {"status": "ok"})
+        api = FilemanagerApi(self._api_client)
+        kwargs = {"access_token": self._access_token, "_async": async_mode, "filelist": filelist_json}
+        if ondup is not None:
+            kwargs["ondup"] = ondup
+        try:
+            resp = self._call("write", raw_json(api.filemanagermove), **kwargs)
+        finally:
+            # 源路径（含子路径）下缓存的元信息/dlink 以及涉及目录的列表失效
+            meta_cache_invalidate_paths(self._scope, paths_from_filelist(filelist_json))
+            listing_cache_invalidate(self._scope, filelist_touched_paths(filelist_json))
+        return resp.to_dict() if hasattr(resp, "to_dict") else (resp if isinstance(resp, dict) else {"status": "ok"})
 
     def fm_rename(self, filelist_json: str, async_mode: int = 1, ondup: str | None = None) -> Dict[str, Any]:
-        with ApiClient(self._config) as api_client:
-            api = FilemanagerApi(api_client)
-            kwargs = {"access_token": self._access_token, "_async": async_mode, "filelist": filelist_json}
-            if ondup is not None:
-                kwargs["ondup"] = ondup
-            resp = api.filemanagerrename(**kwargs)
-            return resp.to_dict() if hasattr(resp, "to_dict") else (resp if isinstance(resp, dict) else {"status": "ok"})
+        api = FilemanagerApi(self._api_client)
+        kwargs = {"access_token": self._access_token, "_async": async_mode, "filelist": filelist_json}
+        if ondup is not None:
+            kwargs["ondup"] = ondup
+        try:
+            resp = self._call("write", raw_json(api.filemanagerrename), **kwargs)
+        finally:
+            # 源路径（含子路径）下缓存的元信息/dlink 以及涉及目录的列表失效
+            meta_cache_invalidate_paths(self._scope, paths_from_filelist(filelist_json))
+            listing_cache_invalidate(self._scope, filelist_touched_paths(filelist_json))
+        return resp.to_dict() if hasattr(resp, "to_dict") else (resp if isinstance(resp, dict) else {"status": "ok"})
 
     def fm_copy(self, filelist_json: str, async_mode: int = 1, ondup: str | None = None) -> Dict[str, Any]:
-        with ApiClient(self._config) as api_client:
-            api = FilemanagerApi(api_client)
-            kwargs = {"access_token": self._access_token, "_async": async_mode, "filelist": filelist_json}
-            if ondup is not None:
-                kwargs["ondup"] = ondup
-            resp = api.filemanagercopy(**kwargs)
-            return resp.to_dict() if hasattr(resp, "to_dict") else (resp if isinstance(resp, dict) else {"status": "ok"})
+        api = FilemanagerApi(self._api_client)
+        kwargs = {"access_token": self._access_token, "_async": async_mode, "filelist": filelist_json}
+        if ondup is not None:
+            kwargs["ondup"] = ondup
+        try:
+            resp = self._call("write", raw_json(api.filemanagercopy), **kwargs)
+        finally:
+            listing_cache_invalidate(self._scope, filelist_touched_paths(filelist_json))
+        return resp.to_dict() if hasattr(resp, "to_dict") else (resp if isinstance(resp, dict) else {"status": "ok"})
+
+    def fm_task_query(self, taskid: str | int) -> Dict[str, Any]:
+        """查询文件管理异步任务状态：status 为 pending/running/success/failed"""
+        params = {"access_token": self._access_token, "taskid": str(taskid)}
+        resp = self._call("meta", get_shared_session().get, f"{get_settings().netdisk_api_base}{FM_TASKQUERY_PATH}", params=params, timeout=upstream_timeout())
+        resp.raise_for_status()
+        data = resp.json()
+        return data if isinstance(data, dict) else {"data": data}
 
     # ---- Multimedia ----
     def list_all(self, path: str = "/", recursion: int = 1, start: int = 0, limit: int = 100, order: str = "time", desc: int = 1) -> Dict[str, Any]:
-        with ApiClient(self._config) as api_client:
-            api = MultimediafileApi(api_client)
-            resp = api.xpanfilelistall(access_token=self._access_token, path=path, recursion=recursion, start=start, limit=limit, order=order, desc=desc)
-            return resp.to_dict() if hasattr(resp, "to_dict") else (resp if isinstance(resp, dict) else {"data": resp})
+        api = MultimediafileApi(self._api_client)
+        resp = self._call("list", raw_json(api.xpanfilelistall), access_token=self._access_token, path=path, recursion=recursion, start=start, limit=limit, order=order, desc=desc)
+        return resp.to_dict() if hasattr(resp, "to_dict") else (resp if isinstance(resp, dict) else {"data": resp})
+
+    def walk_all(self, path: str = "/", recursion: int = 1, order: str = "time", desc: int = 1, page_size: int = LISTALL_PAGE_LIMIT) -> Iterator[Dict[str, Any]]:
+        """逐页遍历 listall 并逐条产出；调用方消费当前页时后台预取下一页"""
+        page_size = max(1, min(int(page_size), LISTALL_PAGE_LIMIT))
+
+        def _fetch(start: int) -> Dict[str, Any]:
+            return self.list_all(path=path, recursion=recursion, start=start, limit=page_size, order=order, desc=desc)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as prefetch:
+            start = 0
+            future: concurrent.futures.Future | None = prefetch.submit(_fetch, start)
+            while future is not None:
+                items, nxt = listall_page(future.result(), start)
+                future = prefetch.submit(_fetch, nxt) if nxt is not None else None
+                start = nxt or start
+                yield from items
+
+    def _file_metas_direct(self, fsids: str, thumb: str | None = None, extra: str | None = None, dlink: str | None = None, path: str | None = None, needmedia: int | None = None) -> Dict[str, Any]:
+        api = MultimediafileApi(self._api_client)
+        resp = self._call("meta", raw_json(api.xpanmultimediafilemetas), access_token=self._access_token, fsids=fsids, thumb=thumb, extra=extra, dlink=dlink, path=path, needmedia=needmedia)
+        return resp.to_dict() if hasattr(resp, "to_dict") else (resp if isinstance(resp, dict) else {"data": resp})
 
     def file_metas(self, fsids: str, thumb: str | None = None, extra: str | None = None, dlink: str | None = None, path: str | None = None, needmedia: int | None = None) -> Dict[str, Any]:
-        with ApiClient(self._config) as api_client:
-            api = MultimediafileApi(api_client)
-            resp = api.xpanmultimediafilemetas(access_token=self._access_token, fsids=fsids, thumb=thumb, extra=extra, dlink=dlink, path=path, needmedia=needmedia)
-            return resp.to_dict() if hasattr(resp, "to_dict") else (resp if isinstance(resp, dict) else {"data": resp})
+        """查询文件元信息
+
+        按 (令牌作用域, fsid) 缓存；未命中的部分与同一令牌、同一选项的并发查询
+        在短窗口内合并为一次上游调用。
+        """
+        ids = parse_fsid_list(fsids) if path is None else None
+        if not ids:
+            return self._file_metas_direct(fsids, thumb=thumb, extra=extra, dlink=dlink, path=path, needmedia=needmedia)
+        variant = (thumb, extra, dlink, needmedia)
+        found, missing = meta_cache_lookup(self._scope, variant, ids)
+        if not missing:
+            return {"errno": 0, "list": [found[f] for f in ids]}
+        resp = get_meta_coalescer().load(
+            (self._access_token,) + variant,
+            missing,
+            lambda merged: self._file_metas_direct(json.dumps(merged), thumb=thumb, extra=extra, dlink=dlink, needmedia=needmedia),
+        )
+        if int(resp.get("errno", 0) or 0) != 0:
+            return resp
+        found.update(meta_cache_store(self._scope, variant, resp))
+        # 以本次上游响应为底，只替换列表为缓存与新取条目按请求顺序的合并
+        return subset_response(resp, found, ids)
 
     def download_links(self, fsids: list[int] | list[str] | str) -> Dict[str, Any]:
         if isinstance(fsids, (list, tuple)):
             fsids_str = json.dumps([int(x) for x in fsids])
         else:
             fsids_str = str(fsids)
-        with ApiClient(self._config) as api_client:
-            api = MultimediafileApi(api_client)
-            resp = api.xpanmultimediafilemetas(access_token=self._access_token, fsids=fsids_str, dlink="1")
-            data = resp.to_dict() if hasattr(resp, "to_dict") else (resp if isinstance(resp, dict) else {"data": resp})
-            return data
+        return self.file_metas(fsids=fsids_str, dlink="1")
 
     # ---- Share (per doc https://pan.baidu.com/union/doc/Tlaaocmkj) ----
     def create_share_link(self, fsid_list: list[int] | list[str] | str, period: int, pwd: str, remark: str | None = None, ticket: dict | None = None) -> Dict[str, Any]:
-        settings = get_settings()
-        appid = settings.baidu_app_id or ""
-        # 基础参数校验（提前拦截明显错误）
-        try:
-            import re
-            if period not in {1, 7, 30}:
-                return {"errno": -40001, "errmsg": "invalid period, must be 1/7/30", "period": period}
-            if not isinstance(pwd, str) or not re.fullmatch(r"[a-z0-9]{4}", pwd or ""):
-                return {"errno": -40002, "errmsg": "invalid pwd, must be 4 chars [a-z0-9]", "pwd": pwd}
-        except Exception:
-            pass
-
-        if isinstance(fsid_list, (list, tuple)):
-            fsid_list_str = json.dumps([str(x) for x in fsid_list])
-        else:
-            fsid_list_str = str(fsid_list)
-
-        # doc requires: POST form to https://pan.baidu.com/apaas/1.0/share/set?product=netdisk&appid=...&access_token=...
-        query = urllib.parse.urlencode({
-            "product": "netdisk",
-            "appid": appid,
-            "access_token": self._access_token,
-        })
-        url = f"https://pan.baidu.com/apaas/1.0/share/set?{query}"
-        form = {
-            "fsid_list": fsid_list_str,
-            "period": str(period),
-            "pwd": pwd,
-        }
-        if remark:
-            form["remark"] = remark
-        if ticket:
-            form["ticket"] = json.dumps(ticket, ensure_ascii=False)
-
-        data = urllib.parse.urlencode(form).encode()
-        req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/x-www-form-urlencoded"})
+        error, url, form, fsid_list_str = prepare_share_request(self._access_token, fsid_list, period, pwd, remark, ticket)
+        if error is not None:
+            return error
 
         try:
-            with urllib.request.urlopen(req, timeout=20) as resp:
-                body = resp.read().decode("utf-8")
-                try:
-                    parsed = json.loads(body)
-                except Exception:
-                    parsed = {"raw": body}
-                # 正常 2xx 时直接返回百度结构
-                return parsed
+            resp = self._call("share", get_shared_session().post, url, data=form, timeout=upstream_timeout())
+        except (UpstreamThrottled, UpstreamUnavailable):
+            # 限流/熔断交给路由层返回 429/503 与 Retry-After
+            raise
         except Exception as e:
-            # 若为 HTTPError，读取响应体，透传百度原始错误以便定位（如 MAC check failed / errno）
-            try:
-                from urllib.error import HTTPError
-                if isinstance(e, HTTPError) and e.fp is not None:
-                    err_body = e.fp.read().decode("utf-8", errors="ignore")
-                    try:
-                        err_parsed = json.loads(err_body)
-                    except Exception:
-                        err_parsed = {"errmsg": err_body}
-                    # 附带调试关键信息（不包含 token），帮助确认是否为 appid/令牌不匹配
-                    err_parsed.setdefault("errno", -1)
-                    err_parsed.setdefault("errmsg", str(e))
-                    # 解析 fsid_list 长度时避免再次抛错
-                    fs_len = 0
-                    try:
-                        parsed_fs = json.loads(fsid_list_str) if fsid_list_str and fsid_list_str.strip().startswith("[") else None
-                        if isinstance(parsed_fs, list):
-                            fs_len = len(parsed_fs)
-                    except Exception:
-                        fs_len = 0
-                    err_parsed["__debug"] = {
-                        "appid": appid,
-                        "token_mode": getattr(self, "_token_mode", "unknown"),
-                        "fsid_list_len": fs_len,
-                        "http_status": getattr(e, "code", None),
-                    }
-                    return err_parsed
-            except Exception:
-                pass
-            # 兜底：无法读取响应体时，返回通用错误
+            # 连接/超时类错误：返回通用错误
             return {"errno": -1, "errmsg": str(e)}
+        return parse_share_response(resp.ok, resp.status_code, resp.reason, resp.text, fsid_list_str, self._token_mode)
 
     # ---- Convenience filters (videos / bt / category summary / recent) ----
     def list_videos(self, path: str = "/", recursion: int = 0, start: int = 0, limit: int = 100, order: str = "time", desc: int = 1) -> Dict[str, Any]:
         data = self.list_all(path=path, recursion=recursion, start=start, limit=limit, order=order, desc=desc)
-        items = data.get("list") or data.get("data", {}).get("list") or data
-        if isinstance(items, dict) and "list" in items:
-            items = items["list"]
-        filtered = [it for it in (items or []) if isinstance(it, dict) and it.get("category") == 1]
-        return {"errno": 0, "list": filtered}
+        return filter_category(data, 1)
 
     def list_bt(self, path: str = "/", recursion: int = 0, start: int = 0, limit: int = 100, order: str = "time", desc: int = 1) -> Dict[str, Any]:
         data = self.list_all(path=path, recursion=recursion, start=start, limit=limit, order=order, desc=desc)
-        items = data.get("list") or data.get("data", {}).get("list") or data
-        if isinstance(items, dict) and "list" in items:
-            items = items["list"]
-        filtered = [it for it in (items or []) if isinstance(it, dict) and it.get("category") == 7]
-        return {"errno": 0, "list": filtered}
-
-    def list_category(self, path: str = "/", recursion: int = 1, limit: int = 1000) -> Dict[str, Any]:
-        data = self.list_all(path=path, recursion=recursion, limit=limit)
-        items = data.get("list") or data.get("data", {}).get("list") or []
-        if isinstance(items, dict) and "list" in items:
-            items = items["list"]
-        counts: Dict[int, int] = {}
-        for it in items or []:
-            if not isinstance(it, dict):
-                continue
-            cat = int(it.get("category") or 0)
-            counts[cat] = counts.get(cat, 0) + 1
-        return {"errno": 0, "counts": counts}
+        return filter_category(data, 7)
+
+    def list_category(self, path: str = "/", recursion: int = 1, limit: int = LISTALL_PAGE_LIMIT) -> Dict[str, Any]:
+        """统计整个目录树的分类数量（limit 为分页大小，不再截断结果）"""
+        return count_category_items(self.walk_all(path=path, recursion=recursion, page_size=limit))
 
     def recent(self, path: str = "/", limit: int = 50) -> Dict[str, Any]:
         data = self.list_all(path=path, recursion=1, limit=limit, order="time", desc=1)
@@ -277,88 +572,362 @@ class NetdiskClient:
 
         Some providers ignore uploadid/block_list for directories; pass placeholders.
         """
-        with ApiClient(self._config) as api_client:
-            api = FileuploadApi(api_client)
-            kwargs = {
-                "access_token": self._access_token,
-                "path": path,
-                "isdir": 1,
-                "size": 0,
-                "uploadid": "",
-                "block_list": "[]",
-            }
-            kwargs["rtype"] = int(rtype)
-            resp = api.xpanfilecreate(**kwargs)
-            return resp.to_dict() if hasattr(resp, "to_dict") else (resp if isinstance(resp, dict) else {"data": resp})
+        api = FileuploadApi(self._api_client)
+        kwargs = {
+            "access_token": self._access_token,
+            "path": path,
+            "isdir": 1,
+            "size": 0,
+            "uploadid": "",
+            "block_list": "[]",
+        }
+        kwargs["rtype"] = int(rtype)
+        try:
+            resp = self._call("write", raw_json(api.xpanfilecreate), **kwargs)
+        finally:
+            listing_cache_invalidate(self._scope, [path])
+        return resp.to_dict() if hasattr(resp, "to_dict") else (resp if isinstance(resp, dict) else {"data": resp})
 
     # ---- semantic search (mapped to filesearch as provider API) ----
     def search_semantic(self, query: str, dir_path: str = "/", page: str = "1", num: str = "50", recursion: str = "1") -> Dict[str, Any]:
-        with ApiClient(self._config) as api_client:
-            api = FileinfoApi(api_client)
-            resp = api.xpanfilesearch(access_token=self._access_token, key=query, dir=dir_path, page=page, num=num, recursion=recursion)
-            return resp.to_dict() if hasattr(resp, "to_dict") else (resp if isinstance(resp, dict) else {"data": resp})
+        api = FileinfoApi(self._api_client)
+        resp = self._call("list", raw_json(api.xpanfilesearch), access_token=self._access_token, key=query, dir=dir_path, page=page, num=num, recursion=recursion)
+        return resp.to_dict() if hasattr(resp, "to_dict") else (resp if isinstance(resp, dict) else {"data": resp})
 
-    # ---- uploads (placeholders to be implemented) ----
-    def upload_local(self, local_file_path: str, remote_path: str) -> Dict[str, Any]:
-        if not os.path.isfile(local_file_path):
-            return {"status": "error", "error": "local_file_not_found"}
-        file_size = os.path.getsize(local_file_path)
-        # 计算单块 md5（小文件用单分片上传）
-        with open(local_file_path, "rb") as f:
-            file_bytes = f.read()
-        block_md5 = hashlib.md5(file_bytes).hexdigest()
-        block_list = json.dumps([block_md5])
-        with ApiClient(self._config) as api_client:
-            up = FileuploadApi(api_client)
-            # 预创建
-            pre = up.xpanfileprecreate(
-                access_token=self._access_token,
-                path=remote_path,
-                isdir=0,
-                size=file_size,
-                autoinit=1,
-                block_list=block_list,
+    # ---- uploads ----
+    def _send_part(self, up: FileuploadApi, remote_path: str, uploadid: str, partseq: int, data: bytes, block_md5: str) -> Dict[str, Any]:
+        """上传单个分片，失败按指数退避重试"""
+        settings = get_settings()
+        retries = max(int(settings.upload_part_retries), 0)
+        last_error: Exception | None = None
+        for attempt in range(retries + 1):
+            try:
+                buf = io.BytesIO(data)
+                buf.name = f"part{partseq}"
+                # 与同一令牌的其他上传任务共享分片并发名额；退避等待时不占名额
+                with part_slot(self._scope):
+                    resp = self._call(
+                        "upload",
+                        raw_json(up.pcssuperfile2),
+                        access_token=self._access_token,
+                        partseq=str(partseq),
+                        path=remote_path,
+                        uploadid=uploadid,
+                        type="tmpfile",
+                        file=buf,
+                    )
+                resp = resp if isinstance(resp, dict) else {}
+                code, msg = _upload_error(resp)
+                if code:
+                    if upload_session_expired(resp):
+                        raise UploadSessionExpired(f"upload_session_expired partseq={partseq}: errno={code} {msg}")
+                    raise ValueError(f"part_errno partseq={partseq}: errno={code} {msg}")
+                # 服务端回传分片 md5，不一致视为传输损坏
+                if resp.get("md5") and resp.get("md5") != block_md5:
+                    raise ValueError(f"part_md5_mismatch partseq={partseq}")
+                return resp
+            except (UpstreamThrottled, UpstreamUnavailable, UploadSessionExpired):
+                # 已限流/熔断或 uploadid 已失效：原地重试只会继续排队、快速失败或再失败一次
+                raise
+            except Exception as e:
+                # 非 2xx 时错误体在 ApiException.body 中
+                if upload_session_expired(getattr(e, "body", None)):
+                    raise UploadSessionExpired(f"upload_session_expired partseq={partseq}: {e}") from e
+                last_error = e
+                if attempt < retries:
+                    time.sleep(min(0.5 * (2 ** attempt), 8.0))
+        raise RuntimeError(f"upload_part_failed partseq={partseq}: {last_error}")
+
+    def _upload_parts(self, up: FileuploadApi, remote_path: str, uploadid: str, partseqs: list[int], block_md5s: list[str], read_block: Callable[[int], bytes], on_done: Callable[[int], None] | None = None) -> list[dict]:
+        """并发上传分片，返回失败列表
+
+        每个工作线程在发送前才读取自己的分片，内存占用约为 并发数 × 分片大小。
+        on_done 在每个分片成功后回调，用于持久化续传进度。
+        """
+        settings = get_settings()
+        workers = max(1, min(int(settings.upload_part_concurrency), len(partseqs) or 1))
+        errors: list[dict] = []
+
+        def _one(seq: int) -> None:
+            self._send_part(up, remote_path, uploadid, seq, read_block(seq), block_md5s[seq])
+            if on_done is not None:
+                try:
+                    on_done(seq)
+                except Exception:
+                    # 进度记录失败仅影响续传，不影响本次上传
+                    pass
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_one, seq): seq for seq in partseqs}
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    future.result()
+                except UploadSessionExpired as e:
+                    errors.append({"partseq": futures[future], "error": str(e), "session_expired": True})
+                except Exception as e:
+                    errors.append({"partseq": futures[future], "error": str(e)})
+        return errors
+
+    def _precreate(self, up: FileuploadApi, remote_path: str, size: int, block_list: str, digest: ContentDigest | None = None) -> Dict[str, Any]:
+        if digest is not None and size >= RAPID_SLICE_SIZE:
+            pre = self._precreate_with_digest(remote_path, size, block_list, digest)
+            if pre is not None:
+                return pre
+        pre = self._call(
+            "write",
+            raw_json(up.xpanfileprecreate),
+            access_token=self._access_token,
+            path=remote_path,
+            isdir=0,
+            size=size,
+            autoinit=1,
+            block_list=block_list,
+        )
+        return pre if isinstance(pre, dict) else (pre.to_dict() if hasattr(pre, "to_dict") else {})
+
+    def _precreate_with_digest(self, remote_path: str, size: int, block_list: str, digest: ContentDigest) -> Dict[str, Any] | None:
+        """携带内容摘要的 precreate：云端已有相同内容时直接秒传（return_type=2）
+
+        SDK 的 precreate 不接受 content-md5 等参数，这里直接走共享会话；
+        请求失败返回 None，由调用方回落到 SDK 的普通 precreate。
+        """
+        try:
+            session = get_shared_session()
+            resp = self._call(
+                "write",
+                session.post,
+                f"{get_settings().netdisk_api_base}/rest/2.0/xpan/file",
+                params={"method": "precreate", "access_token": self._access_token},
+                data={
+                    "path": remote_path,
+                    "isdir": "0",
+                    "size": str(size),
+                    "autoinit": "1",
+                    "block_list": block_list,
+                    "content-md5": digest.content_md5,
+                    "slice-md5": digest.slice_md5,
+                    "content-crc32": str(digest.crc32),
+                },
+                timeout=upstream_timeout(),
             )
-            pre_dict = pre if isinstance(pre, dict) else (pre.to_dict() if hasattr(pre, "to_dict") else {})
-            uploadid = pre_dict.get("uploadid") or pre_dict.get("upload_id") or ""
-            if not uploadid:
-                return {"status": "error", "error": "precreate_failed", "data": pre_dict}
-            # 上传分片（单分片 partseq=0）
-            with open(local_file_path, "rb") as f:
-                _ = up.pcssuperfile2(
-                    access_token=self._access_token,
-                    partseq="0",
-                    path=remote_path,
-                    uploadid=uploadid,
-                    type="tmpfile",
-                    file=f,
-                )
-            # 合并创建
-            fin = up.xpanfilecreate(
+            resp.raise_for_status()
+            pre = resp.json()
+        except (UpstreamThrottled, UpstreamUnavailable):
+            # 限流/熔断时回落到普通 precreate 只会再被拒一次，直接上抛
+            raise
+        except Exception:
+            _record_rapid("errors")
+            return None
+        if not isinstance(pre, dict) or int(pre.get("errno", 0) or 0) != 0:
+            _record_rapid("errors")
+            return None
+        _record_rapid("hits" if int(pre.get("return_type") or 0) == 2 else "misses", size)
+        return pre
+
+    def _create_file(self, up: FileuploadApi, remote_path: str, size: int, uploadid: str, block_list: str) -> Dict[str, Any]:
+        try:
+            fin = self._call(
+                "write",
+                raw_json(up.xpanfilecreate),
                 access_token=self._access_token,
                 path=remote_path,
                 isdir=0,
-                size=file_size,
+                size=size,
                 uploadid=uploadid,
                 block_list=block_list,
             )
-            return fin.to_dict() if hasattr(fin, "to_dict") else (fin if isinstance(fin, dict) else {"data": fin})
+        finally:
+            listing_cache_invalidate(self._scope, [remote_path])
+        return fin.to_dict() if hasattr(fin, "to_dict") else (fin if isinstance(fin, dict) else {"data": fin})
+
+    def _upload_blocks(self, remote_path: str, size: int, block_md5s: list[str], read_block: Callable[[int], bytes], digest: ContentDigest | None = None) -> Dict[str, Any]:
+        """precreate → 分片上传 → create
+
+        上传会话持久化在库中：同一作用域、同一路径、同一内容再次上传时复用
+        uploadid 并跳过已完成的分片；上游会话失效时丢弃记录重新 precreate。
+        给出 digest 时先尝试秒传，命中则不发送任何分片。
+        """
+        block_list = json.dumps(block_md5s)
+        up = FileuploadApi(self._api_client)
+        store = UploadSessionStore()
+        fingerprint = session_fingerprint(size, block_md5s)
+        resume = None
+        try:
+            resume = store.find(self._scope, remote_path, fingerprint)
+        except Exception:
+            resume = None
+
+        if resume is not None:
+            pending = [seq for seq in range(len(block_md5s)) if seq not in resume.completed]
+            errors = self._upload_parts(up, remote_path, resume.uploadid, pending, block_md5s, read_block, on_done=lambda seq: store.mark_part_done(resume.id, seq))
+            expired = any(e.get("session_expired") for e in errors)
+            if errors and not expired:
+                return {"status": "error", "error": "upload_part_failed", "uploadid": resume.uploadid, "parts": errors, "resumable": True}
+            if not expired:
+                try:
+                    fin = self._create_file(up, remote_path, size, resume.uploadid, block_list)
+                except (UpstreamThrottled, UpstreamUnavailable):
+                    # 限流/熔断：会话仍有效，保留记录供下次续传
+                    raise
+                except Exception as e:
+                    # 网络抖动等瞬时错误：保留会话，已完成的分片不必重传
+                    return {"status": "error", "error": "create_failed", "uploadid": resume.uploadid, "detail": str(e), "resumable": True}
+                errno = int(fin.get("errno", 0) or 0)
+                if errno == 0:
+                    store.delete(resume.id)
+                    return fin
+                if errno not in UPLOAD_SESSION_EXPIRED_ERRNOS:
+                    return {"status": "error", "error": "create_failed", "uploadid": resume.uploadid, "data": fin, "resumable": True}
+            # uploadid 已在上游过期（分片或 create 报告）：丢弃会话，走完整流程
+            store.delete(resume.id)
+
+        # 预创建
+        pre_dict = self._precreate(up, remote_path, size, block_list, digest)
+        if int(pre_dict.get("return_type") or 0) == 2:
+            listing_cache_invalidate(self._scope, [remote_path])
+            info = pre_dict.get("info")
+            result = dict(info) if isinstance(info, dict) else dict(pre_dict)
+            result.setdefault("errno", 0)
+            result["rapid_upload"] = True
+            return result
+        uploadid = pre_dict.get("uploadid") or pre_dict.get("upload_id") or ""
+        if not uploadid:
+            return {"status": "error", "error": "precreate_failed", "data": pre_dict}
+        session_id: int | None = None
+        try:
+            session_id = store.create(self._scope, remote_path, size, fingerprint, uploadid, block_md5s)
+        except Exception:
+            session_id = None
+        # precreate 返回仍需上传的分片序号；缺省时全部上传
+        pending = pre_dict.get("block_list")
+        if not isinstance(pending, list) or not pending:
+            pending = list(range(len(block_md5s)))
+        on_done = (lambda seq: store.mark_part_done(session_id, seq)) if session_id is not None else None
+        errors = self._upload_parts(up, remote_path, uploadid, [int(x) for x in pending], block_md5s, read_block, on_done=on_done)
+        if errors:
+            if session_id is not None and any(e.get("session_expired") for e in errors):
+                # 新会话刚建立就被上游判为失效：记录已无用，重试时重新 precreate
+                try:
+                    store.delete(session_id)
+                except Exception:
+                    pass
+                session_id = None
+            return {"status": "error", "error": "upload_part_failed", "uploadid": uploadid, "parts": errors, "resumable": session_id is not None}
+        # 合并创建
+        fin = self._create_file(up, remote_path, size, uploadid, block_list)
+        if session_id is not None:
+            try:
+                store.delete(session_id)
+            except Exception:
+                pass
+        return fin
+
+    def upload_local(self, local_file_path: str, remote_path: str) -> Dict[str, Any]:
+        if not os.path.isfile(local_file_path):
+            return {"status": "error", "error": "local_file_not_found"}
+        file_size = os.path.getsize(local_file_path)
+        block_size = upload_block_size()
+        # 单次流式读取计算分片 md5 与秒传摘要
+        digest = hash_file(local_file_path, block_size)
+
+        def _read_block(seq: int) -> bytes:
+            with open(local_file_path, "rb") as f:
+                f.seek(seq * block_size)
+                return f.read(block_size)
+
+        return self._upload_blocks(remote_path, file_size, digest.block_md5s, _read_block, digest=digest)
+
+    def _upload_stream(self, remote_path: str, size: int, blocks: Iterator[bytes]) -> Dict[str, Any]:
+        """边下载边上传：分片到达即计算 md5 并发送
+
+        precreate 时分片 md5 尚未知晓，先以占位值声明分片数，create 时提交真实列表。
+        在途分片数受信号量约束（约 2 × 并发数），下载速度超过上传时读取端阻塞，
+        内存占用与文件大小无关。
+        """
+        block_size = upload_block_size()
+        count = max(1, -(-size // block_size))
+        up = FileuploadApi(self._api_client)
+        pre_dict = self._precreate(up, remote_path, size, json.dumps([PLACEHOLDER_BLOCK_MD5] * count))
+        uploadid = pre_dict.get("uploadid") or pre_dict.get("upload_id") or ""
+        if not uploadid:
+            return {"status": "error", "error": "precreate_failed", "data": pre_dict}
+
+        workers = max(1, min(int(get_settings().upload_part_concurrency), count))
+        slots = threading.BoundedSemaphore(workers * 2)
+        md5s: list[str] = [""] * count
+        failed = threading.Event()
+
+        def _one(seq: int, data: bytes) -> None:
+            try:
+                md5s[seq] = hashlib.md5(data).hexdigest()
+                self._send_part(up, remote_path, uploadid, seq, data, md5s[seq])
+            except Exception:
+                failed.set()
+                raise
+            finally:
+                slots.release()
+
+        received = 0
+        download_error: str | None = None
+        errors: list[dict] = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures: dict = {}
+            try:
+                for seq, block in enumerate(blocks):
+                    if seq >= count:
+                        raise ValueError("content_length_mismatch")
+                    slots.acquire()
+                    if failed.is_set():
+                        slots.release()
+                        break
+                    received += len(block)
+                    futures[executor.submit(_one, seq, block)] = seq
+            except Exception as e:
+                download_error = str(e)
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    errors.append({"partseq": futures[future], "error": str(e)})
+        if errors:
+            return {"status": "error", "error": "upload_part_failed", "uploadid": uploadid, "parts": errors}
+        if download_error is not None or received != size:
+            return {"status": "error", "error": f"download_failed: {download_error or 'content_length_mismatch'}"}
+        return self._create_file(up, remote_path, size, uploadid, json.dumps(md5s))
 
     def upload_url(self, url: str, dir_path: str = "/", filename: str | None = None) -> Dict[str, Any]:
         try:
-            import requests  # lazy import
+            session = get_shared_session()  # lazy import of requests
         except Exception:
             return {"status": "error", "error": "requests_not_installed"}
+        name = filename or (url.rstrip("/").split("/")[-1] or "download.bin")
+        remote_path = os.path.join(dir_path if dir_path else "/", name)
         try:
-            r = requests.get(url, timeout=30)
+            r = session.get(url, stream=True, timeout=upstream_timeout())
             r.raise_for_status()
         except Exception as e:
             return {"status": "error", "error": f"download_failed: {e}"}
-        name = filename or (url.rstrip("/").split("/")[-1] or "download.bin")
-        remote_path = os.path.join(dir_path if dir_path else "/", name)
-        with tempfile.NamedTemporaryFile(delete=False) as tmp:
-            tmp.write(r.content)
-            tmp_path = tmp.name
+        with r:
+            try:
+                size = int(r.headers.get("Content-Length") or -1)
+            except ValueError:
+                size = -1
+            # 带 Content-Encoding 时 Content-Length 是压缩后长度，不能据此声明分片
+            if size > 0 and not r.headers.get("Content-Encoding"):
+                return self._upload_stream(remote_path, size, iter_blocks(r.iter_content(chunk_size=STREAM_CHUNK_SIZE), upload_block_size()))
+            # 长度未知：无法预先声明分片数，分块落盘后走普通上传
+            with tempfile.NamedTemporaryFile(delete=False) as tmp:
+                tmp_path = tmp.name
+                try:
+                    for chunk in r.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                        tmp.write(chunk)
+                except Exception as e:
+                    download_error = e
+                else:
+                    download_error = None
+            if download_error is not None:
+                os.unlink(tmp_path)
+                return {"status": "error", "error": f"download_failed: {download_error}"}
         try:
             return self.upload_local(tmp_path, remote_path)
         finally:
@@ -367,30 +936,94 @@ class NetdiskClient:
             except Exception:
                 pass
 
+    def _bytes_precreate(self, up: FileuploadApi, data: bytes, remote_path: str) -> _BytesUpload:
+        state = _BytesUpload(remote_path=remote_path, data=data, digest=hash_bytes(data, upload_block_size()))
+        pre_dict = self._precreate(up, remote_path, len(data), json.dumps(state.digest.block_md5s), state.digest)
+        if int(pre_dict.get("return_type") or 0) == 2:
+            listing_cache_invalidate(self._scope, [remote_path])
+            info = pre_dict.get("info")
+            state.result = dict(info) if isinstance(info, dict) else dict(pre_dict)
+            state.result.setdefault("errno", 0)
+            state.result["rapid_upload"] = True
+            return state
+        state.uploadid = pre_dict.get("uploadid") or pre_dict.get("upload_id") or ""
+        if not state.uploadid:
+            state.result = {"status": "error", "error": "precreate_failed", "data": pre_dict}
+            return state
+        pending = pre_dict.get("block_list")
+        state.pending = [int(x) for x in pending] if isinstance(pending, list) and pending else list(range(len(state.digest.block_md5s)))
+        return state
+
+    def _bytes_parts(self, up: FileuploadApi, state: _BytesUpload) -> _BytesUpload:
+        block_size = upload_block_size()
+        errors: list[dict] = []
+        # 小负载通常只有一个分片，逐片发送即可，并行度来自批量条目之间
+        for seq in state.pending:
+            try:
+                self._send_part(up, state.remote_path, state.uploadid, seq, state.data[seq * block_size:(seq + 1) * block_size], state.digest.block_md5s[seq])
+            except Exception as e:
+                errors.append({"partseq": seq, "error": str(e)})
+        if errors:
+            state.result = {"status": "error", "error": "upload_part_failed", "uploadid": state.uploadid, "parts": errors}
+        return state
+
+    def _bytes_create(self, up: FileuploadApi, state: _BytesUpload) -> _BytesUpload:
+        state.result = self._create_file(up, state.remote_path, len(state.data), state.uploadid, json.dumps(state.digest.block_md5s))
+        return state
+
+    def upload_bytes(self, data: bytes, remote_path: str) -> Dict[str, Any]:
+        """直接从内存上传，不经过文件系统；超过 upload_inmemory_max_mb 时落盘走普通上传"""
+        if len(data) > inmemory_upload_limit():
+            with tempfile.NamedTemporaryFile(mode="wb", delete=False) as tmp:
+                tmp.write(data)
+                tmp_path = tmp.name
+            try:
+                return self.upload_local(tmp_path, remote_path)
+            finally:
+                try:
+                    os.unlink(tmp_path)
+                except Exception:
+                    pass
+        up = FileuploadApi(self._api_client)
+        state = self._bytes_precreate(up, data, remote_path)
+        if state.result is None:
+            state = self._bytes_parts(up, state)
+        if state.result is None:
+            state = self._bytes_create(up, state)
+        return state.result
+
     def upload_text(self, content: str, dir_path: str = "/", filename: str | None = None) -> Dict[str, Any]:
         safe_name = filename or "note.txt"
         remote_path = os.path.join(dir_path if dir_path else "/", safe_name)
-        with tempfile.NamedTemporaryFile(mode="wb", delete=False) as tmp:
-            tmp.write(content.encode("utf-8"))
-            tmp_path = tmp.name
+        return self.upload_bytes(content.encode("utf-8"), remote_path)
+
+    def _schedule_batch(self, run_one: Callable[[dict], dict], items: list[dict], max_concurrent: int) -> dict:
+        """把批量条目提交到上传调度器，返回 {future: item}；max_concurrent 作为本批次的并发上限"""
+        scheduler = get_upload_scheduler()
+        batch = uuid.uuid4().hex
+        return {
+            scheduler.submit(run_one, item, owner=self._owner, token=self._scope, group=batch, group_limit=max(int(max_concurrent), 1)): item
+            for item in items
+        }
+
+    @staticmethod
+    def _report_progress(progress: Optional[Callable[[Dict[str, Any]], None]], index: int, total: int, entry: Dict[str, Any], ok: bool) -> None:
+        """每完成一个条目回调一次（在上传线程中调用，回调出错不影响批量上传本身）"""
+        if progress is None:
+            return
         try:
-            return self.upload_local(tmp_path, remote_path)
-        finally:
-            try:
-                os.unlink(tmp_path)
-            except Exception:
-                pass
+            progress({"index": index, "total": total, "ok": ok, **entry})
+        except Exception:
+            pass
 
-    def upload_batch_local(self, file_list: list[dict], max_concurrent: int = 3) -> Dict[str, Any]:
+    def upload_batch_local(self, file_list: list[dict], max_concurrent: int = 3, progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """批量上传本地文件
         
         Args:
             file_list: 文件列表，每个元素包含 {"local_path": str, "remote_path": str}
             max_concurrent: 最大并发数，默认3个
+            progress: 可选，每个条目完成时以 {"index", "total", "ok", "file", "result"} 回调
         """
-        import concurrent.futures
-        import threading
-        
         results = []
         errors = []
         
@@ -406,26 +1039,22 @@ class NetdiskClient:
             except Exception as e:
                 return {"file": file_info, "result": {"status": "error", "error": str(e)}}
         
-        # 使用线程池进行并发上传
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrent) as executor:
-            future_to_file = {
-                executor.submit(upload_single_file, file_info): file_info 
-                for file_info in file_list
-            }
-            
-            for future in concurrent.futures.as_completed(future_to_file):
-                file_info = future_to_file[future]
-                try:
-                    result = future.result()
-                    if result["result"].get("status") == "error":
-                        errors.append(result)
-                    else:
-                        results.append(result)
-                except Exception as e:
-                    errors.append({
-                        "file": file_info, 
-                        "result": {"status": "error", "error": str(e)}
-                    })
+        # 提交到进程级上传调度器，受全局/每用户并发与令牌速率约束
+        future_to_file = self._schedule_batch(upload_single_file, file_list, max_concurrent)
+        index_of = {future: i for i, future in enumerate(future_to_file)}
+        for future in concurrent.futures.as_completed(future_to_file):
+            file_info = future_to_file[future]
+            try:
+                entry = future.result()
+                ok = entry["result"].get("status") != "error"
+            except Exception as e:
+                entry = {
+                    "file": file_info, 
+                    "result": {"status": "error", "error": str(e)}
+                }
+                ok = False
+            (results if ok else errors).append(entry)
+            self._report_progress(progress, index_of[future], len(file_list), entry, ok)
         
         return {
             "status": "completed",
@@ -436,15 +1065,14 @@ class NetdiskClient:
             "errors": errors
         }
 
-    def upload_batch_url(self, url_list: list[dict], max_concurrent: int = 3) -> Dict[str, Any]:
+    def upload_batch_url(self, url_list: list[dict], max_concurrent: int = 3, progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """批量上传URL文件
         
         Args:
             url_list: URL列表，每个元素包含 {"url": str, "dir_path": str, "filename": str}
             max_concurrent: 最大并发数，默认3个
+            progress: 可选，每个条目完成时以 {"index", "total", "ok", "url_info", "result"} 回调
         """
-        import concurrent.futures
-        
         results = []
         errors = []
         
@@ -462,26 +1090,22 @@ class NetdiskClient:
             except Exception as e:
                 return {"url_info": url_info, "result": {"status": "error", "error": str(e)}}
         
-        # 使用线程池进行并发上传
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrent) as executor:
-            future_to_url = {
-                executor.submit(upload_single_url, url_info): url_info 
-                for url_info in url_list
-            }
-            
-            for future in concurrent.futures.as_completed(future_to_url):
-                url_info = future_to_url[future]
-                try:
-                    result = future.result()
-                    if result["result"].get("status") == "error":
-                        errors.append(result)
-                    else:
-                        results.append(result)
-                except Exception as e:
-                    errors.append({
-                        "url_info": url_info, 
-                        "result": {"status": "error", "error": str(e)}
-                    })
+        # 提交到进程级上传调度器，受全局/每用户并发与令牌速率约束
+        future_to_url = self._schedule_batch(upload_single_url, url_list, max_concurrent)
+        index_of = {future: i for i, future in enumerate(future_to_url)}
+        for future in concurrent.futures.as_completed(future_to_url):
+            url_info = future_to_url[future]
+            try:
+                entry = future.result()
+                ok = entry["result"].get("status") != "error"
+            except Exception as e:
+                entry = {
+                    "url_info": url_info, 
+                    "result": {"status": "error", "error": str(e)}
+                }
+                ok = False
+            (results if ok else errors).append(entry)
+            self._report_progress(progress, index_of[future], len(url_list), entry, ok)
         
         return {
             "status": "completed",
@@ -492,53 +1116,68 @@ class NetdiskClient:
             "errors": errors
         }
 
-    def upload_batch_text(self, text_list: list[dict], max_concurrent: int = 3) -> Dict[str, Any]:
+    def upload_batch_text(self, text_list: list[dict], max_concurrent: int = 3, progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """批量上传文本内容
-        
+
+        precreate / 分片上传 / create 三个阶段分别提交到上传调度器（各阶段并发不超过 max_concurrent），
+        条目完成一个阶段即进入下一阶段，使不同条目的三类请求相互重叠，而不是逐条串行走完三次往返。
+
         Args:
             text_list: 文本列表，每个元素包含 {"content": str, "dir_path": str, "filename": str}
-            max_concurrent: 最大并发数，默认3个
+            max_concurrent: 每个阶段的最大并发数，默认3个
+            progress: 可选，每个条目完成时以 {"index", "total", "ok", "text_info", "result"} 回调
         """
-        import concurrent.futures
-        
         results = []
         errors = []
-        
-        def upload_single_text(text_info: dict) -> dict:
-            try:
-                content = text_info.get("content", "")
-                dir_path = text_info.get("dir_path", "/")
-                filename = text_info.get("filename")
-                
-                if not content:
-                    return {"status": "error", "error": "missing_content", "text_info": text_info}
-                
-                result = self.upload_text(content, dir_path, filename)
-                return {"text_info": text_info, "result": result}
-            except Exception as e:
-                return {"text_info": text_info, "result": {"status": "error", "error": str(e)}}
-        
-        # 使用线程池进行并发上传
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrent) as executor:
-            future_to_text = {
-                executor.submit(upload_single_text, text_info): text_info 
-                for text_info in text_list
-            }
-            
-            for future in concurrent.futures.as_completed(future_to_text):
-                text_info = future_to_text[future]
+        workers = max(int(max_concurrent), 1)
+        limit = inmemory_upload_limit()
+        up = FileuploadApi(self._api_client)
+
+        def _finish(index: int, text_info: dict, result: Dict[str, Any]) -> None:
+            entry = {"text_info": text_info, "result": result}
+            ok = result.get("status") != "error"
+            (results if ok else errors).append(entry)
+            self._report_progress(progress, index, len(text_list), entry, ok)
+
+        def _start(text_info: dict) -> _BytesUpload:
+            content = text_info.get("content", "")
+            remote_path = os.path.join(text_info.get("dir_path", "/") or "/", text_info.get("filename") or "note.txt")
+            data = content.encode("utf-8")
+            if len(data) > limit:
+                # 超限条目整体走普通上传，不参与流水线
+                return _BytesUpload(remote_path=remote_path, data=b"", result=self.upload_bytes(data, remote_path))
+            return self._bytes_precreate(up, data, remote_path)
+
+        scheduler = get_upload_scheduler()
+        batch = uuid.uuid4().hex
+
+        def _submit(stage: str, fn: Callable[..., _BytesUpload], *args: Any) -> concurrent.futures.Future:
+            # 收尾阶段优先，尽快释放上游上传会话
+            priority = PRIORITY_HIGH if stage == "create" else PRIORITY_NORMAL
+            return scheduler.submit(fn, *args, owner=self._owner, token=self._scope, priority=priority, group=f"{batch}:{stage}", group_limit=workers)
+
+        inflight: dict = {}
+        for index, text_info in enumerate(text_list):
+            if not text_info.get("content", ""):
+                _finish(index, text_info, {"status": "error", "error": "missing_content", "text_info": text_info})
+                continue
+            inflight[_submit("precreate", _start, text_info)] = (index, text_info, "precreate")
+        while inflight:
+            done, _ = concurrent.futures.wait(inflight, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                index, text_info, stage = inflight.pop(future)
                 try:
-                    result = future.result()
-                    if result["result"].get("status") == "error":
-                        errors.append(result)
-                    else:
-                        results.append(result)
+                    state = future.result()
                 except Exception as e:
-                    errors.append({
-                        "text_info": text_info, 
-                        "result": {"status": "error", "error": str(e)}
-                    })
-        
+                    _finish(index, text_info, {"status": "error", "error": str(e)})
+                    continue
+                if state.result is not None:
+                    _finish(index, text_info, state.result)
+                elif stage == "precreate":
+                    inflight[_submit("parts", self._bytes_parts, up, state)] = (index, text_info, "parts")
+                else:
+                    inflight[_submit("create", self._bytes_create, up, state)] = (index, text_info, "create")
+
         return {
             "status": "completed",
             "total": len(text_list),
@@ -549,6 +1188,29 @@ class NetdiskClient:
         }
 
     # ---- 离线下载功能 ----
+    def _offline_request(self, params: Dict[str, Any], error_prefix: str) -> Dict[str, Any]:
+        """调用百度网盘离线下载API（共享连接池与超时/重试策略）"""
+        try:
+            session = get_shared_session()
+        except Exception:
+            return {"status": "error", "error": "requests_not_installed"}
+        
+        try:
+            response = self._call(
+                "offline",
+                session.post,
+                "https://pan.baidu.com/rest/2.0/xpan/offline",
+                params=params,
+                timeout=upstream_timeout(),
+            )
+            response.raise_for_status()
+            return check_offline_result(response.json())
+        except (UpstreamThrottled, UpstreamUnavailable):
+            # 限流/熔断交给路由层返回 429/503 与 Retry-After
+            raise
+        except Exception as e:
+            return {"status": "error", "error": f"{error_prefix}: {str(e)}"}
+
     def offline_add(self, url: str, save_path: str = "/", filename: str | None = None) -> Dict[str, Any]:
         """添加离线下载任务
         
@@ -557,11 +1219,6 @@ class NetdiskClient:
             save_path: 保存路径
             filename: 文件名（可选）
         """
-        try:
-            import requests
-        except Exception:
-            return {"status": "error", "error": "requests_not_installed"}
-        
         # 构建请求参数
         params = {
             "method": "add_task",
@@ -573,26 +1230,7 @@ class NetdiskClient:
         if filename:
             params["filename"] = filename
         
-        # 调用百度网盘离线下载API
-        try:
-            response = requests.post(
-                "https://pan.baidu.com/rest/2.0/xpan/offline",
-                params=params,
-                timeout=30
-            )
-            response.raise_for_status()
-            result = response.json()
-            
-            # 检查百度网盘API返回的错误码
-            if isinstance(result, dict) and "errno" in result:
-                errno = result.get("errno", 0)
-                if errno != 0:
-                    error_msg = result.get("errmsg", "未知错误")
-                    return {"status": "error", "error": f"百度网盘API错误 {errno}: {error_msg}"}
-            
-            return result
-        except Exception as e:
-            return {"status": "error", "error": f"offline_add_failed: {str(e)}"}
+        return self._offline_request(params, "offline_add_failed")
 
     def offline_status(self, task_id: str | None = None) -> Dict[str, Any]:
         """查询离线下载任务状态
@@ -600,11 +1238,6 @@ class NetdiskClient:
         Args:
             task_id: 任务ID，如果为None则查询所有任务
         """
-        try:
-            import requests
-        except Exception:
-            return {"status": "error", "error": "requests_not_installed"}
-        
         # 构建请求参数
         params = {
             "method": "query_task",
@@ -614,26 +1247,7 @@ class NetdiskClient:
         if task_id:
             params["task_id"] = task_id
         
-        # 调用百度网盘离线下载API
-        try:
-            response = requests.post(
-                "https://pan.baidu.com/rest/2.0/xpan/offline",
-                params=params,
-                timeout=30
-            )
-            response.raise_for_status()
-            result = response.json()
-            
-            # 检查百度网盘API返回的错误码
-            if isinstance(result, dict) and "errno" in result:
-                errno = result.get("errno", 0)
-                if errno != 0:
-                    error_msg = result.get("errmsg", "未知错误")
-                    return {"status": "error", "error": f"百度网盘API错误 {errno}: {error_msg}"}
-            
-            return result
-        except Exception as e:
-            return {"status": "error", "error": f"offline_status_failed: {str(e)}"}
+        return self._offline_request(params, "offline_status_failed")
 
     def offline_cancel(self, task_id: str) -> Dict[str, Any]:
         """取消离线下载任务
@@ -641,11 +1255,6 @@ class NetdiskClient:
         Args:
             task_id: 任务ID
         """
-        try:
-            import requests
-        except Exception:
-            return {"status": "error", "error": "requests_not_installed"}
-        
         # 构建请求参数
         params = {
             "method": "cancel_task",
@@ -653,26 +1262,7 @@ class NetdiskClient:
             "task_id": task_id,
         }
         
-        # 调用百度网盘离线下载API
-        try:
-            response = requests.post(
-                "https://pan.baidu.com/rest/2.0/xpan/offline",
-                params=params,
-                timeout=30
-            )
-            response.raise_for_status()
-            result = response.json()
-            
-            # 检查百度网盘API返回的错误码
-            if isinstance(result, dict) and "errno" in result:
-                errno = result.get("errno", 0)
-                if errno != 0:
-                    error_msg = result.get("errmsg", "未知错误")
-                    return {"status": "error", "error": f"百度网盘API错误 {errno}: {error_msg}"}
-            
-            return result
-        except Exception as e:
-            return {"status": "error", "error": f"offline_cancel_failed: {str(e)}"}
+        return self._offline_request(params, "offline_cancel_failed")
 
 
 def get_netdisk_client(access_token: Optional[str] = None, user_id: Optional[int] = None, mode: str = "user") -> NetdiskClient:
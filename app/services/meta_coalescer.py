@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional
+
+from app.core.config import get_settings
+from app.services.rate_governor import UpstreamThrottled
+from app.services.resilience import UpstreamUnavailable
+
+
+# xpanmultimediafilemetas 单次最多 100 个 fsid
+FILEMETAS_MAX_FSIDS = 100
+# 限流/熔断拒绝：每个调用方都原样收到，各自回落只会再被拒一次
+_REJECTIONS = (UpstreamThrottled, UpstreamUnavailable)
+
+
+def _items(data: Any) -> list:
+    if not isinstance(data, dict):
+        return []
+    items = data.get("list")
+    if not isinstance(items, list) and isinstance(data.get("data"), dict):
+        items = data["data"].get("list")
+    return items if isinstance(items, list) else []
+
+
+def _fsid_of(item: Any) -> Optional[int]:
+    if not isinstance(item, dict):
+        return None
+    try:
+        return int(item.get("fs_id") or item.get("fsid") or 0) or None
+    except (TypeError, ValueError):
+        return None
+
+
+def _index(responses: Iterable[Any]) -> Dict[int, dict]:
+    found: Dict[int, dict] = {}
+    for resp in responses:
+        for it in _items(resp):
+            fsid = _fsid_of(it)
+            if fsid is not None:
+                found[fsid] = it
+    return found
+
+
+def _ok(resp: Any) -> bool:
+    return isinstance(resp, dict) and int(resp.get("errno", 0) or 0) == 0
+
+
+def subset_response(resp: Dict[str, Any], found: Dict[int, dict], fsids: list[int]) -> Dict[str, Any]:
+    """按 fsids 的顺序以 found 中的条目替换响应的列表，保留响应的其他字段（names、request_id 等）"""
+    items = [found[f] for f in fsids if f in found]
+    out = dict(resp)
+    if not isinstance(resp.get("list"), list) and isinstance(resp.get("data"), dict):
+        out["data"] = dict(resp["data"], list=items)
+    else:
+        out["list"] = items
+    return out
+
+
+def _window_seconds() -> float:
+    return max(float(get_settings().meta_coalesce_window_ms), 0.0) / 1000.0
+
+
+class _Stats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.fsids = 0
+        self.upstream_calls = 0
+        self.fallbacks = 0
+
+    def add(self, **delta: int) -> None:
+        with self._lock:
+            for k, v in delta.items():
+                setattr(self, k, getattr(self, k) + v)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "lookups": self.lookups,
+                "fsids": self.fsids,
+                "upstream_calls": self.upstream_calls,
+                "fallbacks": self.fallbacks,
+                "lookups_per_call": round(self.lookups / self.upstream_calls, 2) if self.upstream_calls else None,
+            }
+
+
+_stats = _Stats()
+
+
+class _Batch:
+    def __init__(self) -> None:
+        self.fsids: set[int] = set()
+        self.waiters = 0
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.resp: Dict[str, Any] = {}
+        self.found: Dict[int, dict] = {}
+        self.failed = False
+        self.error: Optional[Exception] = None
+
+
+class MetaCoalescer:
+    """Merge concurrent filemetas lookups that share a key (token + options).
+
+    The first caller of a window becomes the leader. With no call for the key
+    in flight it sends at once, so an uncontended lookup pays no extra latency;
+    otherwise it waits up to ``meta_coalesce_window_ms`` (or until the batch
+    reaches the per-call fsid limit) for followers, then issues one upstream
+    call for the union of fsids and fans the items back out. If the merged call
+    fails, every caller falls back to its own request so one bad fsid cannot
+    fail unrelated lookups.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pending: Dict[Hashable, _Batch] = {}
+        # 各键正在进行的上游调用数：有并发时才值得等待窗口
+        self._inflight: Dict[Hashable, int] = {}
+
+    def load(self, key: Hashable, fsids: list[int], fetch: Callable[[list[int]], Dict[str, Any]]) -> Dict[str, Any]:
+        window = _window_seconds()
+        if window <= 0 or not fsids or len(fsids) >= FILEMETAS_MAX_FSIDS:
+            _stats.add(lookups=1, fsids=len(fsids), upstream_calls=1)
+            return fetch(fsids)
+        with self._lock:
+            batch = self._pending.get(key)
+            if batch is None or len(batch.fsids | set(fsids)) > FILEMETAS_MAX_FSIDS:
+                if batch is not None:
+                    batch.full.set()
+                batch = _Batch()
+                self._pending[key] = batch
+                leader = True
+            else:
+                leader = False
+            batch.fsids.update(fsids)
+            batch.waiters += 1
+            if len(batch.fsids) >= FILEMETAS_MAX_FSIDS:
+                batch.full.set()
+            contended = self._inflight.get(key, 0) > 0
+        _stats.add(lookups=1, fsids=len(fsids))
+
+        if leader:
+            if contended:
+                batch.full.wait(window)
+            with self._lock:
+                if self._pending.get(key) is batch:
+                    del self._pending[key]
+                self._inflight[key] = self._inflight.get(key, 0) + 1
+            resp: Optional[Dict[str, Any]] = None
+            error: Optional[Exception] = None
+            try:
+                resp = fetch(sorted(batch.fsids))
+                _stats.add(upstream_calls=1)
+            except Exception as e:
+                error = e
+            finally:
+                with self._lock:
+                    left = self._inflight.get(key, 1) - 1
+                    if left > 0:
+                        self._inflight[key] = left
+                    else:
+                        self._inflight.pop(key, None)
+            batch.failed = resp is None or not _ok(resp)
+            batch.error = error
+            if not batch.failed:
+                batch.resp = resp
+                batch.found = _index([resp])
+            # 出窗口后不会再有新成员加入，waiters 已是最终值
+            solo = batch.waiters == 1
+            batch.done.set()
+            if batch.failed and (solo or isinstance(error, _REJECTIONS)):
+                if error is not None:
+                    raise error
+                return resp
+        else:
+            batch.done.wait()
+            if isinstance(batch.error, _REJECTIONS):
+                raise batch.error
+
+        if batch.failed:
+            _stats.add(upstream_calls=1, fallbacks=1)
+            return fetch(fsids)
+        return subset_response(batch.resp, batch.found, fsids)
+
+
+class AsyncMetaCoalescer:
+    """Event-loop counterpart of MetaCoalescer for AsyncNetdiskClient."""
+
+    def __init__(self) -> None:
+        self._pending: Dict[Hashable, Dict[str, Any]] = {}
+        self._inflight: Dict[Hashable, int] = {}
+
+    async def load(self, key: Hashable, fsids: list[int], fetch: Callable[[list[int]], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        window = _window_seconds()
+        if window <= 0 or not fsids or len(fsids) >= FILEMETAS_MAX_FSIDS:
+            _stats.add(lookups=1, fsids=len(fsids), upstream_calls=1)
+            return await fetch(fsids)
+        batch = self._pending.get(key)
+        if batch is not None and len(batch["fsids"] | set(fsids)) > FILEMETAS_MAX_FSIDS:
+            batch["flush"].set()
+            batch = None
+        if batch is None:
+            batch = {"fsids": set(), "waiters": 0, "flush": asyncio.Event(), "future": asyncio.get_running_loop().create_future()}
+            self._pending[key] = batch
+            asyncio.ensure_future(self._run(key, batch, window, fetch))
+        batch["fsids"].update(fsids)
+        batch["waiters"] += 1
+        if len(batch["fsids"]) >= FILEMETAS_MAX_FSIDS:
+            batch["flush"].set()
+        _stats.add(lookups=1, fsids=len(fsids))
+        # 限流/熔断拒绝经 set_exception 原样抛给每个调用方
+        resp, found, error = await asyncio.shield(batch["future"])
+        if found is not None:
+            return subset_response(resp, found, fsids)
+        # 发出请求后不会再有新成员加入，waiters 已是最终值；独自失败时直接返回，不再重复请求
+        if batch["waiters"] == 1 and (error is not None or resp is not None):
+            if error is not None:
+                raise error
+            return resp
+        _stats.add(upstream_calls=1, fallbacks=1)
+        return await fetch(fsids)
+
+    async def _run(self, key: Hashable, batch: Dict[str, Any], window: float, fetch: Callable[[list[int]], Awaitable[Dict[str, Any]]]) -> None:
+        # 同一轮事件循环内的调用已加入批次；只有该键已有调用在途时才等待窗口
+        if self._inflight.get(key, 0) > 0:
+            try:
+                await asyncio.wait_for(batch["flush"].wait(), timeout=window)
+            except asyncio.TimeoutError:
+                pass
+        if self._pending.get(key) is batch:
+            del self._pending[key]
+        self._inflight[key] = self._inflight.get(key, 0) + 1
+        resp: Optional[Dict[str, Any]] = None
+        error: Optional[Exception] = None
+        try:
+            resp = await fetch(sorted(batch["fsids"]))
+            _stats.add(upstream_calls=1)
+        except _REJECTIONS as e:
+            batch["future"].set_exception(e)
+        except Exception as e:
+            error = e
+        finally:
+            left = self._inflight.get(key, 1) - 1
+            if left > 0:
+                self._inflight[key] = left
+            else:
+                self._inflight.pop(key, None)
+            # 被取消时也要唤醒等待者（resp 与 error 皆为空），让它们各自回落
+            if not batch["future"].done():
+                found = _index([resp]) if _ok(resp) else None
+                batch["future"].set_result((resp, found, error))
+
+
+_coalescer = MetaCoalescer()
+_async_coalescer = AsyncMetaCoalescer()
+
+
+def get_meta_coalescer() -> MetaCoalescer:
+    return _coalescer
+
+
+def get_async_meta_coalescer() -> AsyncMetaCoalescer:
+    return _async_coalescer
+
+
+def meta_coalescer_stats() -> Dict[str, Any]:
+    data = _stats.snapshot()
+    data["window_ms"] = float(get_settings().meta_coalesce_window_ms)
+    return data
+
+
+def parse_fsid_list(fsids: Any) -> Optional[list[int]]:
+    """把 '[1,2]' / [1, '2'] 规范为 int 列表；无法解析时返回 None（调用方不合并）"""
+    try:
+        parsed = json.loads(fsids) if isinstance(fsids, str) else fsids
+        if not isinstance(parsed, (list, tuple)):
+            return None
+        return [int(x) for x in parsed]
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from app.core.config import get_settings
+
+
+class OpOverloaded(RuntimeError):
+    """Raised when an op's concurrency limit stays full for the whole queue timeout."""
+
+    def __init__(self, op: str, retry_after: float) -> None:
+        super().__init__(f"op_overloaded: {op}")
+        self.op = op
+        self.retry_after = retry_after
+
+
+class OpTimeout(RuntimeError):
+    """Raised when an op does not finish within its declared timeout."""
+
+    def __init__(self, op: str, timeout: float) -> None:
+        super().__init__(f"op_timeout: {op} exceeded {timeout:g}s")
+        self.op = op
+        self.timeout = timeout
+
+
+def json_value(value: Any) -> Any:
+    """字符串形式的 JSON（如 "[1,2]"）解析为对象；解析失败原样返回"""
+    if not isinstance(value, str):
+        return value
+    try:
+        return json.loads(value)
+    except Exception:
+        return value
+
+
+@dataclass(frozen=True)
+class Arg:
+    """一个参数的取值规则
+
+    key 为元组时取第一个非空值；conv 为 None 时原样传递；
+    param 为 None 时按位置传参；omit_none 时值为 None 则不传该参数。
+    """
+
+    key: str | Tuple[str, ...]
+    param: Optional[str] = None
+    conv: Optional[Callable[[Any], Any]] = None
+    default: Any = None
+    omit_none: bool = False
+
+
+def compile_args(specs: Tuple[Arg, ...]) -> Callable[[dict], Tuple[list, dict]]:
+    """把参数声明编译成一个解析函数：args -> (位置参数, 关键字参数)"""
+    plan = [
+        (spec.key if isinstance(spec.key, tuple) else None, spec.key, spec.param, spec.conv, spec.default, spec.omit_none)
+        for spec in specs
+    ]
+
+    def _parse(args: dict) -> Tuple[list, dict]:
+        positional: list = []
+        kwargs: dict = {}
+        for keys, key, param, conv, default, omit_none in plan:
+            if keys is None:
+                value = args.get(key, default)
+            else:
+                value = next((args.get(k) for k in keys if args.get(k)), default)
+            if value is None:
+                if omit_none:
+                    continue
+            elif conv is not None:
+                try:
+                    value = conv(value)
+                except (TypeError, ValueError):
+                    raise ValueError(f"invalid_arg: {key if keys is None else keys[0]}")
+            if param is None:
+                positional.append(value)
+            else:
+                kwargs[param] = value
+        return positional, kwargs
+
+    return _parse
+
+
+@dataclass
+class OpSpec:
+    """一个 /mcp exec 操作的声明
+
+    cost: 上游接口分类（list/meta/write/upload/share/offline），与熔断分类一致
+    charge: "public" 表示公共态调用计入日配额，"none" 不计费
+    timeout: 只读操作的超时秒数（None 不限；改动类操作不限时）；concurrency: 进程内同时执行上限（0 不限）
+    cacheable: 相同参数的结果可复用（同一批量请求内只执行一次）
+    mutating: 会改动网盘内容；upload_dir: (列表字段, 路径字段) 需限制在 /用户上传 下
+    progress: 客户端方法接受 progress 回调，可按条目流式返回进度
+    idempotent: 支持 Idempotency-Key，同键重试直接返回已保存的结果
+    tracks_task: 上游异步执行时返回 taskid，由后台任务跟踪器轮询并推送完成事件
+    """
+
+    name: str
+    method: Optional[str] = None
+    args: Tuple[Arg, ...] = ()
+    handler: Optional[Callable[[Any, dict], Any]] = None
+    cost: str = "list"
+    charge: str = "none"
+    timeout: Optional[float] = None
+    concurrency: int = 0
+    cacheable: bool = False
+    mutating: bool = False
+    async_native: bool = False
+    streaming: bool = False
+    progress: bool = False
+    idempotent: bool = False
+    tracks_task: bool = False
+    upload_dir: Optional[Tuple[Optional[str], Tuple[str, ...]]] = None
+    parse: Callable[[dict], Tuple[list, dict]] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.parse = compile_args(self.args)
+
+    def call(self, client: Any, args: dict, **extra: Any) -> Any:
+        """在给定客户端上执行；异步客户端返回协程。extra 原样追加为关键字参数"""
+        if self.handler is not None:
+            return self.handler(client, args)
+        if self.method is None:
+            raise NotImplementedError(self.name)
+        positional, kwargs = self.parse(args)
+        kwargs.update(extra)
+        return getattr(client, self.method)(*positional, **kwargs)
+
+
+class OpRegistry:
+    def __init__(self) -> None:
+        self._ops: Dict[str, OpSpec] = {}
+
+    def register(self, spec: OpSpec) -> OpSpec:
+        if spec.idempotent and (spec.timeout or not spec.mutating):
+            # 幂等键只对改动类操作有意义；设了操作超时则超时后结果未知，释放键会导致重试时重复执行
+            raise ValueError(f"idempotent op must be mutating without timeout: {spec.name}")
+        self._ops[spec.name] = spec
+        return spec
+
+    def get(self, name: str) -> Optional[OpSpec]:
+        return self._ops.get(name)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._ops
+
+    def names(self) -> list[str]:
+        return list(self._ops)
+
+
+class _OpStats:
+    def __init__(self, spec: OpSpec, size: int = 256) -> None:
+        self.cost = spec.cost
+        self.concurrency = spec.concurrency
+        self.timeout = spec.timeout
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.inflight = 0
+        self.samples: Deque[float] = collections.deque(maxlen=size)
+
+    def percentile(self, q: float) -> Optional[float]:
+        samples = sorted(self.samples)
+        if not samples:
+            return None
+        return round(samples[min(int(len(samples) * q), len(samples) - 1)], 4)
+
+
+_lock = threading.Lock()
+_stats: Dict[str, _OpStats] = {}
+# 每个操作一个信号量；只在事件循环内使用
+_limiters: Dict[str, asyncio.Semaphore] = {}
+
+
+def _stats_for(spec: OpSpec) -> _OpStats:
+    st = _stats.get(spec.name)
+    if st is None:
+        with _lock:
+            st = _stats.setdefault(spec.name, _OpStats(spec))
+    return st
+
+
+def _limiter(spec: OpSpec) -> Optional[asyncio.Semaphore]:
+    if spec.concurrency <= 0:
+        return None
+    sem = _limiters.get(spec.name)
+    if sem is None:
+        sem = _limiters.setdefault(spec.name, asyncio.Semaphore(spec.concurrency))
+    return sem
+
+
+async def dispatch(spec: OpSpec, start: Callable[[], Awaitable[Any]]) -> Any:
+    """按操作声明执行：并发上限（排队超时则拒绝）、超时与耗时统计
+
+    start 返回实际执行的可等待对象（客户端协程或线程池调用）。超时后线程池中的
+    同步调用无法中断，并发名额要等它真正结束才释放，避免超时请求堆积压垮上游。
+    """
+    st = _stats_for(spec)
+    sem = _limiter(spec)
+    if sem is not None:
+        wait = float(get_settings().mcp_op_queue_timeout_seconds)
+        try:
+            await asyncio.wait_for(sem.acquire(), wait)
+        except asyncio.TimeoutError:
+            with _lock:
+                st.rejected += 1
+            raise OpOverloaded(spec.name, max(wait, 1.0))
+    started = time.perf_counter()
+    with _lock:
+        st.calls += 1
+        st.inflight += 1
+    try:
+        task = asyncio.ensure_future(start())
+    except BaseException:
+        with _lock:
+            st.inflight -= 1
+        if sem is not None:
+            sem.release()
+        raise
+
+    def _done(_task: asyncio.Future) -> None:
+        with _lock:
+            st.inflight -= 1
+        if sem is not None:
+            sem.release()
+
+    task.add_done_callback(_done)
+    try:
+        if spec.timeout and not spec.mutating:
+            result = await asyncio.wait_for(asyncio.shield(task), spec.timeout)
+        else:
+            # 改动类操作不设操作超时也不中途取消：上游结果未知时报 504 会诱发重复执行，
+            # 由客户端自身的连接/读取超时兜底；请求被取消时任务在后台跑完
+            result = await asyncio.shield(task)
+    except asyncio.TimeoutError:
+        if task.done():
+            # 操作自身抛出的超时（如 socket 超时），不是声明的操作超时
+            with _lock:
+                st.errors += 1
+            raise
+        task.cancel()
+        with _lock:
+            st.timeouts += 1
+        raise OpTimeout(spec.name, spec.timeout or 0.0)
+    except asyncio.CancelledError:
+        if not spec.mutating:
+            task.cancel()
+        raise
+    except Exception:
+        with _lock:
+            st.errors += 1
+        raise
+    with _lock:
+        st.samples.append(time.perf_counter() - started)
+    return result
+
+
+def op_registry_stats() -> Dict[str, Any]:
+    """按操作统计调用数、错误/超时/拒绝次数、当前执行数与耗时分位"""
+    with _lock:
+        ops = {
+            name: {
+                "cost": st.cost,
+                "concurrency": st.concurrency,
+                "timeout": st.timeout,
+                "calls": st.calls,
+                "errors": st.errors,
+                "timeouts": st.timeouts,
+                "rejected": st.rejected,
+                "inflight": st.inflight,
+                "p50": st.percentile(0.5),
+                "p95": st.percentile(0.95),
+            }
+            for name, st in _stats.items()
+        }
+    return {"ops": ops}
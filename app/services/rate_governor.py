@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.core.config import get_settings
+
+
+# 百度开放平台频控错误码：31034 命中接口频控
+FREQUENCY_LIMIT_ERRNOS = {31034}
+
+
+class UpstreamThrottled(RuntimeError):
+    """Raised when a call would have to queue longer than the governor allows."""
+
+    def __init__(self, scope: str, retry_after: float) -> None:
+        super().__init__(f"upstream_throttled: retry after {retry_after:.1f}s")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+def is_throttle_signal(resp: Any = None, error: Optional[BaseException] = None) -> bool:
+    """判断一次上游调用是否收到了频控信号（HTTP 429 或频控 errno）"""
+    if error is not None:
+        status = getattr(error, "status", None)
+        if status is None:
+            status = getattr(getattr(error, "response", None), "status_code", None)
+        return status == 429
+    status = getattr(resp, "status_code", None)
+    if status is not None:
+        if status == 429:
+            return True
+        try:
+            resp = resp.json()
+        except Exception:
+            return False
+    if isinstance(resp, dict):
+        for key in ("errno", "error_code"):
+            try:
+                if int(resp.get(key) or 0) in FREQUENCY_LIMIT_ERRNOS:
+                    return True
+            except (TypeError, ValueError):
+                continue
+    return False
+
+
+class _Bucket:
+    def __init__(self, rate: float, now: float) -> None:
+        self.rate = rate
+        self.tokens = max(rate, 1.0)
+        self.updated = now
+        self.last_cut = 0.0
+        self.requests = 0
+        self.queued = 0
+        self.shed = 0
+        self.throttles = 0
+
+
+class RateGovernor:
+    """Per-token token bucket whose rate is learned AIMD-style.
+
+    Every call reserves a token first; if the reservation would have to wait
+    longer than ``max_wait`` seconds the call is shed with UpstreamThrottled
+    instead of piling onto an already limited token. Successful calls raise
+    the rate additively (about ``increase`` req/s per second of traffic);
+    a frequency-limit signal halves it, at most once per second so a single
+    burst of rejections does not collapse the rate to the floor.
+    """
+
+    def __init__(self, initial: float, minimum: float, maximum: float, increase: float, decrease: float, max_wait: float) -> None:
+        self.initial = float(initial)
+        self.minimum = max(float(minimum), 0.01)
+        self.maximum = max(float(maximum), self.minimum)
+        self.increase = float(increase)
+        self.decrease = min(max(float(decrease), 0.1), 0.95)
+        self.max_wait = float(max_wait)
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, _Bucket] = {}
+
+    def _bucket(self, scope: str, now: float) -> _Bucket:
+        b = self._buckets.get(scope)
+        if b is None:
+            b = _Bucket(min(max(self.initial, self.minimum), self.maximum), now)
+            self._buckets[scope] = b
+        return b
+
+    def reserve(self, scope: str) -> float:
+        """预留一次调用额度，返回需要等待的秒数；等待过长时抛出 UpstreamThrottled"""
+        now = time.monotonic()
+        with self._lock:
+            b = self._bucket(scope, now)
+            b.tokens = min(max(b.rate, 1.0), b.tokens + (now - b.updated) * b.rate)
+            b.updated = now
+            wait = 0.0 if b.tokens >= 1.0 else (1.0 - b.tokens) / b.rate
+            if wait > self.max_wait:
+                b.shed += 1
+                raise UpstreamThrottled(scope, wait)
+            b.tokens -= 1.0
+            b.requests += 1
+            if wait > 0:
+                b.queued += 1
+            return wait
+
+    def acquire(self, scope: str) -> None:
+        wait = self.reserve(scope)
+        if wait > 0:
+            time.sleep(wait)
+
+    def record(self, scope: str, throttled: bool) -> None:
+        now = time.monotonic()
+        with self._lock:
+            b = self._bucket(scope, now)
+            if throttled:
+                b.throttles += 1
+                if now - b.last_cut >= 1.0:
+                    b.rate = max(self.minimum, b.rate * self.decrease)
+                    b.last_cut = now
+                    # 丢弃累积的突发额度，立即按新速率节流
+                    b.tokens = min(b.tokens, 0.0)
+            else:
+                b.rate = min(self.maximum, b.rate + self.increase / b.rate)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "limits": {"initial": self.initial, "min": self.minimum, "max": self.maximum, "max_wait_seconds": self.max_wait},
+                "tokens": {
+                    scope: {
+                        "rate": round(b.rate, 3),
+                        "requests": b.requests,
+                        "queued": b.queued,
+                        "shed": b.shed,
+                        "throttle_signals": b.throttles,
+                    }
+                    for scope, b in self._buckets.items()
+                },
+            }
+
+
+_governor: Optional[RateGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_rate_governor() -> Optional[RateGovernor]:
+    """未启用时返回 None"""
+    global _governor
+    settings = get_settings()
+    if not settings.upstream_governor_enabled:
+        return None
+    if _governor is None:
+        with _governor_lock:
+            if _governor is None:
+                _governor = RateGovernor(
+                    initial=settings.upstream_governor_initial_rate,
+                    minimum=settings.upstream_governor_min_rate,
+                    maximum=settings.upstream_governor_max_rate,
+                    increase=settings.upstream_governor_increase,
+                    decrease=settings.upstream_governor_decrease,
+                    max_wait=settings.upstream_governor_max_wait_seconds,
+                )
+    return _governor
+
+
+def rate_governor_stats() -> Dict[str, Any]:
+    if _governor is None:
+        return {"initialized": False, "enabled": bool(get_settings().upstream_governor_enabled)}
+    data = _governor.stats()
+    data["initialized"] = True
+    data["enabled"] = bool(get_settings().upstream_governor_enabled)
+    return data
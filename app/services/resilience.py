@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import concurrent.futures
+import threading
+import time
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from app.core.config import get_settings
+from app.services.rate_governor import UpstreamThrottled
+
+
+# 上游接口分类：熔断按类隔离，某类接口故障不影响其他类
+ENDPOINT_CLASSES = ("list", "meta", "write", "upload", "share", "offline")
+# 幂等读取，允许对冲请求
+HEDGED_CLASSES = {"list", "meta"}
+
+
+class UpstreamUnavailable(RuntimeError):
+    """Raised without contacting upstream while an endpoint class's breaker is open."""
+
+    def __init__(self, endpoint_class: str, retry_after: float) -> None:
+        super().__init__(f"upstream_unavailable: {endpoint_class} circuit open, retry after {retry_after:.0f}s")
+        self.endpoint_class = endpoint_class
+        self.retry_after = retry_after
+
+
+def is_upstream_failure(resp: Any = None, error: Optional[BaseException] = None) -> bool:
+    """连接/超时错误与 5xx 计为上游故障；4xx（含 429）、业务 errno 与本地限流排队超限不计入"""
+    if error is not None:
+        if isinstance(error, (UpstreamUnavailable, UpstreamThrottled, ValueError, TypeError, KeyError)):
+            return False
+        status = getattr(error, "status", None)
+        if status is None:
+            status = getattr(getattr(error, "response", None), "status_code", None)
+        if isinstance(status, int):
+            return status >= 500
+        return True
+    status = getattr(resp, "status_code", None)
+    return isinstance(status, int) and status >= 500
+
+
+class CircuitBreaker:
+    """closed → open after ``threshold`` consecutive failures; open → half-open
+    after ``cooldown`` seconds, where a single probe decides between closed and
+    open again."""
+
+    def __init__(self, name: str, threshold: int, cooldown: float) -> None:
+        self.name = name
+        self.threshold = max(int(threshold), 1)
+        self.cooldown = float(cooldown)
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.opened = 0
+        self.rejected = 0
+
+    def before(self) -> None:
+        with self._lock:
+            if self.state == "closed":
+                return
+            now = time.monotonic()
+            if self.state == "open" and now - self._opened_at >= self.cooldown:
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return
+            self.rejected += 1
+            raise UpstreamUnavailable(self.name, max(self.cooldown - (now - self._opened_at), 1.0))
+
+    def record(self, failure: bool) -> None:
+        with self._lock:
+            if not failure:
+                self.state = "closed"
+                self._failures = 0
+                self._probing = False
+                return
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.threshold:
+                if self.state != "open":
+                    self.opened += 1
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def abandon(self) -> None:
+        """调用被取消、结果未知：不计成败，只释放半开探测名额，下一个请求重新探测"""
+        with self._lock:
+            if self.state == "half_open":
+                self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self._failures, "opened": self.opened, "rejected": self.rejected}
+
+
+class _Latency:
+    """按接口分类记录最近成功调用的耗时，用于计算对冲阈值"""
+
+    def __init__(self, size: int = 256) -> None:
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = collections.defaultdict(lambda: collections.deque(maxlen=size))
+
+    def add(self, endpoint_class: str, seconds: float) -> None:
+        with self._lock:
+            self._samples[endpoint_class].append(seconds)
+
+    def percentile(self, endpoint_class: str, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(endpoint_class) or ())
+        if len(samples) < 20:
+            return None
+        return samples[min(int(len(samples) * q), len(samples) - 1)]
+
+
+_lock = threading.Lock()
+_breakers: Dict[str, CircuitBreaker] = {}
+_latency = _Latency()
+_hedge_pool: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_hedge_counters = {"hedged": 0, "hedge_wins": 0}
+
+
+def get_breaker(endpoint_class: str) -> CircuitBreaker:
+    breaker = _breakers.get(endpoint_class)
+    if breaker is None:
+        with _lock:
+            breaker = _breakers.get(endpoint_class)
+            if breaker is None:
+                settings = get_settings()
+                breaker = CircuitBreaker(endpoint_class, settings.breaker_failure_threshold, settings.breaker_cooldown_seconds)
+                _breakers[endpoint_class] = breaker
+    return breaker
+
+
+def _hedge_delay(endpoint_class: str) -> Optional[float]:
+    """对冲等待时长；未开启或不适用时为 None"""
+    settings = get_settings()
+    if not settings.hedge_enabled or endpoint_class not in HEDGED_CLASSES:
+        return None
+    floor = float(settings.hedge_min_delay_ms) / 1000.0
+    p = _latency.percentile(endpoint_class, float(settings.hedge_percentile))
+    return max(floor, p if p is not None else floor)
+
+
+def _get_hedge_pool() -> concurrent.futures.ThreadPoolExecutor:
+    global _hedge_pool
+    if _hedge_pool is None:
+        with _lock:
+            if _hedge_pool is None:
+                _hedge_pool = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=int(get_settings().hedge_pool_size), thread_name_prefix="upstream-hedge"
+                )
+    return _hedge_pool
+
+
+def _count(key: str) -> None:
+    with _lock:
+        _hedge_counters[key] += 1
+
+
+def _timed(endpoint_class: str, attempt: Callable[[], Any]) -> Any:
+    started = time.monotonic()
+    resp = attempt()
+    _latency.add(endpoint_class, time.monotonic() - started)
+    return resp
+
+
+def _hedged(endpoint_class: str, delay: float, attempt: Callable[[], Any]) -> Any:
+    pool = _get_hedge_pool()
+    first = pool.submit(_timed, endpoint_class, attempt)
+    try:
+        return first.result(timeout=delay)
+    except concurrent.futures.TimeoutError:
+        pass
+    # 首个请求超过延迟分位仍未返回：并行发出第二个请求，取先成功者
+    _count("hedged")
+    second = pool.submit(_timed, endpoint_class, attempt)
+    last_error: Optional[BaseException] = None
+    for future in concurrent.futures.as_completed([first, second]):
+        try:
+            resp = future.result()
+        except Exception as e:
+            last_error = e
+            continue
+        if future is second:
+            _count("hedge_wins")
+        return resp
+    assert last_error is not None
+    raise last_error
+
+
+def guarded_call(endpoint_class: str, attempt: Callable[[], Any]) -> Any:
+    """熔断 + 可选对冲地执行一次上游调用（同步）"""
+    breaker = get_breaker(endpoint_class)
+    breaker.before()
+    try:
+        delay = _hedge_delay(endpoint_class)
+        resp = _timed(endpoint_class, attempt) if delay is None else _hedged(endpoint_class, delay, attempt)
+    except Exception as e:
+        breaker.record(is_upstream_failure(error=e))
+        raise
+    except BaseException:
+        # 取消（操作超时、客户端断开、对冲落败）等：不能让半开探测名额一直被占用
+        breaker.abandon()
+        raise
+    breaker.record(is_upstream_failure(resp))
+    return resp
+
+
+async def _atimed(endpoint_class: str, attempt: Callable[[], Awaitable[Any]]) -> Any:
+    started = time.monotonic()
+    resp = await attempt()
+    _latency.add(endpoint_class, time.monotonic() - started)
+    return resp
+
+
+async def _ahedged(endpoint_class: str, delay: float, attempt: Callable[[], Awaitable[Any]]) -> Any:
+    first = asyncio.ensure_future(_atimed(endpoint_class, attempt))
+    done, _ = await asyncio.wait({first}, timeout=delay)
+    if done:
+        return first.result()
+    _count("hedged")
+    second = asyncio.ensure_future(_atimed(endpoint_class, attempt))
+    pending = {first, second}
+    last_error: Optional[BaseException] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    last_error = task.exception()
+                    continue
+                if task is second:
+                    _count("hedge_wins")
+                return task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+    assert last_error is not None
+    raise last_error
+
+
+async def aguarded_call(endpoint_class: str, attempt: Callable[[], Awaitable[Any]]) -> Any:
+    breaker = get_breaker(endpoint_class)
+    breaker.before()
+    try:
+        delay = _hedge_delay(endpoint_class)
+        resp = await (_atimed(endpoint_class, attempt) if delay is None else _ahedged(endpoint_class, delay, attempt))
+    except Exception as e:
+        breaker.record(is_upstream_failure(error=e))
+        raise
+    except BaseException:
+        # 取消（操作超时、客户端断开、对冲落败）等：不能让半开探测名额一直被占用
+        breaker.abandon()
+        raise
+    breaker.record(is_upstream_failure(resp))
+    return resp
+
+
+def resilience_stats() -> Dict[str, Any]:
+    settings = get_settings()
+    with _lock:
+        breakers = {name: b.stats() for name, b in _breakers.items()}
+        hedging = dict(_hedge_counters)
+    hedging["enabled"] = bool(settings.hedge_enabled)
+    latency = {
+        cls: {"p50": _latency.percentile(cls, 0.5), "p95": _latency.percentile(cls, 0.95)}
+        for cls in ENDPOINT_CLASSES
+    }
+    return {"breakers": breakers, "hedging": hedging, "latency_seconds": latency}
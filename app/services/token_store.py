@@ -12,8 +12,8 @@ from app.core.db import SessionLocal
 from app.core.config import get_settings
 from app.models.token import OAuthToken
 from app.models.user import User
-from openapi_client import ApiClient, Configuration
 from openapi_client.api.auth_api import AuthApi
+from app.services.http_pool import get_shared_api_client
 
 
 class TokenStore:
@@ -66,50 +66,42 @@ class TokenStore:
         # refresh
         if not refresh:
             return access
-        cfg = Configuration()
-        with ApiClient(cfg) as api_client:
-            api = AuthApi(api_client)
-            try:
-                resp = api.oauth_token_refresh_token(refresh_token=refresh, client_id=self.settings.baidu_client_id or "", client_secret=self.settings.baidu_client_secret or "")
-            except Exception:
-                # 惰性修复：刷新失败直接返回现有 access（由上层决定是否重试/重新授权）
-                return access
-            access_new = resp.get("access_token")
-            refresh_new = resp.get("refresh_token", refresh)
-            expires_in = resp.get("expires_in")
-            if access_new:
-                self.save_user_token(user_id, access_new, refresh_new, expires_in)
-                return access_new
+        api = AuthApi(get_shared_api_client())
+        try:
+            resp = api.oauth_token_refresh_token(refresh_token=refresh, client_id=self.settings.baidu_client_id or "", client_secret=self.settings.baidu_client_secret or "")
+        except Exception:
+            # 惰性修复：刷新失败直接返回现有 access（由上层决定是否重试/重新授权）
+            return access
+        access_new = resp.get("access_token")
+        refresh_new = resp.get("refresh_token", refresh)
+        expires_in = resp.get("expires_in")
+        if access_new:
+            self.save_user_token(user_id, access_new, refresh_new, expires_in)
+            return access_new
         return access
 
     def start_device_code(self) -> dict:
-        cfg = Configuration()
-        with ApiClient(cfg) as api_client:
-            api = AuthApi(api_client)
-            scope = "basic,netdisk"
-            resp = api.oauth_token_device_code(client_id=self.settings.baidu_client_id or "", scope=scope)
-            # 转为可序列化 dict
-            return resp.to_dict() if hasattr(resp, "to_dict") else dict(resp)
+        api = AuthApi(get_shared_api_client())
+        scope = "basic,netdisk"
+        resp = api.oauth_token_device_code(client_id=self.settings.baidu_client_id or "", scope=scope)
+        # 转为可序列化 dict
+        return resp.to_dict() if hasattr(resp, "to_dict") else dict(resp)
 
     def poll_device_token(self, device_code: str) -> dict:
-        cfg = Configuration()
-        with ApiClient(cfg) as api_client:
-            api = AuthApi(api_client)
-            resp = api.oauth_token_device_token(code=device_code, client_id=self.settings.baidu_client_id or "", client_secret=self.settings.baidu_client_secret or "")
-            return resp.to_dict() if hasattr(resp, "to_dict") else dict(resp)
+        api = AuthApi(get_shared_api_client())
+        resp = api.oauth_token_device_token(code=device_code, client_id=self.settings.baidu_client_id or "", client_secret=self.settings.baidu_client_secret or "")
+        return resp.to_dict() if hasattr(resp, "to_dict") else dict(resp)
 
     # ---- Authorization Code flow ----
     def exchange_code_to_token(self, code: str) -> dict:
-        cfg = Configuration()
-        with ApiClient(cfg) as api_client:
-            api = AuthApi(api_client)
-            resp = api.oauth_token_code2token(
-                code=code,
-                client_id=self.settings.baidu_client_id or "",
-                client_secret=self.settings.baidu_client_secret or "",
-                redirect_uri=self.settings.baidu_redirect_uri or "",
-            )
-            return resp.to_dict() if hasattr(resp, "to_dict") else dict(resp)
+        api = AuthApi(get_shared_api_client())
+        resp = api.oauth_token_code2token(
+            code=code,
+            client_id=self.settings.baidu_client_id or "",
+            client_secret=self.settings.baidu_client_secret or "",
+            redirect_uri=self.settings.baidu_redirect_uri or "",
+        )
+        return resp.to_dict() if hasattr(resp, "to_dict") else dict(resp)
 
     def exchange_code_to_service_token(self, code: str) -> dict:
         # 同用户流程，区别在保存位置
@@ -160,21 +152,19 @@ class TokenStore:
             # 有其他线程在刷新，返回旧 access（上层可稍后重试）
             return access
         try:
-            cfg = Configuration()
-            with ApiClient(cfg) as api_client:
-                api = AuthApi(api_client)
-                try:
-                    resp = api.oauth_token_refresh_token(refresh_token=refresh, client_id=self.settings.baidu_client_id or "", client_secret=self.settings.baidu_client_secret or "")
-                except Exception:
-                    # 惰性修复：刷新失败（含 used/invalid_grant）不重试旧 refresh
-                    return access
-                access_new = resp.get("access_token")
-                refresh_new = resp.get("refresh_token", refresh)
-                expires_in = resp.get("expires_in")
-                if access_new:
-                    self.save_service_token(access_new, refresh_new, expires_in)
-                    return access_new
+            api = AuthApi(get_shared_api_client())
+            try:
+                resp = api.oauth_token_refresh_token(refresh_token=refresh, client_id=self.settings.baidu_client_id or "", client_secret=self.settings.baidu_client_secret or "")
+            except Exception:
+                # 惰性修复：刷新失败（含 used/invalid_grant）不重试旧 refresh
                 return access
+            access_new = resp.get("access_token")
+            refresh_new = resp.get("refresh_token", refresh)
+            expires_in = resp.get("expires_in")
+            if access_new:
+                self.save_service_token(access_new, refresh_new, expires_in)
+                return access_new
+            return access
         finally:
             try:
                 lock.release()
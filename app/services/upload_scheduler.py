@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import contextlib
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Optional
+
+from app.core.config import get_settings
+
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+_PRIORITIES = (PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW)
+
+# 吞吐统计的滑动窗口
+_WINDOW_SECONDS = 60.0
+
+
+@dataclass
+class _Job:
+    fn: Callable[[], Any]
+    future: concurrent.futures.Future
+    owner: str
+    token: str
+    group: Optional[str]
+    group_limit: int
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class _TokenPacer:
+    """按令牌作用域限制任务启动速率（令牌桶，突发上限为 1 秒的配额）"""
+
+    def __init__(self, rate: float) -> None:
+        self.rate = rate
+        self._buckets: Dict[str, list[float]] = {}
+
+    def wait_time(self, token: str, now: float) -> float:
+        if self.rate <= 0:
+            return 0.0
+        capacity = max(self.rate, 1.0)
+        tokens, last = self._buckets.get(token, (capacity, now))
+        tokens = min(capacity, tokens + (now - last) * self.rate)
+        self._buckets[token] = [tokens, now]
+        return 0.0 if tokens >= 1.0 else (1.0 - tokens) / self.rate
+
+    def take(self, token: str) -> None:
+        if self.rate > 0:
+            self._buckets[token][0] -= 1.0
+
+
+class UploadScheduler:
+    """Process-wide scheduler for batch upload work.
+
+    Jobs are queued per priority and per owner. Within a priority level,
+    owners are served round-robin, so one large batch cannot starve other
+    users. A job is only started when the global cap, the owner's cap, its
+    batch (group) cap and its token's start rate all allow it.
+
+    Running jobs upload their parts in parallel, but every part request
+    also takes a slot from the token's shared part semaphore (see
+    part_slot), so one token has at most upload_token_part_concurrency
+    superfile2 requests in flight per process however many jobs run.
+    """
+
+    def __init__(self, workers: int, per_owner: int, token_rate: float) -> None:
+        self._workers = max(int(workers), 1)
+        self._per_owner = max(int(per_owner), 1)
+        self._pacer = _TokenPacer(float(token_rate))
+        self._cond = threading.Condition()
+        self._queues: Dict[int, "collections.OrderedDict[str, Deque[_Job]]"] = {p: collections.OrderedDict() for p in _PRIORITIES}
+        self._running_owner: Dict[str, int] = collections.defaultdict(int)
+        self._running_group: Dict[str, int] = collections.defaultdict(int)
+        self._running = 0
+        self._threads: list[threading.Thread] = []
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "wait_seconds": 0.0, "run_seconds": 0.0}
+        self._finished: Deque[float] = collections.deque()
+
+    def submit(self, fn: Callable[..., Any], *args: Any, owner: str, token: str, priority: int = PRIORITY_NORMAL, group: Optional[str] = None, group_limit: int = 0, **kwargs: Any) -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        job = _Job(fn=lambda: fn(*args, **kwargs), future=future, owner=owner, token=token, group=group, group_limit=int(group_limit))
+        level = priority if priority in self._queues else PRIORITY_NORMAL
+        with self._cond:
+            self._ensure_workers()
+            self._queues[level].setdefault(owner, collections.deque()).append(job)
+            self._stats["submitted"] += 1
+            self._cond.notify()
+        return future
+
+    def _ensure_workers(self) -> None:
+        while len(self._threads) < self._workers:
+            t = threading.Thread(target=self._worker, name=f"upload-scheduler-{len(self._threads)}", daemon=True)
+            self._threads.append(t)
+            t.start()
+
+    def _pick(self) -> tuple[Optional[_Job], Optional[float]]:
+        """取出下一个可运行的任务；无可运行任务时返回建议等待时长"""
+        now = time.monotonic()
+        retry_in: Optional[float] = None
+        for level in _PRIORITIES:
+            owners = self._queues[level]
+            for owner in list(owners.keys()):
+                queue = owners[owner]
+                job = queue[0]
+                if self._running_owner.get(owner, 0) >= self._per_owner:
+                    continue
+                if job.group and job.group_limit > 0 and self._running_group.get(job.group, 0) >= job.group_limit:
+                    continue
+                wait = self._pacer.wait_time(job.token, now)
+                if wait > 0:
+                    retry_in = wait if retry_in is None else min(retry_in, wait)
+                    continue
+                queue.popleft()
+                # 轮转：被服务的 owner 移到队尾
+                del owners[owner]
+                if queue:
+                    owners[owner] = queue
+                self._pacer.take(job.token)
+                return job, None
+        return None, retry_in
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                job, retry_in = self._pick()
+                while job is None:
+                    self._cond.wait(timeout=retry_in)
+                    job, retry_in = self._pick()
+                self._running += 1
+                self._running_owner[job.owner] += 1
+                if job.group:
+                    self._running_group[job.group] += 1
+            started = time.monotonic()
+            ok = True
+            if job.future.set_running_or_notify_cancel():
+                try:
+                    job.future.set_result(job.fn())
+                except BaseException as e:
+                    ok = False
+                    job.future.set_exception(e)
+            finished = time.monotonic()
+            with self._cond:
+                self._running -= 1
+                self._running_owner[job.owner] -= 1
+                if not self._running_owner[job.owner]:
+                    del self._running_owner[job.owner]
+                if job.group:
+                    self._running_group[job.group] -= 1
+                    if not self._running_group[job.group]:
+                        del self._running_group[job.group]
+                self._stats["completed" if ok else "failed"] += 1
+                self._stats["wait_seconds"] += started - job.enqueued_at
+                self._stats["run_seconds"] += finished - started
+                self._finished.append(finished)
+                self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            now = time.monotonic()
+            while self._finished and now - self._finished[0] > _WINDOW_SECONDS:
+                self._finished.popleft()
+            depth = {
+                name: sum(len(q) for q in self._queues[level].values())
+                for name, level in (("high", PRIORITY_HIGH), ("normal", PRIORITY_NORMAL), ("low", PRIORITY_LOW))
+            }
+            owners = set(itertools.chain.from_iterable(q.keys() for q in self._queues.values()))
+            done = self._stats["completed"] + self._stats["failed"]
+            return {
+                "workers": self._workers,
+                "per_owner_limit": self._per_owner,
+                "token_rate_per_second": self._pacer.rate,
+                "running": self._running,
+                "queued": sum(depth.values()),
+                "queued_by_priority": depth,
+                "waiting_owners": len(owners),
+                "submitted": self._stats["submitted"],
+                "completed": self._stats["completed"],
+                "failed": self._stats["failed"],
+                "jobs_per_minute": round(len(self._finished) * 60.0 / _WINDOW_SECONDS, 2),
+                "avg_wait_seconds": round(self._stats["wait_seconds"] / done, 4) if done else None,
+                "avg_run_seconds": round(self._stats["run_seconds"] / done, 4) if done else None,
+            }
+
+
+_scheduler: Optional[UploadScheduler] = None
+_scheduler_lock = threading.Lock()
+# 按令牌作用域共享的分片请求信号量：所有上传任务的分片线程共用
+_part_slots: Dict[str, threading.BoundedSemaphore] = {}
+
+
+def part_slot(token: str) -> Any:
+    """占用该令牌的一个分片请求名额（上下文管理器）；上限为 0 时不限"""
+    limit = int(get_settings().upload_token_part_concurrency)
+    if limit <= 0:
+        return contextlib.nullcontext()
+    with _scheduler_lock:
+        slot = _part_slots.get(token)
+        if slot is None:
+            slot = _part_slots[token] = threading.BoundedSemaphore(limit)
+    return slot
+
+
+def get_upload_scheduler() -> UploadScheduler:
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                settings = get_settings()
+                _scheduler = UploadScheduler(
+                    workers=settings.upload_global_concurrency,
+                    per_owner=settings.upload_per_user_concurrency,
+                    token_rate=settings.upload_token_starts_per_second,
+                )
+    return _scheduler
+
+
+def upload_scheduler_stats() -> Dict[str, Any]:
+    if _scheduler is None:
+        return {"initialized": False}
+    data = _scheduler.stats()
+    data["part_requests_per_token_limit"] = int(get_settings().upload_token_part_concurrency)
+    data["initialized"] = True
+    return data
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, select
+
+from app.core.config import get_settings
+from app.core.db import SessionLocal
+from app.models.upload_session import UploadSession
+
+
+# 同进程内多个分片线程并发回写同一会话时串行化 read-modify-write
+_parts_lock = threading.Lock()
+
+
+@dataclass
+class ResumeState:
+    id: int
+    uploadid: str
+    completed: set[int] = field(default_factory=set)
+
+
+def session_fingerprint(size: int, block_md5s: list[str]) -> str:
+    return hashlib.sha256(f"{size}:{','.join(block_md5s)}".encode()).hexdigest()
+
+
+class UploadSessionStore:
+    """Persisted multipart upload sessions, used to resume interrupted uploads."""
+
+    def find(self, scope: str, remote_path: str, fingerprint: str) -> Optional[ResumeState]:
+        with SessionLocal() as db:
+            rec = db.execute(
+                select(UploadSession).where(
+                    UploadSession.scope == scope,
+                    UploadSession.remote_path == remote_path,
+                    UploadSession.fingerprint == fingerprint,
+                )
+            ).scalar_one_or_none()
+            if rec is None:
+                return None
+            if rec.expires_at < datetime.utcnow():
+                db.delete(rec)
+                db.commit()
+                return None
+            try:
+                completed = {int(x) for x in json.loads(rec.completed_parts or "[]")}
+            except Exception:
+                completed = set()
+            return ResumeState(id=rec.id, uploadid=rec.uploadid, completed=completed)
+
+    def create(self, scope: str, remote_path: str, size: int, fingerprint: str, uploadid: str, block_md5s: list[str]) -> int:
+        ttl = timedelta(hours=int(get_settings().upload_session_ttl_hours))
+        with SessionLocal() as db:
+            # 同键旧会话（如已过期）直接覆盖
+            db.execute(
+                delete(UploadSession).where(
+                    UploadSession.scope == scope,
+                    UploadSession.remote_path == remote_path,
+                    UploadSession.fingerprint == fingerprint,
+                )
+            )
+            rec = UploadSession(
+                scope=scope,
+                remote_path=remote_path,
+                size=size,
+                fingerprint=fingerprint,
+                uploadid=uploadid,
+                block_list=json.dumps(block_md5s),
+                completed_parts="[]",
+                expires_at=datetime.utcnow() + ttl,
+            )
+            db.add(rec)
+            db.commit()
+            return rec.id
+
+    def mark_part_done(self, session_id: int, partseq: int) -> None:
+        with _parts_lock, SessionLocal() as db:
+            rec = db.get(UploadSession, session_id)
+            if rec is None:
+                return
+            try:
+                done = set(json.loads(rec.completed_parts or "[]"))
+            except Exception:
+                done = set()
+            done.add(int(partseq))
+            rec.completed_parts = json.dumps(sorted(done))
+            db.commit()
+
+    def delete(self, session_id: int) -> None:
+        with SessionLocal() as db:
+            db.execute(delete(UploadSession).where(UploadSession.id == session_id))
+            db.commit()
+
+    def gc_expired(self) -> int:
+        with SessionLocal() as db:
+            res = db.execute(delete(UploadSession).where(UploadSession.expires_at < datetime.utcnow()))
+            db.commit()
+            return int(res.rowcount or 0)
@@ -36,6 +36,12 @@ class ConnectionManager:
         self._last_pong.pop(websocket, None)
         self._msg_counter_minute.pop(websocket, None)
 
+    def is_connected(self, user_id: int) -> bool:
+        return bool(self._clients_by_user.get(user_id))
+
+    def connected_users(self) -> list[int]:
+        return [uid for uid, conns in self._clients_by_user.items() if conns]
+
     async def send_to_user(self, user_id: int, message: dict) -> None:
         for ws in list(self._clients_by_user.get(user_id, set())):
             await ws.send_json(message)
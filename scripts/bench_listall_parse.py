@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+对比 listall 大页响应的解析耗时：SDK 模型反序列化 vs 原始 JSON 快速路径
+
+SDK 路径与 ApiClient.__call_api 相同：按 charset 解码后经 deserialize
+（validate_and_convert_types 逐字段检查）；快速路径即 NetdiskClient 的
+raw_json 包装所用的 json_loads（有 orjson 时使用 orjson）。
+
+用法：python scripts/bench_listall_parse.py --entries 1000 --rounds 50
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, "@netdisk", "mcp", "netdisk-mcp-server-stdio"))
+
+from openapi_client import ApiClient  # noqa: E402
+
+from app.services.http_pool import _orjson, json_loads  # noqa: E402
+
+
+def _listing(entries: int) -> bytes:
+    items = [
+        {
+            "fs_id": 100000000000 + i,
+            "path": f"/apps/bench/dir{i // 100}/file_{i}.jpg",
+            "server_filename": f"file_{i}.jpg",
+            "size": 1024 * (i + 1),
+            "category": 3,
+            "isdir": 0,
+            "md5": "0123456789abcdef0123456789abcdef",
+            "server_ctime": 1700000000 + i,
+            "server_mtime": 1700000000 + i,
+            "local_ctime": 1700000000 + i,
+            "local_mtime": 1700000000 + i,
+            "thumbs": {"url1": f"https://thumb.example/{i}/1", "url2": f"https://thumb.example/{i}/2"},
+        }
+        for i in range(entries)
+    ]
+    return json.dumps({"errno": 0, "has_more": 1, "cursor": entries, "list": items}).encode()
+
+
+class _FakeResponse:
+    def __init__(self, data: str) -> None:
+        self.data = data
+
+
+def _time(fn, rounds: int) -> float:
+    fn()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - started) / rounds * 1000.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    body = _listing(args.entries)
+    client = ApiClient()
+
+    def sdk() -> dict:
+        return client.deserialize(_FakeResponse(body.decode("utf-8")), (dict,), True)
+
+    def raw() -> dict:
+        return json_loads(body)
+
+    assert sdk() == raw()
+    sdk_ms = _time(sdk, args.rounds)
+    raw_ms = _time(raw, args.rounds)
+    print(f"entries={args.entries} body={len(body) / 1024:.0f}KB parser={'orjson' if _orjson is not None else 'json'}")
+    print(f"sdk deserialize : {sdk_ms:8.2f} ms/page")
+    print(f"raw json        : {raw_ms:8.2f} ms/page")
+    print(f"speedup         : {sdk_ms / raw_ms:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
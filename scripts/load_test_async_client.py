@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+本地替身压测：对比线程池同步调用与 AsyncNetdiskClient 的并发能力
+
+替身服务对每个请求延迟 --delay 秒后返回固定 JSON，模拟慢响应的 pan.baidu.com。
+同步路径使用与 Starlette 默认线程池相同的 40 个线程；异步路径在单个事件循环中发起全部请求。
+
+用法：python scripts/load_test_async_client.py --requests 400 --delay 0.5
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, "@netdisk", "mcp", "netdisk-mcp-server-stdio"))
+os.environ.setdefault("APP_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "netdisk_loadtest.sqlite3"))
+
+BODY = json.dumps({"errno": 0, "list": [{"fs_id": i, "path": f"/f{i}", "category": 6} for i in range(20)]}).encode()
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, delay: float) -> None:
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            if length:
+                await reader.readexactly(length)
+            await asyncio.sleep(delay)
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(BODY)}\r\n\r\n".encode()
+                + BODY
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+def _start_standin(delay: float) -> int:
+    ready = threading.Event()
+    port_box: list[int] = []
+
+    def _run() -> None:
+        loop = asyncio.new_event_loop()
+        server = loop.run_until_complete(
+            asyncio.start_server(lambda r, w: _handle(r, w, delay), "127.0.0.1", 0, backlog=2048)
+        )
+        port_box.append(server.sockets[0].getsockname()[1])
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=_run, daemon=True).start()
+    ready.wait()
+    return port_box[0]
+
+
+def run_sync(base: str, n: int, threads: int) -> float:
+    import requests
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=threads)
+    session.mount("http://", adapter)
+
+    def _one(_: int) -> None:
+        session.get(f"{base}/rest/2.0/xpan/file", params={"method": "list", "dir": "/"}, timeout=60).json()
+
+    t0 = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(_one, range(n)))
+    return time.perf_counter() - t0
+
+
+async def run_async(base: str, n: int) -> float:
+    from app.services.mcp_async_client import AsyncNetdiskClient, aclose_shared_async_http
+
+    client = AsyncNetdiskClient(access_token="loadtest", mode="public", base_url=base)
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client.list_files(dir_path="/") for _ in range(n)))
+    elapsed = time.perf_counter() - t0
+    await aclose_shared_async_http()
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--delay", type=float, default=0.5)
+    parser.add_argument("--threads", type=int, default=40, help="Starlette 默认线程池大小")
+    args = parser.parse_args()
+
+    os.environ.setdefault("APP_NETDISK_ASYNC_MAX_CONNECTIONS", str(args.requests))
+    port = _start_standin(args.delay)
+    base = f"http://127.0.0.1:{port}"
+
+    sync_s = run_sync(base, args.requests, args.threads)
+    async_s = asyncio.run(run_async(base, args.requests))
+    print(f"requests={args.requests} delay={args.delay}s")
+    print(f"sync  (threadpool={args.threads}): {sync_s:.2f}s  {args.requests / sync_s:.1f} req/s")
+    print(f"async (single event loop): {async_s:.2f}s  {args.requests / async_s:.1f} req/s")
+    print(f"speedup: {sync_s / async_s:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())